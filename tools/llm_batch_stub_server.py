@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Локальная заглушка Batch API (Gemini batchGenerateContent и Anthropic Message Batches)
+для проверки пакетного перевода без обращения к провайдеру.
+
+Ответ на каждый запрос — текст после маркера промпта (ТЕКСТ ДЛЯ ПЕРЕВОДА / ТЕКСТ ГЛАВЫ /
+ТЕКСТ ДЛЯ АНАЛИЗА), пакет «завершается» через --delay секунд после создания.
+
+Запуск:
+    python tools/llm_batch_stub_server.py --port 8089 --delay 5
+    LLM_BATCH_ENDPOINT=http://localhost:8089 LLM_BATCH_POLL_INTERVAL=2 celery -A celery_app worker ...
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+MARKERS = ('ТЕКСТ ДЛЯ ПЕРЕВОДА:\n', 'ТЕКСТ ГЛАВЫ:\n', 'ТЕКСТ ДЛЯ АНАЛИЗА:\n')
+
+batches = {}
+batches_lock = threading.Lock()
+batch_ids = itertools.count(1)
+completion_delay = 5.0
+
+
+def echo(prompt: str) -> str:
+    for marker in MARKERS:
+        if marker in prompt:
+            return prompt.rsplit(marker, 1)[1]
+    return prompt
+
+
+def is_done(batch: dict) -> bool:
+    return batch['cancelled'] or time.monotonic() - batch['created'] >= completion_delay
+
+
+class BatchStubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+
+        if path.endswith(':batchGenerateContent'):
+            requests = body['batch']['input_config']['requests']['requests']
+            name = f"batches/{next(batch_ids)}"
+            with batches_lock:
+                batches[name] = {'provider': 'gemini', 'requests': requests,
+                                 'created': time.monotonic(), 'cancelled': False}
+            return self._json({'name': name, 'metadata': {'state': 'BATCH_STATE_PENDING'}})
+
+        if path.endswith(':cancel'):
+            return self._cancel(path.lstrip('/')[:-len(':cancel')])
+
+        if path == '/messages/batches':
+            batch_id = f"msgbatch_{next(batch_ids)}"
+            with batches_lock:
+                batches[batch_id] = {'provider': 'anthropic', 'requests': body['requests'],
+                                     'created': time.monotonic(), 'cancelled': False}
+            return self._json({'id': batch_id, 'processing_status': 'in_progress'})
+
+        if path.startswith('/messages/batches/') and path.endswith('/cancel'):
+            return self._cancel(path.split('/')[3])
+
+        self._json({'error': {'message': f'Unknown path {path}'}}, 404)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+
+        if path.startswith('/batches/'):
+            batch = batches.get(path.lstrip('/'))
+            if not batch:
+                return self._json({'error': {'message': 'Batch not found'}}, 404)
+            return self._json(self._gemini_batch(path.lstrip('/'), batch))
+
+        if path.startswith('/messages/batches/'):
+            segments = path.split('/')
+            batch = batches.get(segments[3])
+            if not batch:
+                return self._json({'error': {'message': 'Batch not found'}}, 404)
+            if len(segments) > 4 and segments[4] == 'results':
+                return self._jsonl(self._anthropic_results(batch))
+            return self._json(self._anthropic_batch(segments[3], batch))
+
+        self._json({'error': {'message': f'Unknown path {path}'}}, 404)
+
+    def _cancel(self, batch_id: str):
+        with batches_lock:
+            if batch_id not in batches:
+                return self._json({'error': {'message': 'Batch not found'}}, 404)
+            batches[batch_id]['cancelled'] = True
+        self._json({})
+
+    @staticmethod
+    def _gemini_batch(name: str, batch: dict) -> dict:
+        if not is_done(batch):
+            return {'name': name, 'metadata': {'state': 'BATCH_STATE_RUNNING'}}
+        if batch['cancelled']:
+            return {'name': name, 'metadata': {'state': 'BATCH_STATE_CANCELLED'}, 'done': True}
+
+        responses = []
+        for item in batch['requests']:
+            prompt = item['request']['contents'][0]['parts'][-1]['text']
+            text = echo(prompt)
+            responses.append({
+                'metadata': item.get('metadata'),
+                'response': {
+                    'candidates': [{'content': {'parts': [{'text': text}]}, 'finishReason': 'STOP'}],
+                    'usageMetadata': {'promptTokenCount': len(prompt), 'candidatesTokenCount': len(text),
+                                      'totalTokenCount': len(prompt) + len(text)}
+                }
+            })
+        return {
+            'name': name,
+            'metadata': {'state': 'BATCH_STATE_SUCCEEDED'},
+            'done': True,
+            'response': {'inlinedResponses': {'inlinedResponses': responses}}
+        }
+
+    def _anthropic_batch(self, batch_id: str, batch: dict) -> dict:
+        if not is_done(batch):
+            return {'id': batch_id, 'processing_status': 'in_progress'}
+        count = len(batch['requests'])
+        host = self.headers.get('Host', 'localhost')
+        return {
+            'id': batch_id,
+            'processing_status': 'ended',
+            'request_counts': {'succeeded': 0 if batch['cancelled'] else count,
+                               'canceled': count if batch['cancelled'] else 0},
+            'results_url': f"http://{host}/messages/batches/{batch_id}/results"
+        }
+
+    @staticmethod
+    def _anthropic_results(batch: dict) -> list:
+        results = []
+        for item in batch['requests']:
+            if batch['cancelled']:
+                results.append({'custom_id': item['custom_id'], 'result': {'type': 'canceled'}})
+                continue
+            prompt = item['params']['messages'][-1]['content']
+            text = echo(prompt)
+            results.append({
+                'custom_id': item['custom_id'],
+                'result': {
+                    'type': 'succeeded',
+                    'message': {
+                        'content': [{'type': 'text', 'text': text}],
+                        'stop_reason': 'end_turn',
+                        'usage': {'input_tokens': len(prompt), 'output_tokens': len(text)}
+                    }
+                }
+            })
+        return results
+
+    def _json(self, data: dict, status: int = 200):
+        self._send(json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json', status)
+
+    def _jsonl(self, items: list):
+        payload = '\n'.join(json.dumps(item, ensure_ascii=False) for item in items)
+        self._send(payload.encode('utf-8'), 'application/x-jsonl', 200)
+
+    def _send(self, payload: bytes, content_type: str, status: int):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main():
+    global completion_delay
+
+    parser = argparse.ArgumentParser(description='Заглушка Batch API для пакетного перевода')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--delay', type=float, default=5.0, help='секунд до завершения пакета')
+    args = parser.parse_args()
+    completion_delay = args.delay
+
+    server = ThreadingHTTPServer((args.host, args.port), BatchStubHandler)
+    print(f"🧪 Заглушка Batch API: http://{args.host}:{args.port} (пакет завершается через {args.delay} с)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
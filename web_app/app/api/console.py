@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 from app.utils.console_buffer import (
     add_console_message, 
     get_console_buffer, 
+    get_last_message_id,
+    read_console_messages,
     clear_console_buffer, 
     get_console_stats as get_buffer_stats
 )
@@ -20,8 +22,8 @@ def get_console_logs():
         level = request.args.get('level', None)
         source = request.args.get('source', None)
         
-        # Фильтруем логи
-        logs = get_console_buffer()
+        # Без фильтров читаем из стрима только последние limit сообщений
+        logs = get_console_buffer(None if level or source else limit)
         
         if level:
             logs = [log for log in logs if log['level'] == level.upper()]
@@ -48,20 +50,29 @@ def get_console_logs():
 @console_bp.route('/console/stream', methods=['GET'])
 def stream_console_logs():
     """Stream консольных логов в реальном времени"""
+    # При переподключении EventSource присылает ID последнего полученного сообщения
+    last_id = request.headers.get('Last-Event-ID') or get_last_message_id()
+
     def generate():
-        buffer = get_console_buffer()
-        last_index = len(buffer)
-        
+        nonlocal last_id
+
         while True:
-            # Проверяем новые сообщения
-            buffer = get_console_buffer()
-            if len(buffer) > last_index:
-                new_messages = buffer[last_index:]
-                for message in new_messages:
-                    yield f"data: {json.dumps(message)}\n\n"
-                last_index = len(buffer)
-            
-            time.sleep(0.5)  # Пауза между проверками
+            # Блокирующее чтение только новых сообщений стрима
+            try:
+                entries = read_console_messages(last_id)
+            except Exception as e:
+                print(f"Ошибка чтения console stream: {e}")
+                time.sleep(1)
+                continue
+
+            if not entries:
+                # Keep-alive, чтобы обнаруживать отключившихся клиентов
+                yield ": ping\n\n"
+                continue
+
+            for message_id, message in entries:
+                yield f"id: {message_id}\ndata: {json.dumps(message)}\n\n"
+            last_id = entries[-1][0]
     
     return Response(generate(), mimetype='text/event-stream')
 
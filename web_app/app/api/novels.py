@@ -681,6 +681,7 @@ def get_novel_usage(novel_id):
                 COALESCE(SUM(ph.execution_time) FILTER (WHERE ph.success = TRUE), 0) AS success_time_s,
                 COALESCE(SUM(ph.execution_time) FILTER (WHERE ph.success = FALSE), 0) AS failure_time_s,
                 COALESCE(SUM(ph.tokens_used), 0) AS total_tokens,
+                COALESCE(SUM(ph.cached_tokens), 0) AS cached_tokens,
                 MIN(ph.created_at) AS earliest,
                 MAX(ph.created_at) AS latest
             FROM prompt_history ph
@@ -979,15 +979,21 @@ def cancel_editing_task(self, task_id):
 @celery.task(bind=True, base=CallbackTask, soft_time_limit=1209600, time_limit=1209660)  # 14 суток soft + 1 мин на cleanup
 def translate_novel_chapters_task(self, novel_id, chapter_ids):
     """
-    Фоновая задача перевода глав новеллы (последовательно)
+    Фоновая задача перевода глав новеллы (конвейером)
+
+    Главы идут скользящим окном из translation_threads потоков (по умолчанию 1 — последовательно):
+    глава k+1 ждёт только резюме главы k (контекст предыдущих глав), а не её извлечение
+    терминов и сохранение.
 
     Args:
         novel_id: ID новеллы
         chapter_ids: Список ID глав для перевода
     """
-    from app.services.translator_service import TranslatorService
+    from app.services.translator_service import TranslatorService, TranslationContext
     from app.services.original_aware_editor_service import RateLimitError
     from app.services.log_service import LogService
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    import threading
 
     # Флаг для отслеживания отмены
     global _cancel_requested
@@ -1028,13 +1034,14 @@ def translate_novel_chapters_task(self, novel_id, chapter_ids):
         novel.translation_task_id = self.request.id
         db.session.commit()
 
-        # Инициализируем сервис перевода
+        # Инициализируем настройки перевода
         config = {}
+        parallel_threads = 1
         if novel.config:
             config['model_name'] = novel.config.get('translation_model')
             config['temperature'] = novel.config.get('translation_temperature')
-
-        translator = TranslatorService(config=config)
+            parallel_threads = novel.config.get('translation_threads', parallel_threads)
+        parallel_threads = max(1, int(parallel_threads or 1))
 
         # Получаем главы
         chapters = Chapter.query.filter(Chapter.id.in_(chapter_ids)).order_by(Chapter.chapter_number).all()
@@ -1043,111 +1050,241 @@ def translate_novel_chapters_task(self, novel_id, chapter_ids):
             raise ValueError("Главы для перевода не найдены")
 
         total_chapters = len(chapters)
+        ordered_ids = [chapter.id for chapter in chapters]
 
         self.update_state(state='PROGRESS', meta={'status': 'Начинаем перевод', 'progress': 0})
-        LogService.log_info(f"📝 [Novel:{novel_id}] Начинаем перевод {total_chapters} глав(ы)", novel_id=novel_id)
+        LogService.log_info(f"📝 [Novel:{novel_id}] Начинаем перевод {total_chapters} глав(ы) (конвейер: до {parallel_threads} глав одновременно)", novel_id=novel_id)
+
+        # Пакетный режим: сначала все главы через Batch API провайдера, конвейер
+        # ниже пропускает сохранённые и доводит отложенные (части берутся из контрольных точек)
+        if novel.config and novel.config.get('translation_batch_mode'):
+            from app.services.batch_translation_service import BatchTranslationService
+
+            batch_service = BatchTranslationService(TranslatorService(config=config))
+            if batch_service.is_supported():
+                def batch_should_stop():
+                    global _cancel_requested
+                    db.session.refresh(novel)
+                    if novel.status == 'translation_cancelled':
+                        _cancel_requested = True
+                    return _cancel_requested
+
+                self.update_state(state='PROGRESS', meta={'status': 'Пакетный перевод: ожидание провайдера', 'progress': 0})
+                try:
+                    batch_result = batch_service.translate_chapters(chapters, should_stop=batch_should_stop)
+                finally:
+                    batch_service.client.close()
+                success_count += len(batch_result['translated'])
+
+                if batch_result['translated']:
+                    from sqlalchemy import func
+                    novel.translated_chapters = db.session.query(func.count(Chapter.id)).filter(
+                        Chapter.novel_id == novel_id,
+                        Chapter.status.in_(['translated', 'edited', 'aligned'])
+                    ).scalar() or 0
+                    db.session.commit()
+            else:
+                LogService.log_warning(
+                    f"⚠️ [Novel:{novel_id}] Пакетный режим не поддерживается провайдером модели — обычный перевод",
+                    novel_id=novel_id
+                )
 
-        # Последовательный перевод глав
-        for i, chapter in enumerate(chapters):
-            # Проверяем отмену
-            db.session.refresh(novel)
-            if _cancel_requested or novel.status == 'translation_cancelled':
-                novel.status = 'translation_cancelled'
-                novel.translation_task_id = None
-                db.session.commit()
+        # Конвейер: глава k+1 стартует, как только у главы k готово резюме
+        # (а не после извлечения терминов и сохранения). Резюме передаются в памяти:
+        # summary_results[id] — список резюме для следующей главы, None — взять из БД.
+        summary_events = {ch_id: threading.Event() for ch_id in ordered_ids}
+        summary_results = {}
+        counter_lock = threading.Lock()
+        processed_count = 0
+        rate_limit_errors = []
+        # Отмена для потоков этой задачи: глобальный _cancel_requested сбрасывает следующая
+        # задача процесса, а поток в паузе повтора может её пережить
+        stop_event = threading.Event()
+
+        def stop_requested():
+            return stop_event.is_set() or bool(rate_limit_errors)
+
+        def publish_summaries(chapter_id, summaries):
+            with counter_lock:
+                if summary_events[chapter_id].is_set():
+                    return
+                summary_results[chapter_id] = summaries
+                summary_events[chapter_id].set()
+
+        def wait_previous_summaries(index):
+            """Резюме для главы с позицией index; False — задача остановлена во время ожидания"""
+            if index == 0:
+                return None
+            prev_id = ordered_ids[index - 1]
+            while not summary_events[prev_id].wait(timeout=1):
+                if stop_requested():
+                    return False
+            return summary_results[prev_id]
 
-                LogService.log_warning(f"🛑 [Novel:{novel_id}] Перевод отменён пользователем. Переведено {success_count}/{total_chapters} глав(ы)", novel_id=novel_id)
-                return {
-                    'status': 'cancelled',
-                    'message': 'Перевод отменён пользователем',
-                    'translated_chapters': success_count,
-                    'total_chapters': total_chapters
-                }
+        def translate_single_chapter(index, chapter_id):
+            nonlocal success_count, processed_count
 
-            # Перезагружаем главу из БД
-            chapter = Chapter.query.get(chapter.id)
-            if not chapter:
-                LogService.log_error(f"❌ [Novel:{novel_id}] Глава ID={chapter.id} не найдена", novel_id=novel_id)
-                continue
+            # Каждый поток создает свою Flask app context и сессию БД
+            from app import create_app
+            app = create_app()
 
-            # Пропускаем уже переведённые
-            if chapter.status in ('translated', 'edited', 'aligned'):
-                LogService.log_info(f"⏭️ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Уже переведена, пропускаем", novel_id=novel_id)
-                continue
+            with app.app_context():
+                previous_summaries = None
+                try:
+                    chapter = Chapter.query.get(chapter_id)
+                    if not chapter:
+                        LogService.log_error(f"❌ [Novel:{novel_id}] Глава ID={chapter_id} не найдена", novel_id=novel_id)
+                        return False
 
-            # Retry логика: 3 попытки с задержками
-            max_attempts = 3
-            retry_delays = [0, 300, 600]  # 0, 5 мин, 10 мин
+                    previous_summaries = wait_previous_summaries(index)
+                    if previous_summaries is False:
+                        previous_summaries = None
+                        return False
 
-            for attempt in range(max_attempts):
-                # Проверяем отмену перед каждой попыткой
-                if _cancel_requested:
-                    break
+                    # Пропускаем уже переведённые (их резюме уже в БД)
+                    if chapter.status in ('translated', 'edited', 'aligned'):
+                        LogService.log_info(f"⏭️ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Уже переведена, пропускаем", novel_id=novel_id)
+                        if previous_summaries is not None:
+                            existing = chapter.current_translation
+                            previous_summaries = TranslationContext.append_summary(
+                                previous_summaries, chapter, existing.summary if existing else None
+                            )
+                        return None
 
-                try:
-                    if attempt == 0:
-                        LogService.log_info(f"🔄 [Novel:{novel_id}, Ch:{chapter.chapter_number}] Переводим главу ({i+1}/{total_chapters})", novel_id=novel_id)
-                    else:
-                        delay_minutes = retry_delays[attempt] // 60
-                        LogService.log_warning(f"🔄 [Novel:{novel_id}, Ch:{chapter.chapter_number}] Попытка {attempt+1}/{max_attempts} (после {delay_minutes} мин задержки)", novel_id=novel_id)
+                    translator = TranslatorService(config=config)
 
-                    success = translator.translate_chapter(chapter)
+                    # Retry логика: 3 попытки с задержками
+                    max_attempts = 3
+                    retry_delays = [0, 300, 600]  # 0, 5 мин, 10 мин
 
-                    if success:
-                        success_count += 1
+                    for attempt in range(max_attempts):
+                        # Проверяем отмену перед каждой попыткой
+                        if stop_requested():
+                            return False
 
-                        # Обновляем счётчик реальным значением из БД
-                        from sqlalchemy import func
-                        real_translated_count = db.session.query(func.count(Chapter.id)).filter(
-                            Chapter.novel_id == novel_id,
-                            Chapter.status.in_(['translated', 'edited', 'aligned'])
-                        ).scalar() or 0
+                        try:
+                            if attempt == 0:
+                                LogService.log_info(f"🔄 [Novel:{novel_id}, Ch:{chapter.chapter_number}] Переводим главу ({index+1}/{total_chapters})", novel_id=novel_id)
+                            else:
+                                delay_minutes = retry_delays[attempt] // 60
+                                LogService.log_warning(f"🔄 [Novel:{novel_id}, Ch:{chapter.chapter_number}] Попытка {attempt+1}/{max_attempts} (после {delay_minutes} мин задержки)", novel_id=novel_id)
+
+                            success = translator.translate_chapter(
+                                chapter,
+                                previous_summaries=previous_summaries,
+                                on_summary_ready=lambda summaries: publish_summaries(chapter_id, summaries),
+                                should_stop=stop_event.is_set
+                            )
 
-                        novel_update = Novel.query.get(novel_id)
-                        if novel_update:
-                            novel_update.translated_chapters = real_translated_count
-                            db.session.commit()
+                            if success:
+                                # Обновляем счётчик реальным значением из БД
+                                from sqlalchemy import func
+                                with counter_lock:
+                                    success_count += 1
+                                    real_translated_count = db.session.query(func.count(Chapter.id)).filter(
+                                        Chapter.novel_id == novel_id,
+                                        Chapter.status.in_(['translated', 'edited', 'aligned'])
+                                    ).scalar() or 0
+
+                                    novel_update = Novel.query.get(novel_id)
+                                    if novel_update:
+                                        novel_update.translated_chapters = real_translated_count
+                                        db.session.commit()
+
+                                LogService.log_info(f"✅ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Переведена ({real_translated_count}/{total_chapters})", novel_id=novel_id)
+                                return True
+                            else:
+                                raise Exception("translate_chapter вернул False")
+
+                        except RateLimitError as e:
+                            # Достигнут лимит API (недельный/дневной) — ОСТАНАВЛИВАЕМ ВСЮ ЗАДАЧУ
+                            LogService.log_error(f"🛑 [Novel:{novel_id}, Ch:{chapter.chapter_number}] {e}", novel_id=novel_id)
+                            rate_limit_errors.append(e)
+                            return 'RATE_LIMIT_STOP'
+                        except Exception as e:
+                            # Если задача отменена — не ждём, выходим сразу
+                            if stop_event.is_set():
+                                return False
+                            if attempt < max_attempts - 1:
+                                delay_seconds = retry_delays[attempt + 1]
+                                delay_minutes = delay_seconds // 60
+                                LogService.log_warning(f"⚠️ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Ошибка: {e}. Повтор через {delay_minutes} мин...", novel_id=novel_id)
+                                # Пауза прерывается отменой задачи
+                                if stop_event.wait(delay_seconds):
+                                    return False
+                            else:
+                                LogService.log_error(f"❌ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Все {max_attempts} попытки завершились ошибками: {e}. Глава ПРОПУЩЕНА.", novel_id=novel_id)
+                    return False
+                finally:
+                    # Если резюме не опубликовано (пропуск/ошибка) — следующая глава получает тот же контекст
+                    publish_summaries(chapter_id, previous_summaries)
+                    with counter_lock:
+                        processed_count += 1
 
-                        LogService.log_info(f"✅ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Переведена ({real_translated_count}/{total_chapters})", novel_id=novel_id)
-                        break  # Успех — выходим из retry
-                    else:
-                        raise Exception("translate_chapter вернул False")
+        # Скользящее окно: подаём главы по мере освобождения слотов
+        executor = ThreadPoolExecutor(max_workers=parallel_threads)
+        try:
+            pending = list(enumerate(ordered_ids))
+            futures = {}
 
-                except Terminated:
-                    raise
-                except RateLimitError as e:
-                    # Достигнут лимит API (недельный/дневной) — ОСТАНАВЛИВАЕМ ВСЮ ЗАДАЧУ
-                    LogService.log_error(f"🛑 [Novel:{novel_id}, Ch:{chapter.chapter_number}] {e}", novel_id=novel_id)
+            while pending or futures:
+                # Проверяем отмену
+                db.session.refresh(novel)
+                if _cancel_requested or novel.status == 'translation_cancelled':
+                    _cancel_requested = True
+                    # Дожидаемся глав в работе: они видят отмену и не сохраняют перевод
+                    stop_event.set()
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    db.session.refresh(novel)
+                    novel.status = 'translation_cancelled'
+                    novel.translation_task_id = None
+                    db.session.commit()
+
+                    LogService.log_warning(f"🛑 [Novel:{novel_id}] Перевод отменён пользователем. Переведено {success_count}/{total_chapters} глав(ы)", novel_id=novel_id)
+                    return {
+                        'status': 'cancelled',
+                        'message': 'Перевод отменён пользователем',
+                        'translated_chapters': success_count,
+                        'total_chapters': total_chapters
+                    }
+
+                while pending and len(futures) < parallel_threads and not rate_limit_errors:
+                    index, ch_id = pending.pop(0)
+                    futures[executor.submit(translate_single_chapter, index, ch_id)] = ch_id
+
+                if not futures:
+                    break
+
+                done, _ = wait(futures, timeout=5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ch_id = futures.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        LogService.log_error(f"❌ [Novel:{novel_id}] Ошибка в потоке перевода главы ID={ch_id}: {e}", novel_id=novel_id)
+
+                if rate_limit_errors and not futures:
                     LogService.log_error(f"🛑 [Novel:{novel_id}] ОСТАНОВКА ПЕРЕВОДА: достигнут лимит API", novel_id=novel_id)
                     novel.status = 'translation_error'
                     db.session.commit()
-                    raise
-                except Exception as e:
-                    # Если задача отменена — не ждём, выходим сразу
-                    if _cancel_requested:
-                        break
-                    if attempt < max_attempts - 1:
-                        delay_seconds = retry_delays[attempt + 1]
-                        delay_minutes = delay_seconds // 60
-                        LogService.log_warning(f"⚠️ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Ошибка: {e}. Повтор через {delay_minutes} мин...", novel_id=novel_id)
-                        time.sleep(delay_seconds)
-                    else:
-                        LogService.log_error(f"❌ [Novel:{novel_id}, Ch:{chapter.chapter_number}] Все {max_attempts} попытки завершились ошибками: {e}. Глава ПРОПУЩЕНА.", novel_id=novel_id)
+                    raise rate_limit_errors[0]
 
-            # Обновляем прогресс
-            progress = int(((i + 1) / total_chapters) * 100)
-            self.update_state(
-                state='PROGRESS',
-                meta={
-                    'status': f'Перевод: {i+1}/{total_chapters} глав',
-                    'progress': progress,
-                    'translated_chapters': success_count
-                }
-            )
-
-            # Пауза между главами
-            if i < total_chapters - 1:
-                time.sleep(2)
+                if done:
+                    # Обновляем прогресс
+                    progress = int((processed_count / total_chapters) * 100)
+                    self.update_state(
+                        state='PROGRESS',
+                        meta={
+                            'status': f'Перевод: {processed_count}/{total_chapters} глав',
+                            'progress': progress,
+                            'translated_chapters': success_count
+                        }
+                    )
+        finally:
+            # При отмене/ошибке потоки видят stop_event; ждём их, чтобы ни один
+            # не продолжил переводить после завершения задачи
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
 
         # Финальный статус
         if success_count > 0:
@@ -1605,9 +1742,9 @@ def generate_bilingual_epub_task(self, novel_id):
         self.update_state(state='PROGRESS', meta={'status': 'Начинаем генерацию EPUB', 'progress': 0})
         LogService.log_info(f"📚 [Novel:{novel_id}] Начинаем генерацию двуязычного EPUB для '{novel.title}'", novel_id=novel_id)
 
-        # Получаем главы для EPUB
-        from app.models import Chapter
-        chapters = Chapter.query.filter_by(novel_id=novel_id).order_by(Chapter.chapter_number).all()
+        # Получаем главы для EPUB (пакетно: последние переводы без загрузки всех версий)
+        from app.services.chapter_bulk_loader import ChapterBulkLoader
+        chapters = ChapterBulkLoader.load_translated_chapters(novel_id)
 
         if not chapters:
             raise ValueError("Нет глав для генерации EPUB")
@@ -1616,23 +1753,23 @@ def generate_bilingual_epub_task(self, novel_id):
         chapters_data = []
         for chapter in chapters:
             # Используем отредактированный текст, если есть, иначе переведенный
-            edited_trans = chapter.edited_translation
-            current_trans = chapter.current_translation
+            edited_trans = chapter['edited']
+            current_trans = chapter['current']
 
             content = None
             title = None
 
             if edited_trans:
-                content = edited_trans.translated_text
-                title = edited_trans.translated_title
+                content = edited_trans['text']
+                title = edited_trans['title']
             elif current_trans:
-                content = current_trans.translated_text
-                title = current_trans.translated_title
+                content = current_trans['text']
+                title = current_trans['title']
 
             if content:  # Только главы с контентом
                 chapters_data.append({
-                    'number': chapter.chapter_number,
-                    'title': title or chapter.original_title or f'Глава {chapter.chapter_number}',
+                    'number': chapter['number'],
+                    'title': title or chapter['original_title'] or f'Глава {chapter["number"]}',
                     'content': content
                 })
 
@@ -24,6 +24,7 @@ class PromptHistory(db.Model):
     model_used = Column(String(100))
     temperature = Column(db.Float)
     tokens_used = Column(Integer)
+    cached_tokens = Column(Integer)  # токены промпта, прочитанные из кэша провайдера
     finish_reason = Column(String(50))
     
     # Статус
@@ -1,10 +1,17 @@
 """
 Адаптер для работы с разными AI провайдерами через унифицированный интерфейс
 """
+import asyncio
+import hashlib
 import httpx
 import json
 import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
 from typing import Dict, List, Optional
+from urllib.parse import urlsplit
 from app.models.ai_model import AIModel
 from app.services.ai_model_service import AIModelService
 from app.services.log_service import LogService
@@ -12,6 +19,193 @@ from app.services.log_service import LogService
 logger = logging.getLogger(__name__)
 
 
+# Пул HTTP-соединений: один httpx.AsyncClient на (event loop, хост, таймаут) на процесс.
+# Клиент переживает отдельные запросы и Celery-задачи воркера, поэтому
+# TCP+TLS рукопожатие выполняется один раз, дальше соединения переиспользуются (keep-alive).
+# httpx.AsyncClient привязан к event loop, в котором открыл соединения, — поэтому loop входит в ключ.
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv('HTTP_POOL_MAX_CONNECTIONS', '20'))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv('HTTP_POOL_MAX_KEEPALIVE', '10'))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_POOL_KEEPALIVE_EXPIRY', '120'))
+HTTP_POOL_HTTP2 = os.getenv('HTTP_POOL_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+
+try:
+    import h2  # noqa: F401 — нужен httpx для HTTP/2
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+_http_clients: Dict[tuple, httpx.AsyncClient] = {}
+_http_clients_lock = threading.Lock()
+
+
+def _get_http_client(endpoint: str, timeout: float) -> httpx.AsyncClient:
+    """Получить (или создать) общий AsyncClient для хоста endpoint в текущем event loop"""
+    loop = asyncio.get_running_loop()
+    parts = urlsplit(endpoint or '')
+    base_url = f"{parts.scheme}://{parts.netloc}"
+    key = (loop, base_url, timeout)
+
+    with _http_clients_lock:
+        # Клиенты закрытых loop'ов уже неработоспособны — просто забываем их
+        for stale_key in [k for k in _http_clients if k[0].is_closed()]:
+            del _http_clients[stale_key]
+
+        client = _http_clients.get(key)
+        if client is None or client.is_closed:
+            # HTTP/2 работает только поверх TLS (для локального http:// Ollama остаётся HTTP/1.1)
+            use_http2 = HTTP_POOL_HTTP2 and _HTTP2_AVAILABLE and parts.scheme == 'https'
+            client = httpx.AsyncClient(
+                timeout=timeout,
+                http2=use_http2,
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY,
+                ),
+            )
+            _http_clients[key] = client
+            logger.debug(f"HTTP пул: новый клиент для {base_url} (http2={use_http2}, timeout={timeout})")
+        return client
+
+
+@asynccontextmanager
+async def _shared_http_client(endpoint: str, timeout: float):
+    """Контекстный менеджер поверх пула — замена `async with httpx.AsyncClient(...)`, не закрывающая клиент"""
+    yield _get_http_client(endpoint, timeout)
+
+
+# Кэш списка моделей Ollama (/api/tags) per endpoint: {tags_url: (expires_at, {model_names})}.
+# Инвалидируется при ошибке model_not_found от /api/generate.
+OLLAMA_TAGS_CACHE_TTL = float(os.getenv('OLLAMA_TAGS_CACHE_TTL', '300'))
+
+_ollama_models_cache: Dict[str, tuple] = {}
+_ollama_models_lock = threading.Lock()
+
+
+def _get_cached_ollama_models(tags_url: str) -> Optional[set]:
+    """Список моделей из кэша или None, если кэш пуст/устарел"""
+    with _ollama_models_lock:
+        entry = _ollama_models_cache.get(tags_url)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+
+def _set_cached_ollama_models(tags_url: str, models: set):
+    with _ollama_models_lock:
+        _ollama_models_cache[tags_url] = (time.monotonic() + OLLAMA_TAGS_CACHE_TTL, models)
+
+
+def _invalidate_ollama_models(tags_url: str):
+    with _ollama_models_lock:
+        _ollama_models_cache.pop(tags_url, None)
+
+
+# Фильтры безопасности Gemini отключены: художественный текст часто блокируется ложно
+GEMINI_SAFETY_SETTINGS = [
+    {'category': 'HARM_CATEGORY_HATE_SPEECH', 'threshold': 'BLOCK_NONE'},
+    {'category': 'HARM_CATEGORY_SEXUALLY_EXPLICIT', 'threshold': 'BLOCK_NONE'},
+    {'category': 'HARM_CATEGORY_HARASSMENT', 'threshold': 'BLOCK_NONE'},
+    {'category': 'HARM_CATEGORY_DANGEROUS_CONTENT', 'threshold': 'BLOCK_NONE'}
+]
+
+# Кэширование префикса промпта (system + контекст главы, общий для всех частей главы).
+# Anthropic и OpenRouter (модели Anthropic/Gemini) — cache_control на префиксе,
+# Gemini — явный cachedContents для больших префиксов (меньшие кэшируются неявно),
+# DeepSeek и OpenAI кэшируют префикс автоматически: стабильная часть уже идёт первой.
+PROMPT_CACHE_ENABLED = os.getenv('PROMPT_CACHE_ENABLED', 'true').lower() == 'true'
+GEMINI_CACHED_CONTENT_MIN_TOKENS = int(os.getenv('GEMINI_CACHED_CONTENT_MIN_TOKENS', '4096'))
+GEMINI_CACHED_CONTENT_TTL = int(os.getenv('GEMINI_CACHED_CONTENT_TTL', '900'))
+
+# {хэш (endpoint, ключ, модель, префикс): (expires_at, имя cachedContents)}
+_gemini_cached_contents: Dict[str, tuple] = {}
+# Модели, не поддерживающие cachedContents — для них явный кэш больше не создаётся
+_gemini_cache_rejected: set = set()
+# Порог оценки токенов префикса для модели, поднятый после отказа «слишком мало токенов»:
+# меньшие префиксы не отправляются, большие — пробуются как обычно
+_gemini_cache_min_tokens: Dict[str, int] = {}
+# Создание cachedContents в процессе: {хэш: задача}, чтобы параллельные части главы
+# ждали одно создание, а не оплачивали каждая свой кэш того же префикса
+_gemini_cache_creating: Dict[str, asyncio.Task] = {}
+_gemini_cache_lock = threading.Lock()
+
+
+def _gemini_cache_key(endpoint: str, api_key: str, model_id: str, system_prompt: str, prefix: str) -> str:
+    payload = '\x00'.join([endpoint or '', api_key or '', model_id or '', system_prompt or '', prefix])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _get_gemini_cached_content(cache_key: str) -> Optional[str]:
+    """Имя cachedContents или None, если его нет или оно скоро истечёт"""
+    with _gemini_cache_lock:
+        entry = _gemini_cached_contents.get(cache_key)
+        # Запас в минуту, чтобы кэш не истёк во время запроса
+        if entry and entry[0] > time.monotonic() + 60:
+            return entry[1]
+        _gemini_cached_contents.pop(cache_key, None)
+        return None
+
+
+def _set_gemini_cached_content(cache_key: str, name: str, ttl: float):
+    with _gemini_cache_lock:
+        # Заодно забываем истёкшие записи
+        now = time.monotonic()
+        for stale_key in [k for k, (expires_at, _) in _gemini_cached_contents.items() if expires_at <= now]:
+            del _gemini_cached_contents[stale_key]
+        _gemini_cached_contents[cache_key] = (now + ttl, name)
+
+
+def _invalidate_gemini_cached_content(cache_key: str):
+    with _gemini_cache_lock:
+        _gemini_cached_contents.pop(cache_key, None)
+
+
+def _forget_gemini_cache_creation(cache_key: str, task: asyncio.Task):
+    with _gemini_cache_lock:
+        if _gemini_cache_creating.get(cache_key) is task:
+            del _gemini_cache_creating[cache_key]
+    if not task.cancelled():
+        task.exception()  # ошибку получают ожидающие запросы; здесь — чтобы asyncio не предупреждал
+
+
+def _gemini_cache_rejection(error_text: str) -> Optional[str]:
+    """
+    Причина отказа в создании cachedContents, после которой повтор бессмыслен:
+    'unsupported' — модель не поддерживает явный кэш, 'too_small' — префикс меньше минимума модели.
+    None — прочие ошибки 400 (например, некорректный запрос): пропускается только этот вызов.
+    """
+    text = (error_text or '').lower()
+    if 'too small' in text or 'min_total_token_count' in text:
+        return 'too_small'
+    if 'not supported' in text or 'does not support' in text:
+        return 'unsupported'
+    return None
+
+
+def cached_prompt_tokens(usage: Optional[Dict]) -> Optional[int]:
+    """Токены промпта, прочитанные из кэша провайдера (у каждого провайдера своё поле usage)"""
+    if not usage:
+        return None
+    for field in ('cache_read_input_tokens',    # Anthropic
+                  'cachedContentTokenCount',    # Gemini
+                  'prompt_cache_hit_tokens'):   # DeepSeek
+        if usage.get(field) is not None:
+            return usage[field]
+    # OpenAI / OpenRouter
+    return (usage.get('prompt_tokens_details') or {}).get('cached_tokens')
+
+
+async def close_http_clients():
+    """Закрыть все клиенты пула, принадлежащие текущему event loop (при остановке воркера)"""
+    loop = asyncio.get_running_loop()
+    with _http_clients_lock:
+        clients = [(k, c) for k, c in _http_clients.items() if k[0] is loop]
+        for k, _ in clients:
+            del _http_clients[k]
+    for _, client in clients:
+        await client.aclose()
+
+
 class AIAdapterService:
     """Универсальный адаптер для работы с разными AI провайдерами"""
 
@@ -87,7 +281,8 @@ class AIAdapterService:
                               temperature: float = None, max_tokens: int = None,
                               expected_output_multiplier: float = None,
                               min_output_tokens: int = None,
-                              disable_thinking: bool = False) -> Dict:
+                              disable_thinking: bool = False,
+                              prompt_prefix_chars: int = None) -> Dict:
         """
         Генерация контента через выбранную модель
 
@@ -95,6 +290,8 @@ class AIAdapterService:
             expected_output_multiplier: Множитель для num_predict (для случаев когда выход содержит входные тексты, например alignment)
             min_output_tokens: Минимальное количество токенов для генерации (для больших ответов)
             disable_thinking: Отключить режим thinking для Gemini (экономия токенов на задачах без рассуждений)
+            prompt_prefix_chars: Длина начала user_prompt, общего для серии запросов (контекст главы) —
+                                 помечается для кэширования у провайдеров, которые это поддерживают
 
         Returns:
             Dict с результатом: {'success': bool, 'content': str, 'error': str}
@@ -102,21 +299,67 @@ class AIAdapterService:
         temperature = temperature or self.model.default_temperature
         max_tokens = max_tokens or self.model.max_output_tokens
 
+        # Бюджет RPM/TPM провайдера и ключа (общий для всех процессов воркера через Redis)
+        from app.services.rate_limiter import get_rate_limiter
+        api_key = self.model.api_key or (self.model.api_keys[0] if getattr(self.model, 'api_keys', None) else None)
+        rate_limiter = get_rate_limiter(self.model, api_key)
+        estimated_tokens = 0
+        if rate_limiter:
+            estimated_tokens = self._estimate_tokens(f"{system_prompt}\n{user_prompt}")
+            if not await rate_limiter.acquire_async(estimated_tokens):
+                return {
+                    'success': False,
+                    'error': f'Таймаут ожидания бюджета rate limit ({rate_limiter.name})',
+                    'error_type': 'rate_limit_wait'
+                }
+
+        result = await self._dispatch_generate(system_prompt, user_prompt, temperature, max_tokens,
+                                               expected_output_multiplier, min_output_tokens,
+                                               disable_thinking, prompt_prefix_chars)
+
+        if result.get('success'):
+            cached_tokens = cached_prompt_tokens(result.get('usage'))
+            if cached_tokens is not None:
+                result['cached_tokens'] = cached_tokens
+                if cached_tokens:
+                    logger.info(f"  💾 Кэш промпта: {cached_tokens:,} токенов из кэша провайдера")
+
+        if rate_limiter and result.get('success'):
+            # Досписываем фактические токены (ответ + погрешность оценки промпта)
+            usage = result.get('usage') or {}
+            total_tokens = (usage.get('total_tokens') or usage.get('totalTokenCount')
+                            or (usage.get('input_tokens') or 0) + (usage.get('output_tokens') or 0))
+            rate_limiter.debit(total_tokens - estimated_tokens)
+
+        return result
+
+    async def _dispatch_generate(self, system_prompt: str, user_prompt: str,
+                                 temperature: float, max_tokens: int,
+                                 expected_output_multiplier: float = None,
+                                 min_output_tokens: int = None,
+                                 disable_thinking: bool = False,
+                                 prompt_prefix_chars: int = None) -> Dict:
+        """Вызов провайдера модели"""
+        if not PROMPT_CACHE_ENABLED:
+            prompt_prefix_chars = None
         try:
             if self.model.provider == 'gemini':
                 return await self._call_gemini(system_prompt, user_prompt, temperature, max_tokens,
-                                               disable_thinking=disable_thinking)
+                                               disable_thinking=disable_thinking,
+                                               prompt_prefix_chars=prompt_prefix_chars)
             elif self.model.provider == 'openai':
                 return await self._call_openai(system_prompt, user_prompt, temperature, max_tokens)
             elif self.model.provider == 'anthropic':
-                return await self._call_anthropic(system_prompt, user_prompt, temperature, max_tokens)
+                return await self._call_anthropic(system_prompt, user_prompt, temperature, max_tokens,
+                                                  prompt_prefix_chars=prompt_prefix_chars)
             elif self.model.provider in ('ollama', 'ollama_turbo'):
                 return await self._call_ollama(system_prompt, user_prompt, temperature, max_tokens,
                                                expected_output_multiplier, min_output_tokens,
                                                disable_thinking=disable_thinking)
             elif self.model.provider == 'openrouter':
                 return await self._call_openrouter(system_prompt, user_prompt, temperature, max_tokens,
-                                                   disable_thinking=disable_thinking)
+                                                   disable_thinking=disable_thinking,
+                                                   prompt_prefix_chars=prompt_prefix_chars)
             elif self.model.provider == 'nvidia':
                 return await self._call_nvidia(system_prompt, user_prompt, temperature, max_tokens,
                                                disable_thinking=disable_thinking)
@@ -133,9 +376,79 @@ class AIAdapterService:
             error_msg = str(e) if str(e) else f"{type(e).__name__}: {repr(e)}"
             return {'success': False, 'error': error_msg}
 
+    @staticmethod
+    def _split_prompt_prefix(user_prompt: str, prompt_prefix_chars: Optional[int]) -> tuple:
+        """(общий префикс, остаток) user_prompt; префикс пустой, если его нет"""
+        if not prompt_prefix_chars or prompt_prefix_chars >= len(user_prompt):
+            return '', user_prompt
+        return user_prompt[:prompt_prefix_chars], user_prompt[prompt_prefix_chars:]
+
+    async def _get_or_create_gemini_cache(self, client: httpx.AsyncClient, api_key: str,
+                                          system_prompt: str, prefix: str) -> Optional[str]:
+        """
+        Явный кэш Gemini (cachedContents) для system-промпта и общего префикса.
+        Создаётся только для префиксов от GEMINI_CACHED_CONTENT_MIN_TOKENS токенов:
+        меньшие Gemini не принимает, а неявный кэш их и так учитывает.
+        """
+        if not prefix or GEMINI_CACHED_CONTENT_MIN_TOKENS <= 0 or self.model.model_id in _gemini_cache_rejected:
+            return None
+        min_tokens = max(GEMINI_CACHED_CONTENT_MIN_TOKENS, _gemini_cache_min_tokens.get(self.model.model_id, 0))
+        if self._estimate_tokens(f"{system_prompt}\n{prefix}") < min_tokens:
+            return None
+
+        cache_key = _gemini_cache_key(self.model.api_endpoint, api_key, self.model.model_id, system_prompt, prefix)
+        name = _get_gemini_cached_content(cache_key)
+        if name:
+            return name
+
+        loop = asyncio.get_running_loop()
+        with _gemini_cache_lock:
+            task = _gemini_cache_creating.get(cache_key)
+            if task is None or task.get_loop() is not loop:
+                task = loop.create_task(
+                    self._create_gemini_cache(client, api_key, system_prompt, prefix, cache_key)
+                )
+                _gemini_cache_creating[cache_key] = task
+                task.add_done_callback(lambda done: _forget_gemini_cache_creation(cache_key, done))
+        # shield: отмена одного ожидающего запроса не отменяет создание для остальных
+        return await asyncio.shield(task)
+
+    async def _create_gemini_cache(self, client: httpx.AsyncClient, api_key: str, system_prompt: str,
+                                   prefix: str, cache_key: str) -> Optional[str]:
+        """Создание cachedContents (одно на префикс, см. _get_or_create_gemini_cache)"""
+        response = await client.post(
+            f"{self.model.api_endpoint}/cachedContents",
+            params={'key': api_key},
+            json={
+                'model': f"models/{self.model.model_id}",
+                'contents': [{'role': 'user', 'parts': [{'text': system_prompt}, {'text': prefix}]}],
+                'ttl': f"{GEMINI_CACHED_CONTENT_TTL}s"
+            }
+        )
+        if response.status_code != 200:
+            rejection = _gemini_cache_rejection(response.text) if response.status_code == 400 else None
+            if rejection == 'unsupported':
+                _gemini_cache_rejected.add(self.model.model_id)
+            elif rejection == 'too_small':
+                # Оценка токенов завышена для этой модели: префиксы не больше этого не пробуем
+                estimated = self._estimate_tokens(f"{system_prompt}\n{prefix}")
+                with _gemini_cache_lock:
+                    _gemini_cache_min_tokens[self.model.model_id] = max(
+                        _gemini_cache_min_tokens.get(self.model.model_id, 0), estimated + 1
+                    )
+            logger.warning(f"Gemini cachedContents не создан ({response.status_code}): {response.text[:200]}")
+            return None
+
+        name = response.json().get('name')
+        if name:
+            _set_gemini_cached_content(cache_key, name, GEMINI_CACHED_CONTENT_TTL)
+            logger.info(f"  💾 Gemini cachedContents создан: {name} (TTL {GEMINI_CACHED_CONTENT_TTL}с)")
+        return name
+
     async def _call_gemini(self, system_prompt: str, user_prompt: str,
                           temperature: float, max_tokens: int,
-                          disable_thinking: bool = False) -> Dict:
+                          disable_thinking: bool = False,
+                          prompt_prefix_chars: int = None) -> Dict:
         """Вызов Gemini API (ротация ключей — в UniversalLLMTranslator)"""
         # Ключ приходит через self.model.api_key (от UniversalLLMTranslator через temp_model)
         # Fallback на api_keys[0] для прямого вызова без ротации
@@ -145,7 +458,7 @@ class AIAdapterService:
         if not api_key:
             return {'success': False, 'error': 'API ключ не указан'}
 
-        async with httpx.AsyncClient(timeout=300.0) as client:
+        async with _shared_http_client(self.model.api_endpoint, timeout=300.0) as client:
             url = f"{self.model.api_endpoint}/models/{self.model.model_id}:generateContent"
 
             actual_max_tokens = min(max_tokens, self.model.max_output_tokens)
@@ -165,23 +478,39 @@ class AIAdapterService:
                         'topP': 0.95,
                         'topK': 40
                     },
-                    'safetySettings': [
-                        {'category': 'HARM_CATEGORY_HATE_SPEECH', 'threshold': 'BLOCK_NONE'},
-                        {'category': 'HARM_CATEGORY_SEXUALLY_EXPLICIT', 'threshold': 'BLOCK_NONE'},
-                        {'category': 'HARM_CATEGORY_HARASSMENT', 'threshold': 'BLOCK_NONE'},
-                        {'category': 'HARM_CATEGORY_DANGEROUS_CONTENT', 'threshold': 'BLOCK_NONE'}
-                    ]
+                    'safetySettings': GEMINI_SAFETY_SETTINGS
                 }
 
             if disable_thinking:
                 request_body['generationConfig']['thinkingConfig'] = {'thinkingBudget': 0}
 
+            # System-промпт и общий префикс — из cachedContents, в запросе только остаток
+            prefix, rest = self._split_prompt_prefix(user_prompt, prompt_prefix_chars)
+            cached_content = None
+            if prefix:
+                try:
+                    cached_content = await self._get_or_create_gemini_cache(client, api_key, system_prompt, prefix)
+                except httpx.HTTPError as e:
+                    logger.warning(f"Gemini cachedContents недоступен: {e}")
+            if cached_content:
+                request_body['cachedContent'] = cached_content
+                request_body['contents'] = [{'role': 'user', 'parts': [{'text': rest}]}]
+
             response = await client.post(
                 url,
                 params={'key': api_key},
                 json=request_body
             )
 
+            if cached_content and response.status_code in (400, 403, 404):
+                # Кэш удалён или истёк раньше срока — повторяем запрос без него
+                _invalidate_gemini_cached_content(
+                    _gemini_cache_key(self.model.api_endpoint, api_key, self.model.model_id, system_prompt, prefix)
+                )
+                logger.warning(f"Gemini cachedContents {cached_content} отклонён ({response.status_code}), запрос без кэша")
+                return await self._call_gemini(system_prompt, user_prompt, temperature, max_tokens,
+                                               disable_thinking=disable_thinking)
+
             if response.status_code == 200:
                 data = response.json()
 
@@ -253,7 +582,7 @@ class AIAdapterService:
         actual_max_tokens = min(max_tokens, self.model.max_output_tokens)
         LogService.log_info(f"OpenAI запрос: {self.model.model_id} | Temperature: {temperature} | Max tokens: {actual_max_tokens:,} / {self.model.max_output_tokens:,}")
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with _shared_http_client(self.model.api_endpoint, timeout=60.0) as client:
             response = await client.post(
                 f"{self.model.api_endpoint}/chat/completions",
                 headers={
@@ -291,8 +620,9 @@ class AIAdapterService:
                 }
 
     async def _call_anthropic(self, system_prompt: str, user_prompt: str,
-                              temperature: float, max_tokens: int) -> Dict:
-        """Вызов Anthropic API"""
+                              temperature: float, max_tokens: int,
+                              prompt_prefix_chars: int = None) -> Dict:
+        """Вызов Anthropic API (system-промпт и общий префикс помечаются cache_control)"""
         if not self.model.api_key:
             return {'success': False, 'error': 'API ключ не указан'}
 
@@ -300,7 +630,7 @@ class AIAdapterService:
         actual_max_tokens = min(max_tokens, self.model.max_output_tokens)
         LogService.log_info(f"Anthropic запрос: {self.model.model_id} | Temperature: {temperature} | Max tokens: {actual_max_tokens:,} / {self.model.max_output_tokens:,}")
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with _shared_http_client(self.model.api_endpoint, timeout=60.0) as client:
             response = await client.post(
                 f"{self.model.api_endpoint}/messages",
                 headers={
@@ -310,9 +640,9 @@ class AIAdapterService:
                 },
                 json={
                     'model': self.model.model_id,
-                    'system': system_prompt,
+                    'system': self._cacheable_system_blocks(system_prompt),
                     'messages': [
-                        {'role': 'user', 'content': user_prompt}
+                        {'role': 'user', 'content': self._cacheable_user_blocks(user_prompt, prompt_prefix_chars)}
                     ],
                     'temperature': temperature,
                     'max_tokens': actual_max_tokens
@@ -338,6 +668,23 @@ class AIAdapterService:
                     'error': error_data.get('error', {}).get('message', f'HTTP {response.status_code}')
                 }
 
+    @staticmethod
+    def _cacheable_system_blocks(system_prompt: str):
+        """System-промпт с cache_control (формат Anthropic; OpenRouter принимает его же)"""
+        if not PROMPT_CACHE_ENABLED or not system_prompt:
+            return system_prompt
+        return [{'type': 'text', 'text': system_prompt, 'cache_control': {'type': 'ephemeral'}}]
+
+    def _cacheable_user_blocks(self, user_prompt: str, prompt_prefix_chars: Optional[int]):
+        """User-промпт: общий префикс отдельным блоком с cache_control, затем остаток"""
+        prefix, rest = self._split_prompt_prefix(user_prompt, prompt_prefix_chars)
+        if not prefix:
+            return user_prompt
+        return [
+            {'type': 'text', 'text': prefix, 'cache_control': {'type': 'ephemeral'}},
+            {'type': 'text', 'text': rest}
+        ]
+
     def _resolve_deepseek_thinking_params(self, disable_thinking: bool = False) -> Dict:
         """Вычислить параметры thinking/reasoning_effort для DeepSeek API.
 
@@ -418,7 +765,7 @@ class AIAdapterService:
             payload['temperature'] = temperature
         payload.update(thinking_params)
 
-        async with httpx.AsyncClient(timeout=600.0) as client:
+        async with _shared_http_client(self.model.api_endpoint, timeout=600.0) as client:
             response = await client.post(
                 f"{self.model.api_endpoint.rstrip('/')}/chat/completions",
                 headers={
@@ -627,7 +974,7 @@ class AIAdapterService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=1800.0) as client:
+            async with _shared_http_client(self.model.api_endpoint, timeout=1800.0) as client:
                 async with client.stream(
                     'POST',
                     f"{self.model.api_endpoint}/chat/completions",
@@ -813,22 +1160,27 @@ class AIAdapterService:
             headers['Authorization'] = f'Bearer {api_key}'
         # Увеличенный таймаут для Ollama (большие модели требуют времени на загрузку и обработку)
         try:
-            async with httpx.AsyncClient(timeout=1800.0) as client:  # 30 минут
-                # Сначала проверяем доступность модели
-                try:
-                    models_response = await client.get(f"{self.model.api_endpoint.rstrip('/api')}/api/tags", headers=headers)
-                    if models_response.status_code == 200:
-                        models_data = models_response.json()
-                        available_models = [m['name'] for m in models_data.get('models', [])]
-
-                        if self.model.model_id not in available_models:
-                            return {
-                                'success': False,
-                                'error': f'Модель {self.model.model_id} не найдена в Ollama',
-                                'available_models': available_models
-                            }
-                except httpx.ConnectError:
-                    return {'success': False, 'error': 'Не удалось подключиться к Ollama серверу'}
+            async with _shared_http_client(self.model.api_endpoint, timeout=1800.0) as client:  # 30 минут
+                # Сначала проверяем доступность модели (список моделей кэшируется на OLLAMA_TAGS_CACHE_TTL;
+                # если модели нет в кэше — перечитываем /api/tags, вдруг её только что загрузили)
+                tags_url = f"{self.model.api_endpoint.rstrip('/api')}/api/tags"
+                cached_models = _get_cached_ollama_models(tags_url)
+                if cached_models is None or self.model.model_id not in cached_models:
+                    try:
+                        models_response = await client.get(tags_url, headers=headers)
+                        if models_response.status_code == 200:
+                            models_data = models_response.json()
+                            available_models = [m['name'] for m in models_data.get('models', [])]
+                            _set_cached_ollama_models(tags_url, set(available_models))
+
+                            if self.model.model_id not in available_models:
+                                return {
+                                    'success': False,
+                                    'error': f'Модель {self.model.model_id} не найдена в Ollama',
+                                    'available_models': available_models
+                                }
+                    except httpx.ConnectError:
+                        return {'success': False, 'error': 'Не удалось подключиться к Ollama серверу'}
 
                 # Объединяем промпты для расчета размера
                 full_prompt = f"{system_prompt}\n{user_prompt}"
@@ -1149,6 +1501,8 @@ class AIAdapterService:
                         logger.error(f"⚠️ Все параллельные слоты Ollama заняты - нужно дождаться завершения текущего запроса")
                     elif 'not found' in error_detail_lower:
                         error_type = 'model_not_found'
+                        # Модель удалили с сервера — следующий запрос перепроверит /api/tags
+                        _invalidate_ollama_models(tags_url)
 
                     return {
                         'success': False,
@@ -1211,7 +1565,8 @@ class AIAdapterService:
 
     async def _call_openrouter(self, system_prompt: str, user_prompt: str,
                                temperature: float, max_tokens: int,
-                               disable_thinking: bool = False) -> Dict:
+                               disable_thinking: bool = False,
+                               prompt_prefix_chars: int = None) -> Dict:
         """Вызов OpenRouter API (OpenAI-совместимый формат) с динамическим расчетом max_tokens.
 
         max_tokens НЕ ограничивается hardcoded потолком — берётся min(estimated, model.max_output_tokens),
@@ -1265,12 +1620,21 @@ class AIAdapterService:
             f"reasoning: {(reasoning_block or {}).get('effort', 'off')}"
         )
 
+        messages = [
+            {'role': 'system', 'content': system_prompt},
+            {'role': 'user', 'content': user_prompt}
+        ]
+        # Anthropic и Gemini через OpenRouter кэшируют только помеченный cache_control префикс,
+        # остальные провайдеры (DeepSeek, OpenAI и т.п.) — автоматически
+        if (self.model.model_id or '').startswith(('anthropic/', 'google/')):
+            messages = [
+                {'role': 'system', 'content': self._cacheable_system_blocks(system_prompt)},
+                {'role': 'user', 'content': self._cacheable_user_blocks(user_prompt, prompt_prefix_chars)}
+            ]
+
         request_json = {
             'model': self.model.model_id,
-            'messages': [
-                {'role': 'system', 'content': system_prompt},
-                {'role': 'user', 'content': user_prompt}
-            ],
+            'messages': messages,
             'temperature': temperature,
             'max_tokens': actual_max_tokens,
         }
@@ -1280,7 +1644,7 @@ class AIAdapterService:
         try:
             # 30 минут timeout — DeepSeek-V4-Pro и другие reasoning модели через OpenRouter
             # на длинных промптах могут думать существенно дольше 2 минут.
-            async with httpx.AsyncClient(timeout=1800.0) as client:
+            async with _shared_http_client('https://openrouter.ai', timeout=1800.0) as client:
                 response = await client.post(
                     'https://openrouter.ai/api/v1/chat/completions',
                     headers={
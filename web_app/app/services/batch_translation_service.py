@@ -0,0 +1,275 @@
+"""
+Пакетный перевод глав через Batch API провайдера (массовый перевод без интерактивной задержки)
+
+1. Части всех глав уходят одним или несколькими пакетами; готовые части сохраняются
+   в контрольные точки (translation_checkpoint), поэтому прерванный пакетный перевод
+   и последующий обычный перевод не повторяют уже оплаченные части.
+2. Собранные главы проходят извлечение названия и валидацию; резюме и извлечение
+   терминов для прошедших валидацию глав — вторым пакетом.
+3. Термины и переводы сохраняются по порядку глав тем же кодом, что и в translate_chapter.
+
+Главы, не прошедшие валидацию или с непереведёнными частями, возвращаются вызывающему:
+обычный translate_chapter восстановит готовые части из контрольных точек и
+переведёт заново только проблемные.
+
+Контекст глав пакета строится из резюме, уже сохранённых в БД: резюме глав самого
+пакета появляются только после его завершения.
+"""
+import os
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from app import db
+from app.models import Chapter, PromptHistory
+from app.services.llm_batch_client import BATCH_CANCELLED, BatchError, get_batch_client
+from app.services.log_service import LogService
+from app.services.translation_checkpoint import TranslationCheckpoint
+from app.services.translator_service import (
+    TranslationContext, TranslatorService, format_prompt_with_novel_context
+)
+
+LLM_BATCH_MAX_REQUESTS = int(os.getenv('LLM_BATCH_MAX_REQUESTS', '500'))
+
+
+class BatchTranslationService:
+    """
+    Пакетный перевод глав одной новеллы.
+
+    Пример:
+        service = BatchTranslationService(TranslatorService(config=config))
+        if service.is_supported():
+            result = service.translate_chapters(chapters, should_stop=lambda: cancelled)
+            # {'translated': [id, ...], 'deferred': [id, ...], 'cancelled': False}
+    """
+
+    def __init__(self, translator_service: TranslatorService):
+        self.translator_service = translator_service
+        self.translator = translator_service.translator
+        self.model = getattr(self.translator, 'model', None)
+        self.client = get_batch_client(self.model) if self.model is not None else None
+
+    def is_supported(self) -> bool:
+        return self.client is not None
+
+    def translate_chapters(self, chapters: List[Chapter],
+                           should_stop: Callable[[], bool] = None) -> Dict:
+        """
+        Returns:
+            {'translated': ID сохранённых глав, 'deferred': ID глав для обычного перевода,
+             'cancelled': пакет отменён}
+        """
+        result = {'translated': [], 'deferred': [], 'cancelled': False}
+        chapters = [chapter for chapter in chapters if chapter.status not in ('translated', 'edited', 'aligned')]
+        if not chapters:
+            return result
+        novel = chapters[0].novel
+
+        prompt_template = novel.get_prompt_template()
+        if not prompt_template:
+            raise ValueError(f"Не найден шаблон промпта для новеллы {novel.id}")
+        translation_prompt = format_prompt_with_novel_context(prompt_template.translation_prompt, novel)
+        summary_prompt = format_prompt_with_novel_context(
+            prompt_template.summary_prompt, novel
+        ) if prompt_template.summary_prompt else None
+        terms_prompt = format_prompt_with_novel_context(
+            prompt_template.terms_extraction_prompt, novel
+        ) if prompt_template.terms_extraction_prompt else None
+        temperature = (novel.config or {}).get('translation_temperature', 0.1)
+
+        # 1. Перевод частей (недостающих в контрольных точках)
+        jobs = {}
+        requests = []
+        for chapter in chapters:
+            context = TranslationContext(chapter.novel_id, chapter.original_text)
+            context_prompt = self.translator_service._chapter_context_prompt(chapter, context)
+            parts = self.translator_service.split_long_text(
+                self.translator_service.preprocess_text(chapter.original_text)
+            )
+            translated = TranslationCheckpoint.load(chapter.id, parts, translation_prompt, temperature)
+            jobs[chapter.id] = {'chapter': chapter, 'context': context, 'parts': parts, 'translated': translated}
+
+            for index, part in enumerate(parts):
+                if index not in translated:
+                    requests.append({
+                        'custom_id': f"c{chapter.id}-p{index}",
+                        'system_prompt': translation_prompt,
+                        'user_prompt': self.translator._build_translation_prompt(part, context_prompt),
+                        'temperature': temperature,
+                        'max_tokens': self.model.max_output_tokens,
+                        'prompt_type': 'translation',
+                        'chapter_id': chapter.id
+                    })
+
+        LogService.log_info(
+            f"📦 [Novel:{novel.id}] Пакетный перевод: {len(chapters)} глав, {len(requests)} частей в пакет "
+            f"({self.model.provider}/{self.model.model_id})",
+            novel_id=novel.id
+        )
+        responses = self._run_batches(requests, f"novel-{novel.id}-translation", should_stop)
+        if responses is None:
+            result['cancelled'] = True
+            return result
+
+        for request in requests:
+            response = responses.get(request['custom_id'])
+            if not response or not response.get('success'):
+                continue
+            job = jobs[request['chapter_id']]
+            index = int(request['custom_id'].rsplit('-p', 1)[1])
+            job['translated'][index] = response['content']
+            TranslationCheckpoint.save(job['chapter'].id, index, job['parts'][index],
+                                       translation_prompt, temperature, response['content'])
+
+        # 2. Сборка и валидация, затем резюме и термины вторым пакетом
+        ready = []
+        requests = []
+        for job in jobs.values():
+            chapter = job['chapter']
+            if len(job['translated']) < len(job['parts']):
+                LogService.log_warning(
+                    f"⚠️ [Novel:{novel.id}, Ch:{chapter.chapter_number}] Пакет вернул "
+                    f"{len(job['translated'])}/{len(job['parts'])} частей — глава уходит в обычный перевод",
+                    novel_id=novel.id, chapter_id=chapter.id
+                )
+                result['deferred'].append(chapter.id)
+                continue
+
+            full_translation = '\n\n'.join(job['translated'][index] for index in range(len(job['parts'])))
+            job['title'], job['content'] = self.translator_service.extract_title_and_content(full_translation)
+            job['validation'] = self.translator_service.validate_translation(
+                chapter.original_text, job['content'], chapter.chapter_number
+            )
+            if job['validation']['critical']:
+                LogService.log_warning(
+                    f"⚠️ [Novel:{novel.id}, Ch:{chapter.chapter_number}] Валидация не пройдена "
+                    f"({job['validation']['critical_issues']}) — глава уходит в обычный перевод",
+                    novel_id=novel.id, chapter_id=chapter.id
+                )
+                result['deferred'].append(chapter.id)
+                continue
+
+            ready.append(job)
+            if summary_prompt:
+                requests.append({
+                    'custom_id': f"c{chapter.id}-s",
+                    'system_prompt': summary_prompt,
+                    'user_prompt': self.translator._build_summary_prompt(
+                        job['content'], job['context']._format_context_glossary()
+                    ),
+                    'temperature': self.translator.SUMMARY_TEMPERATURE,
+                    'max_tokens': self.model.max_output_tokens,
+                    'prompt_type': 'summary',
+                    'chapter_id': chapter.id
+                })
+            if terms_prompt:
+                requests.append({
+                    'custom_id': f"c{chapter.id}-t",
+                    'system_prompt': terms_prompt,
+                    'user_prompt': self.translator._build_terms_prompt(
+                        chapter.original_text, job['context'].glossary, chapter.original_text
+                    ),
+                    'temperature': self.translator.TERMS_TEMPERATURE,
+                    'max_tokens': self.model.max_output_tokens,
+                    'prompt_type': 'terms_extraction',
+                    'chapter_id': chapter.id
+                })
+
+        responses = self._run_batches(requests, f"novel-{novel.id}-postprocess", should_stop)
+        if responses is None:
+            # Переводы частей уже в контрольных точках — обычный перевод их подхватит
+            result['cancelled'] = True
+            return result
+
+        # 3. Термины и переводы — по порядку глав
+        for job in sorted(ready, key=lambda job: job['chapter'].chapter_number):
+            chapter = job['chapter']
+            summary_response = responses.get(f"c{chapter.id}-s") or {}
+            terms_response = responses.get(f"c{chapter.id}-t") or {}
+            summary = summary_response.get('content') if summary_response.get('success') else None
+
+            if terms_response.get('success'):
+                new_terms = self.translator_service.parse_extraction_result(terms_response['content'])
+                if any(new_terms.values()):
+                    self.translator_service.save_new_terms(new_terms, chapter.novel_id, chapter.chapter_number)
+
+            title = self.translator_service._resolve_chapter_title(chapter, job['title'], job['context'])
+            self.translator_service._save_chapter_translation(
+                chapter, title, job['content'], summary, job['validation'],
+                template_name=prompt_template.name, parts_count=len(job['parts']),
+                translation_method='batch'
+            )
+            result['translated'].append(chapter.id)
+
+        LogService.log_info(
+            f"📦 [Novel:{novel.id}] Пакетный перевод завершён: сохранено {len(result['translated'])}, "
+            f"в обычный перевод {len(result['deferred'])}",
+            novel_id=novel.id
+        )
+        return result
+
+    def _run_batches(self, requests: List[Dict], display_name: str,
+                     should_stop: Callable[[], bool] = None) -> Optional[Dict[str, Dict]]:
+        """
+        Отправка запросов пакетами по LLM_BATCH_MAX_REQUESTS и ожидание всех.
+
+        Returns:
+            {custom_id: результат} (неудачные пакеты просто не дают результатов) или None при отмене
+        """
+        if not requests:
+            return {}
+
+        batch_ids = []
+        for offset in range(0, len(requests), LLM_BATCH_MAX_REQUESTS):
+            chunk = requests[offset:offset + LLM_BATCH_MAX_REQUESTS]
+            try:
+                batch_id = self.client.submit(chunk, f"{display_name}-{offset // LLM_BATCH_MAX_REQUESTS + 1}")
+            except (BatchError, httpx.HTTPError) as e:
+                LogService.log_error(f"❌ Не удалось создать пакет {display_name}: {e}")
+                continue
+            LogService.log_info(f"📦 Пакет {batch_id} создан: {len(chunk)} запросов")
+            batch_ids.append(batch_id)
+
+        responses = {}
+        for batch_id in batch_ids:
+            try:
+                state = self.client.wait(batch_id, should_stop)
+                if state == BATCH_CANCELLED and should_stop and should_stop():
+                    for pending_id in batch_ids:
+                        self.client.cancel(pending_id)
+                    return None
+                LogService.log_info(f"📦 Пакет {batch_id}: {state}")
+                responses.update(self.client.results(batch_id))
+            except (BatchError, httpx.HTTPError) as e:
+                # Запросы без результата переводятся обычным конвейером
+                LogService.log_error(f"❌ Не удалось получить результаты пакета {batch_id}: {e}")
+
+        self._save_prompt_history(requests, responses)
+        return responses
+
+    def _save_prompt_history(self, requests: List[Dict], responses: Dict[str, Dict]):
+        """История промптов пакета одним коммитом"""
+        if not getattr(self.translator, 'save_prompt_history', False):
+            return
+        from app.services.ai_adapter_service import cached_prompt_tokens
+
+        for request in requests:
+            response = responses.get(request['custom_id']) or {'success': False, 'error': 'Нет результата в пакете'}
+            usage = response.get('usage') or {}
+            db.session.add(PromptHistory(
+                chapter_id=request['chapter_id'],
+                prompt_type=request['prompt_type'],
+                system_prompt=request['system_prompt'],
+                user_prompt=request['user_prompt'],
+                response=response.get('content'),
+                model_used=self.model.model_id,
+                temperature=request['temperature'],
+                tokens_used=usage.get('totalTokenCount') or (
+                    (usage.get('input_tokens') or 0) + (usage.get('output_tokens') or 0)
+                ) or None,
+                cached_tokens=cached_prompt_tokens(usage),
+                finish_reason=response.get('finish_reason'),
+                success=bool(response.get('success')),
+                error_message=response.get('error')
+            ))
+        db.session.commit()
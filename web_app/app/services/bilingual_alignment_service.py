@@ -1,21 +1,34 @@
 """
 Сервис для LLM-выравнивания китайского оригинала и русского перевода
 """
+import asyncio
 import json
 import logging
+import os
 import time
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 from app import db
-from app.models import Chapter, BilingualAlignment, BilingualPromptTemplate, AIModel
-from app.services.universal_llm_translator import UniversalLLMTranslator
+from app.models import Chapter, BilingualAlignment, BilingualPromptTemplate, AIModel, GlossaryItem
+from app.services.universal_llm_translator import UniversalLLMTranslator, worker_loop
 from app.services.original_aware_editor_service import ProhibitedContentError
 from app.services.bilingual_prompt_template_service import BilingualPromptTemplateService
 from app.services.log_service import LogService
+from app.utils.sentence_aligner import SentenceAligner
 
 logger = logging.getLogger(__name__)
 
+# Порционное выравнивание: максимальный размер порции по китайскому тексту (0 — вся глава одним запросом)
+ALIGNMENT_CHUNK_CHARS = int(os.getenv('ALIGNMENT_CHUNK_CHARS', '3000'))
+# Сколько порций одной главы выравнивается одновременно
+ALIGNMENT_CHUNK_CONCURRENCY = int(os.getenv('ALIGNMENT_CHUNK_CONCURRENCY', '3'))
+# Движок выравнивания: llm — только LLM; hybrid — статистика, в LLM только неуверенные участки;
+# statistical — только статистика (без запросов к LLM)
+ALIGNMENT_ENGINE = os.getenv('ALIGNMENT_ENGINE', 'llm')
+# Порог уверенности статистического выравнивания, ниже которого участок отправляется в LLM (hybrid)
+ALIGNMENT_STATISTICAL_MIN_CONFIDENCE = float(os.getenv('ALIGNMENT_STATISTICAL_MIN_CONFIDENCE', '0.6'))
+
 
 class BilingualAlignmentService:
     """
@@ -28,7 +41,10 @@ class BilingualAlignmentService:
         model_id: Optional[int] = None,
         template_id: Optional[int] = None,
         max_technical_retries: int = 5,
-        technical_retry_delay: int = 30
+        technical_retry_delay: int = 30,
+        chunk_chars: Optional[int] = None,
+        chunk_concurrency: Optional[int] = None,
+        engine: Optional[str] = None
     ):
         """
         Args:
@@ -36,11 +52,20 @@ class BilingualAlignmentService:
             template_id: ID шаблона промпта (если None - используется дефолтный или из новеллы)
             max_technical_retries: Количество повторных попыток при технических ошибках (LLM error, JSON parsing) - по умолчанию 3
             technical_retry_delay: Задержка в секундах между retry при технических ошибках (по умолчанию 20)
+            chunk_chars: Размер порции по китайскому тексту для порционного выравнивания
+                (None — ALIGNMENT_CHUNK_CHARS, 0 — вся глава одним запросом)
+            chunk_concurrency: Число одновременно выравниваемых порций (None — ALIGNMENT_CHUNK_CONCURRENCY)
+            engine: 'llm', 'hybrid' или 'statistical' (None — ALIGNMENT_ENGINE)
         """
         self.model_id = model_id
         self.template_id = template_id
         self.max_technical_retries = max_technical_retries
         self.technical_retry_delay = technical_retry_delay
+        self.chunk_chars = ALIGNMENT_CHUNK_CHARS if chunk_chars is None else chunk_chars
+        self.chunk_concurrency = ALIGNMENT_CHUNK_CONCURRENCY if chunk_concurrency is None else chunk_concurrency
+        self.engine = engine or ALIGNMENT_ENGINE
+        # Статистические выравниватели по новеллам (глоссарий загружается один раз на сервис)
+        self._statistical_aligners: Dict[int, SentenceAligner] = {}
 
     def align_chapter(
         self,
@@ -107,6 +132,10 @@ class BilingualAlignmentService:
                 )
             return mono_alignment
 
+        # Выравнивание без LLM
+        if self.engine == 'statistical':
+            return self._statistical_alignment(russian_text, chinese_text, chapter, save_to_cache)
+
         # 3. Получаем шаблон промпта
         template = self._get_template(chapter.novel)
         if not template:
@@ -115,7 +144,7 @@ class BilingualAlignmentService:
                 novel_id=chapter.novel_id,
                 chapter_id=chapter.id
             )
-            return self._fallback_regex_alignment(russian_text, chinese_text, chapter)
+            return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
 
         # 4. Определение модели для выравнивания
         # Приоритет: явно переданная → из шаблона → дефолтная (None)
@@ -151,12 +180,29 @@ class BilingualAlignmentService:
                 novel_id=chapter.novel_id,
                 chapter_id=chapter.id
             )
-            return self._fallback_regex_alignment(russian_text, chinese_text, chapter)
+            return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
         translator = UniversalLLMTranslator(ai_model)
         translator.current_chapter_id = chapter.id
         translator.current_prompt_type = 'alignment'
         translator.set_save_prompt_history(False)
 
+        # Гибридный режим: в LLM уходят только участки с низкой уверенностью статистики
+        if self.engine == 'hybrid':
+            hybrid_alignments = self._align_chapter_hybrid(
+                chapter, template, translator, ai_model,
+                russian_text, chinese_text, coverage_thresholds, save_to_cache
+            )
+            if hybrid_alignments is not None:
+                return hybrid_alignments
+
+        # Длинные главы с совпадающей разбивкой на абзацы выравниваем порциями
+        chunks = self._split_into_chunks(russian_text, chinese_text)
+        if len(chunks) > 1:
+            return self._align_chapter_chunked(
+                chapter, chunks, template, translator, ai_model,
+                russian_text, chinese_text, coverage_thresholds, save_to_cache
+            )
+
         alignment_result = None
         quality_score = 0.0
         coverage_ru = 0.0
@@ -230,11 +276,11 @@ class BilingualAlignmentService:
                     # Если ответ обрезан по MAX_TOKENS — retry бесполезен
                     if finish_reason in ('MAX_TOKENS', 'LENGTH'):
                         LogService.log_warning(
-                            f"{log_prefix} ⚠️ Ответ обрезан ({finish_reason}) — используем fallback regex",
+                            f"{log_prefix} ⚠️ Ответ обрезан ({finish_reason}) — используем статистический fallback",
                             novel_id=chapter.novel_id,
                             chapter_id=chapter.id
                         )
-                        return self._fallback_regex_alignment(russian_text, chinese_text, chapter)
+                        return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
 
                     # Парсинг JSON ответа
                     alignment_result = self._parse_llm_response(response)
@@ -304,11 +350,11 @@ class BilingualAlignmentService:
                 else:
                     # При ошибках парсинга JSON - используем fallback
                     LogService.log_warning(
-                        f"{log_prefix} ⚠️ Ошибки парсинга JSON - используем fallback regex",
+                        f"{log_prefix} ⚠️ Ошибки парсинга JSON - используем статистический fallback",
                         novel_id=chapter.novel_id,
                         chapter_id=chapter.id
                     )
-                    return self._fallback_regex_alignment(russian_text, chinese_text, chapter)
+                    return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
 
             # Технический успех - теперь проверяем качество и покрытие
             is_valid, quality_score, coverage_ru, coverage_zh, avg_confidence = self._validate_alignment(
@@ -324,7 +370,7 @@ class BilingualAlignmentService:
                     chapter_id=chapter.id
                 )
                 if coverage_attempt == max_coverage_attempts:
-                    return self._fallback_regex_alignment(russian_text, chinese_text, chapter)
+                    return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
                 # Переходим к следующему порогу покрытия
                 continue
 
@@ -364,7 +410,7 @@ class BilingualAlignmentService:
                         novel_id=chapter.novel_id,
                         chapter_id=chapter.id
                     )
-                    return self._fallback_regex_alignment(russian_text, chinese_text, chapter)
+                    return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
 
             # Все проверки пройдены!
             LogService.log_info(
@@ -376,7 +422,7 @@ class BilingualAlignmentService:
 
         # Если все попытки не дали результата
         if not alignment_result:
-            return self._fallback_regex_alignment(russian_text, chinese_text, chapter)
+            return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
 
         # 7. Сохранение в кэш
         if save_to_cache:
@@ -393,6 +439,360 @@ class BilingualAlignmentService:
 
         return alignment_result.get('alignments', [])
 
+    def _split_into_chunks(self, russian_text: str, chinese_text: str) -> List[Tuple[str, str]]:
+        """
+        Разбиение главы на порции по якорям-абзацам.
+
+        Абзацы i-й русский ↔ i-й китайский считаются соответствующими, только если
+        их количество совпадает; порции набираются из подряд идущих абзацев до chunk_chars
+        китайских символов. Если якорей нет — одна порция (вся глава).
+        """
+        if self.chunk_chars <= 0 or len(chinese_text) <= self.chunk_chars:
+            return [(russian_text, chinese_text)]
+
+        pairs = self._paragraph_anchors(russian_text, chinese_text)
+        if not pairs:
+            return [(russian_text, chinese_text)]
+
+        chunks = []
+        ru_parts, zh_parts, zh_length = [], [], 0
+        for ru, zh in pairs:
+            if zh_parts and zh_length + len(zh) > self.chunk_chars:
+                chunks.append(('\n\n'.join(ru_parts), '\n\n'.join(zh_parts)))
+                ru_parts, zh_parts, zh_length = [], [], 0
+            ru_parts.append(ru)
+            zh_parts.append(zh)
+            zh_length += len(zh)
+        if zh_parts:
+            chunks.append(('\n\n'.join(ru_parts), '\n\n'.join(zh_parts)))
+
+        return chunks
+
+    @staticmethod
+    def _paragraph_anchors(russian_text: str, chinese_text: str) -> Optional[List[Tuple[str, str]]]:
+        """Пары абзацев (ru, zh), если разбивка по пустым строкам или по строкам совпадает"""
+        for separator in ('\n\n', '\n'):
+            ru_paragraphs = [p.strip() for p in russian_text.split(separator) if p.strip()]
+            zh_paragraphs = [p.strip() for p in chinese_text.split(separator) if p.strip()]
+            if len(ru_paragraphs) > 1 and len(ru_paragraphs) == len(zh_paragraphs):
+                return list(zip(ru_paragraphs, zh_paragraphs))
+        return None
+
+    def _align_chapter_chunked(
+        self,
+        chapter: Chapter,
+        chunks: List[Tuple[str, str]],
+        template: BilingualPromptTemplate,
+        translator: UniversalLLMTranslator,
+        ai_model: AIModel,
+        russian_text: str,
+        chinese_text: str,
+        coverage_thresholds: Dict[int, float],
+        save_to_cache: bool,
+        prealigned: Optional[Dict[int, List[Dict]]] = None,
+        method: str = 'llm_chunked'
+    ) -> List[Dict]:
+        """
+        Порционное выравнивание: порции отправляются параллельно, повторяются только
+        неудавшиеся (с тем же снижением порога покрытия, что и для целой главы),
+        результат склеивается и проверяется на покрытие всей главы.
+
+        prealigned — уже выровненные порции {индекс: пары}, они в LLM не отправляются.
+        """
+        from app.models import Novel
+
+        log_prefix = f"[Novel:{chapter.novel_id}, Ch:{chapter.chapter_number}]"
+        prealigned = prealigned or {}
+        results: List[Optional[List[Dict]]] = [prealigned.get(index) for index in range(len(chunks))]
+        pending = [index for index in range(len(chunks)) if index not in prealigned]
+        llm_chunks = len(pending)
+        last_error_is_network = False
+
+        LogService.log_info(
+            f"{log_prefix} 🧩 Порционное выравнивание: {llm_chunks} из {len(chunks)} порций через LLM, "
+            f"до {self.chunk_concurrency} одновременно",
+            novel_id=chapter.novel_id,
+            chapter_id=chapter.id
+        )
+
+        for attempt in range(1, self.max_technical_retries + 1):
+            novel_check = Novel.query.get(chapter.novel_id)
+            if novel_check and novel_check.status == 'alignment_cancelled':
+                LogService.log_warning(
+                    f"{log_prefix} 🛑 Выравнивание отменено пользователем (статус: alignment_cancelled)",
+                    novel_id=chapter.novel_id,
+                    chapter_id=chapter.id
+                )
+                return []
+
+            min_volume_coverage = coverage_thresholds[min(attempt, len(coverage_thresholds))]
+            start_time = datetime.now()
+            responses = worker_loop.run(self._align_chunks_async(
+                translator, template, [chunks[index] for index in pending]
+            ))
+            duration = (datetime.now() - start_time).total_seconds()
+
+            failed = []
+            for index, response in zip(pending, responses):
+                ru_chunk, zh_chunk = chunks[index]
+
+                if isinstance(response, ProhibitedContentError):
+                    LogService.log_warning(
+                        f"{log_prefix} ⚠️ PROHIBITED_CONTENT в порции {index + 1} — пропускаем главу (контент заблокирован)",
+                        novel_id=chapter.novel_id,
+                        chapter_id=chapter.id
+                    )
+                    return []
+
+                if isinstance(response, BaseException):
+                    error_str = str(response)
+                    last_error_is_network = any(x in error_str for x in [
+                        'timeout', 'i/o timeout', 'connection refused', 'dial tcp',
+                        'lookup', 'no such host', 'network is unreachable'
+                    ])
+                    LogService.log_error(
+                        f"{log_prefix} ❌ Порция {index + 1}/{len(chunks)}: ошибка (попытка {attempt}/{self.max_technical_retries}): {response}",
+                        novel_id=chapter.novel_id,
+                        chapter_id=chapter.id
+                    )
+                    failed.append(index)
+                    continue
+
+                is_valid = self._validate_alignment(response, ru_chunk, zh_chunk)[0]
+                volume_valid, volume_stats = self._check_volume_integrity(
+                    response, ru_chunk, zh_chunk, min_coverage=min_volume_coverage
+                )
+                if not (is_valid and volume_valid):
+                    LogService.log_warning(
+                        f"{log_prefix} ⚠️ Порция {index + 1}/{len(chunks)}: потеря текста или низкое качество "
+                        f"(RU {volume_stats.get('coverage_ru_percent', '0%')}, ZH {volume_stats.get('coverage_zh_percent', '0%')}, "
+                        f"порог {min_volume_coverage * 100:.0f}%)",
+                        novel_id=chapter.novel_id,
+                        chapter_id=chapter.id
+                    )
+                    last_error_is_network = False
+                    failed.append(index)
+                    continue
+
+                results[index] = response
+
+            LogService.log_info(
+                f"{log_prefix} Порции выровнены за {duration:.1f}с: успешно {len(pending) - len(failed)}/{len(pending)} "
+                f"(попытка {attempt}/{self.max_technical_retries})",
+                novel_id=chapter.novel_id,
+                chapter_id=chapter.id
+            )
+
+            pending = failed
+            if not pending:
+                break
+
+            if attempt < self.max_technical_retries:
+                LogService.log_info(
+                    f"{log_prefix} ⏳ Задержка {self.technical_retry_delay} сек перед повтором {len(pending)} порций...",
+                    novel_id=chapter.novel_id,
+                    chapter_id=chapter.id
+                )
+                time.sleep(self.technical_retry_delay)
+
+        if pending:
+            if last_error_is_network:
+                LogService.log_error(
+                    f"{log_prefix} ❌ Сетевые ошибки - пропускаем главу (можно пересопоставить позже)",
+                    novel_id=chapter.novel_id,
+                    chapter_id=chapter.id
+                )
+                raise Exception(f"Сетевая ошибка при сопоставлении главы {chapter.chapter_number}")
+
+            # Статистическое выравнивание только для неудавшихся порций, остальные остаются от LLM
+            LogService.log_warning(
+                f"{log_prefix} ⚠️ {len(pending)} порций не выровнены LLM — выравниваем их статистически",
+                novel_id=chapter.novel_id,
+                chapter_id=chapter.id
+            )
+            aligner = self._get_statistical_aligner(chapter.novel_id)
+            for index in pending:
+                results[index] = aligner.align_texts(*chunks[index])
+
+        alignments = [pair for chunk_alignments in results for pair in chunk_alignments]
+
+        # Склейка должна покрывать всю главу
+        is_valid, quality_score, coverage_ru, coverage_zh, avg_confidence = self._validate_alignment(
+            alignments, russian_text, chinese_text
+        )
+        volume_valid, volume_stats = self._check_volume_integrity(
+            alignments, russian_text, chinese_text,
+            min_coverage=coverage_thresholds[len(coverage_thresholds)]
+        )
+        if not (is_valid and volume_valid):
+            LogService.log_error(
+                f"{log_prefix} ❌ Склеенное выравнивание не покрывает главу (RU {volume_stats.get('coverage_ru_percent', '0%')}, "
+                f"ZH {volume_stats.get('coverage_zh_percent', '0%')}), используем fallback",
+                novel_id=chapter.novel_id,
+                chapter_id=chapter.id
+            )
+            return self._fallback_statistical_alignment(russian_text, chinese_text, chapter)
+
+        LogService.log_info(
+            f"{log_prefix} ✅ Выравнивание успешно: {len(alignments)} пар из {len(chunks)} порций, качество {quality_score:.2f}, "
+            f"покрытие RU {volume_stats['coverage_ru_percent']}, ZH {volume_stats['coverage_zh_percent']}",
+            novel_id=chapter.novel_id,
+            chapter_id=chapter.id
+        )
+
+        if save_to_cache:
+            self._save_to_cache(
+                chapter=chapter,
+                alignment_data={
+                    'alignments': alignments,
+                    'stats': {
+                        'total_pairs': len(alignments),
+                        'method': method,
+                        'chunks': len(chunks),
+                        'llm_chunks': llm_chunks,
+                        'fallback_chunks': len(pending)
+                    }
+                },
+                quality_score=quality_score,
+                coverage_ru=coverage_ru,
+                coverage_zh=coverage_zh,
+                avg_confidence=avg_confidence,
+                model_name=ai_model.name,
+                template_id=template.id
+            )
+
+        return alignments
+
+    def _get_statistical_aligner(self, novel_id: int) -> SentenceAligner:
+        """Статистический выравниватель с якорями из глоссария новеллы"""
+        aligner = self._statistical_aligners.get(novel_id)
+        if aligner is None:
+            aligner = SentenceAligner(GlossaryItem.get_chinese_terms_dict(novel_id))
+            self._statistical_aligners[novel_id] = aligner
+        return aligner
+
+    def _statistical_alignment(
+        self,
+        russian_text: str,
+        chinese_text: str,
+        chapter: Chapter,
+        save_to_cache: bool
+    ) -> List[Dict]:
+        """Выравнивание главы без LLM (engine='statistical')"""
+        alignments = self._get_statistical_aligner(chapter.novel_id).align_texts(russian_text, chinese_text)
+        if save_to_cache and alignments:
+            _, quality_score, coverage_ru, coverage_zh, avg_confidence = self._validate_alignment(
+                alignments, russian_text, chinese_text
+            )
+            self._save_to_cache(
+                chapter=chapter,
+                alignment_data={
+                    'alignments': alignments,
+                    'stats': {'total_pairs': len(alignments), 'method': 'statistical'}
+                },
+                quality_score=quality_score,
+                coverage_ru=coverage_ru,
+                coverage_zh=coverage_zh,
+                avg_confidence=avg_confidence,
+                model_name='statistical',
+                template_id=None
+            )
+        return alignments
+
+    def _align_chapter_hybrid(
+        self,
+        chapter: Chapter,
+        template: BilingualPromptTemplate,
+        translator: UniversalLLMTranslator,
+        ai_model: AIModel,
+        russian_text: str,
+        chinese_text: str,
+        coverage_thresholds: Dict[int, float],
+        save_to_cache: bool
+    ) -> Optional[List[Dict]]:
+        """
+        Статистика первым проходом, LLM — только для участков с низкой уверенностью
+        (вместе с соседними парами как контекстом).
+
+        Returns:
+            Выравнивание или None, если неуверенных участков слишком много
+            и выгоднее обычное LLM-выравнивание главы
+        """
+        log_prefix = f"[Novel:{chapter.novel_id}, Ch:{chapter.chapter_number}]"
+        beads = self._get_statistical_aligner(chapter.novel_id).align_texts(russian_text, chinese_text)
+        if not beads:
+            return None
+
+        flagged = [bead['confidence'] < ALIGNMENT_STATISTICAL_MIN_CONFIDENCE for bead in beads]
+        if sum(flagged) > len(beads) / 2:
+            LogService.log_info(
+                f"{log_prefix} Статистика не уверена в {sum(flagged)}/{len(beads)} парах — выравниваем главу через LLM",
+                novel_id=chapter.novel_id,
+                chapter_id=chapter.id
+            )
+            return None
+
+        # Подряд идущие пары группируются в участки: уверенные и отправляемые в LLM
+        marked = [any(flagged[max(0, index - 1):index + 2]) for index in range(len(beads))]
+        segments: List[Tuple[bool, List[Dict]]] = []
+        for bead, is_marked in zip(beads, marked):
+            if segments and segments[-1][0] == is_marked:
+                segments[-1][1].append(bead)
+            else:
+                segments.append((is_marked, [bead]))
+
+        chunks, prealigned = [], {}
+        for index, (is_marked, group) in enumerate(segments):
+            ru_chunk = ' '.join(bead['ru'] for bead in group if bead['ru'])
+            zh_chunk = ''.join(bead['zh'] for bead in group)
+            chunks.append((ru_chunk, zh_chunk))
+            if not is_marked or not ru_chunk or not zh_chunk:
+                prealigned[index] = group
+
+        if len(prealigned) == len(chunks):
+            LogService.log_info(
+                f"{log_prefix} ✅ Статистическое выравнивание уверенно для всех {len(beads)} пар, LLM не нужен",
+                novel_id=chapter.novel_id,
+                chapter_id=chapter.id
+            )
+            return self._statistical_alignment(russian_text, chinese_text, chapter, save_to_cache)
+
+        return self._align_chapter_chunked(
+            chapter, chunks, template, translator, ai_model,
+            russian_text, chinese_text, coverage_thresholds, save_to_cache,
+            prealigned=prealigned, method='hybrid'
+        )
+
+    async def _align_chunks_async(
+        self,
+        translator: UniversalLLMTranslator,
+        template: BilingualPromptTemplate,
+        chunks: List[Tuple[str, str]]
+    ) -> List:
+        """Параллельные запросы по порциям; для каждой — список пар или исключение"""
+        semaphore = asyncio.Semaphore(max(1, self.chunk_concurrency))
+
+        async def align_one(russian_text: str, chinese_text: str) -> List[Dict]:
+            async with semaphore:
+                prompt = self._build_alignment_prompt(template, russian_text, chinese_text)
+                # finish_reason у переводчика общий для всех порций, поэтому обрезанный
+                # ответ распознаётся по невалидному JSON и повторяется как техническая ошибка
+                response = await translator.make_request_limited_async(
+                    system_prompt=template.system_prompt or "",
+                    user_prompt=prompt,
+                    temperature=template.temperature,
+                    expected_output_multiplier=4.0,
+                    min_output_tokens=16000,
+                    disable_thinking=True
+                )
+                if not response:
+                    raise Exception("Ошибка LLM: пустой ответ")
+                return self._parse_llm_response(response).get('alignments', [])
+
+        return await asyncio.gather(
+            *(align_one(ru, zh) for ru, zh in chunks), return_exceptions=True
+        )
+
     def _get_russian_text(self, chapter: Chapter) -> Optional[str]:
         """Получить лучший доступный русский перевод"""
         if chapter.edited_translation:
@@ -743,50 +1143,36 @@ class BilingualAlignmentService:
             for para in paragraphs
         ]
 
-    def _fallback_regex_alignment(
+    def _fallback_statistical_alignment(
         self,
         russian_text: str,
         chinese_text: str,
         chapter: Chapter
     ) -> List[Dict]:
-        """Fallback на старый regex-метод при ошибках LLM"""
+        """Fallback на статистическое выравнивание при ошибках LLM"""
         log_prefix = f"[Novel:{chapter.novel_id}, Ch:{chapter.chapter_number}]"
         LogService.log_warning(
-            f"{log_prefix} Используем fallback regex-выравнивание",
+            f"{log_prefix} Используем fallback статистическое выравнивание",
             novel_id=chapter.novel_id,
             chapter_id=chapter.id
         )
 
-        # Импортируем старый метод
-        from app.utils.text_alignment import BilingualTextAligner
-
-        aligned_pairs = BilingualTextAligner.align_sentences(russian_text, chinese_text)
-
-        # Конвертируем в новый формат
-        result = [
-            {
-                'ru': ru,
-                'zh': zh,
-                'type': 'unknown',
-                'confidence': 0.5
-            }
-            for ru, zh in aligned_pairs
-        ]
+        result = self._get_statistical_aligner(chapter.novel_id).align_texts(russian_text, chinese_text)
 
-        # Сохраняем в кэш с пометкой regex
+        # Сохраняем в кэш с пометкой fallback
         alignment_data = {
             'alignments': result,
             'stats': {
                 'total_pairs': len(result),
-                'method': 'regex_fallback'
+                'method': 'statistical_fallback'
             }
         }
 
         self._save_to_cache(
             chapter=chapter,
             alignment_data=alignment_data,
-            quality_score=0.5,  # Низкая оценка для regex
-            model_name='regex_fallback',
+            quality_score=0.5,  # Низкая оценка для fallback
+            model_name='statistical_fallback',
             template_id=None
         )
 
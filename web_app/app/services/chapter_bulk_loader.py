@@ -0,0 +1,139 @@
+"""
+Пакетная загрузка глав, переводов и выравниваний новеллы (для генерации EPUB)
+
+Вместо ленивой загрузки связи Chapter.translations (со всеми текстами всех версий)
+и отдельных запросов на каждую главу — несколько запросов на всю новеллу,
+только с нужными колонками. Последний перевод каждого типа выбирается оконной функцией.
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_
+
+from app import db
+from app.models import Chapter, Translation, BilingualAlignment
+
+
+class ChapterBulkLoader:
+    """Загрузка данных глав новеллы набором запросов на всю новеллу"""
+
+    @staticmethod
+    def load_translated_chapters(novel_id: int, chapter_numbers: Optional[List[int]] = None,
+                                 include_original: bool = False) -> List[Dict]:
+        """
+        Главы новеллы (по возрастанию номера) с последним отредактированным и последним
+        исходным переводом.
+
+        Returns:
+            [
+                {
+                    'id': int, 'number': int, 'original_title': str,
+                    'original_text': str,          # только при include_original=True
+                    'edited': {'text', 'title', 'quality_score'} | None,
+                    'current': {'text', 'title', 'summary'} | None,
+                    'translated_title': str | None # как Chapter.translated_title
+                },
+                ...
+            ]
+        """
+        columns = [Chapter.id, Chapter.chapter_number, Chapter.original_title]
+        if include_original:
+            columns.append(Chapter.original_text)
+
+        query = db.session.query(*columns).filter(Chapter.novel_id == novel_id)
+        if chapter_numbers:
+            query = query.filter(Chapter.chapter_number.in_(chapter_numbers))
+
+        chapters = []
+        for row in query.order_by(Chapter.chapter_number).all():
+            chapters.append({
+                'id': row.id,
+                'number': row.chapter_number,
+                'original_title': row.original_title,
+                'original_text': row.original_text if include_original else None,
+                'edited': None,
+                'current': None,
+                'translated_title': None
+            })
+
+        if not chapters:
+            return chapters
+
+        by_id = {chapter['id']: chapter for chapter in chapters}
+        if chapter_numbers:
+            chapter_ids = list(by_id)
+        else:
+            chapter_ids = ChapterBulkLoader._novel_chapter_ids(novel_id)
+
+        # Последняя редактура каждой главы (как Chapter.edited_translation)
+        is_edited = Translation.translation_type == 'edited'
+        for row in ChapterBulkLoader._latest_translations(
+                chapter_ids, is_edited,
+                Translation.translated_text, Translation.translated_title, Translation.quality_score):
+            if row.chapter_id in by_id:
+                by_id[row.chapter_id]['edited'] = {
+                    'text': row.translated_text,
+                    'title': row.translated_title,
+                    'quality_score': row.quality_score
+                }
+
+        # Последний не-редактурный перевод (как Chapter.current_translation)
+        not_edited = or_(Translation.translation_type != 'edited', Translation.translation_type.is_(None))
+        for row in ChapterBulkLoader._latest_translations(
+                chapter_ids, not_edited,
+                Translation.translated_text, Translation.translated_title, Translation.summary):
+            if row.chapter_id in by_id:
+                by_id[row.chapter_id]['current'] = {
+                    'text': row.translated_text,
+                    'title': row.translated_title,
+                    'summary': row.summary
+                }
+
+        # Название: последний перевод с валидным названием (как Chapter.translated_title)
+        titles = db.session.query(
+            Translation.chapter_id, Translation.translated_title
+        ).filter(
+            Translation.chapter_id.in_(chapter_ids),
+            Translation.translated_title.isnot(None)
+        ).order_by(Translation.id.desc())
+
+        for row in titles:
+            chapter = by_id.get(row.chapter_id)
+            if chapter and chapter['translated_title'] is None and Chapter.is_valid_title(row.translated_title):
+                chapter['translated_title'] = row.translated_title
+
+        return chapters
+
+    @staticmethod
+    def load_alignments(novel_id: int) -> Dict[int, List[Dict]]:
+        """Кэшированные выравнивания всех глав новеллы: {chapter_id: alignments}"""
+        rows = db.session.query(
+            BilingualAlignment.chapter_id, BilingualAlignment.alignment_data
+        ).filter(
+            BilingualAlignment.chapter_id.in_(ChapterBulkLoader._novel_chapter_ids(novel_id))
+        )
+        return {
+            row.chapter_id: (row.alignment_data or {}).get('alignments', [])
+            for row in rows
+        }
+
+    @staticmethod
+    def _novel_chapter_ids(novel_id: int):
+        """Подзапрос ID глав новеллы"""
+        return db.session.query(Chapter.id).filter(Chapter.novel_id == novel_id).scalar_subquery()
+
+    @staticmethod
+    def _latest_translations(chapter_ids, condition, *columns):
+        """Последний (по id) перевод каждой главы среди удовлетворяющих условию"""
+        ranked = db.session.query(
+            Translation.chapter_id,
+            *columns,
+            func.row_number().over(
+                partition_by=Translation.chapter_id,
+                order_by=Translation.id.desc()
+            ).label('rn')
+        ).filter(
+            Translation.chapter_id.in_(chapter_ids),
+            condition
+        ).subquery()
+
+        return db.session.query(ranked).filter(ranked.c.rn == 1).all()
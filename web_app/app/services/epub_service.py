@@ -28,6 +28,27 @@ logger = logging.getLogger(__name__)
 
 # Импортируем LogService для вывода в консоль
 from app.services.log_service import LogService
+from app.utils.epub_writer import StreamingEpubWriter
+from app.utils.epub_render_cache import RenderedChapterCache, content_hash
+
+# Число процессов для рендеринга глав двуязычного EPUB (0 — по числу ядер)
+EPUB_RENDER_WORKERS = int(os.getenv('EPUB_RENDER_WORKERS', '0'))
+
+# Движок выравнивания для глав без кэша при сборке двуязычного EPUB ('' — ALIGNMENT_ENGINE).
+# statistical — без запросов к LLM; такие выравнивания не сохраняются, чтобы не подменять LLM-выравнивание
+EPUB_ALIGNMENT_ENGINE = os.getenv('EPUB_ALIGNMENT_ENGINE', '')
+
+# Глоссарий процесса-воркера рендеринга (передаётся один раз через initializer)
+_render_glossary: Dict = {}
+
+
+def _init_bilingual_render_worker(glossary_dict: Dict):
+    global _render_glossary
+    _render_glossary = glossary_dict
+
+
+def _render_bilingual_chapter_job(job: Dict) -> str:
+    return EPUBService._render_bilingual_chapter_html(job, _render_glossary)
 
 
 class EPUBService:
@@ -44,6 +65,8 @@ class EPUBService:
         # Создаем папку для EPUB файлов
         self.epub_dir = Path(app.instance_path) / 'epub_output'
         self.epub_dir.mkdir(exist_ok=True)
+        # Кэш отрендеренных глав: при пересборке рендерятся только изменившиеся
+        self.render_cache = RenderedChapterCache(self.epub_dir / 'render_cache')
 
     @staticmethod
     def clean_markdown(text: str) -> str:
@@ -74,33 +97,27 @@ class EPUBService:
 
     def get_edited_chapters_from_db(self, novel_id: int, chapter_numbers: Optional[List[int]] = None) -> List[Dict]:
         """Получение отредактированных глав из базы данных web_app"""
-        from app.models import Chapter, Translation
-        from app import db
+        from app.services.chapter_bulk_loader import ChapterBulkLoader
 
-        # Получаем главы новеллы
-        query = Chapter.query.filter_by(novel_id=novel_id)
-        
-        if chapter_numbers:
-            query = query.filter(Chapter.chapter_number.in_(chapter_numbers))
-        
-        chapters = query.order_by(Chapter.chapter_number).all()
+        # Главы новеллы с последними переводами — несколькими запросами на всю новеллу
+        chapters = ChapterBulkLoader.load_translated_chapters(novel_id, chapter_numbers)
         
         result = []
         edited_count = 0
 
         for chapter in chapters:
             # Получаем лучший перевод (отредактированный или исходный)
-            edited_translation = chapter.edited_translation
-            current_translation = chapter.current_translation
+            edited_translation = chapter['edited']
+            current_translation = chapter['current']
 
             if edited_translation:
                 # Используем отредактированную версию
-                final_text = edited_translation.translated_text
+                final_text = edited_translation['text']
                 is_edited = True
-                quality_score = edited_translation.quality_score
+                quality_score = edited_translation['quality_score']
             elif current_translation:
                 # Используем исходный перевод
-                final_text = current_translation.translated_text
+                final_text = current_translation['text']
                 is_edited = False
                 quality_score = None
             else:
@@ -108,19 +125,19 @@ class EPUBService:
                 continue
 
             # Используем умную логику поиска названия (ищет валидное среди всех переводов)
-            final_title = chapter.translated_title
+            final_title = chapter['translated_title']
 
             if is_edited:
                 edited_count += 1
 
             # Очищаем Markdown разметку из заголовка для EPUB
-            clean_title = self.clean_markdown(final_title) if final_title else f"Глава {chapter.chapter_number}"
+            clean_title = self.clean_markdown(final_title) if final_title else f"Глава {chapter['number']}"
 
             result.append({
-                'number': chapter.chapter_number,
+                'number': chapter['number'],
                 'title': clean_title,
                 'content': final_text,
-                'summary': current_translation.summary if current_translation else None,
+                'summary': current_translation['summary'] if current_translation else None,
                 'is_edited': is_edited,
                 'quality_score': quality_score
             })
@@ -181,96 +198,66 @@ class EPUBService:
         prefix_mode = novel.epub_add_chapter_prefix or 'auto'
         prefix_text = novel.epub_chapter_prefix_text or 'Глава'
 
-        # Создаём книгу
-        book = epub.EpubBook()
-
-        # Метаданные
-        timestamp = datetime.now().strftime("%Y%m%d")
-        book.set_identifier(f'{novel.title.lower().replace(" ", "-")}-{timestamp}')
-        book.set_title(novel.title)
-        book.set_language('ru')
-        book.add_author(novel.author or 'Неизвестный автор')
-
-        # Добавляем описание
-        book.add_metadata('DC', 'description',
-            f'Перевод романа "{novel.title}" с редакторской правкой.')
-
-        # CSS стили
-        style = self._get_css_styles()
-
-        # Добавляем CSS
-        nav_css = epub.EpubItem(
-            uid="style_nav",
-            file_name="style/nav.css",
-            media_type="text/css",
-            content=style
-        )
-        book.add_item(nav_css)
-
-        # Создаём титульную страницу
-        title_page = self._create_title_page(novel)
-        book.add_item(title_page)
-
-        # Создаём страницу с информацией о редактировании
-        if any(ch['is_edited'] for ch in chapters):
-            edit_info_page = self._create_edit_info_page(chapters, prefix_mode, prefix_text)
-            book.add_item(edit_info_page)
-
-        # Создаём оглавление
-        toc_page = self._create_toc_page(chapters, prefix_mode, prefix_text)
-        book.add_item(toc_page)
-
-        # Список для навигации
-        toc_list = []
-        spine_list = ['nav', title_page]
-
-        if any(ch['is_edited'] for ch in chapters):
-            spine_list.append(edit_info_page)
+        has_edited = any(ch['is_edited'] for ch in chapters)
 
-        spine_list.append(toc_page)
+        # Определяем путь для сохранения
+        chapters_range = f"{chapters[0]['number']}-{chapters[-1]['number']}"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # Добавляем главы
-        for chapter in chapters:
-            ch = self._create_chapter_page(chapter, nav_css, prefix_mode, prefix_text)
-            book.add_item(ch)
-            spine_list.append(ch)
-            toc_list.append(ch)
+        # Добавляем пометку если есть отредактированные главы
+        edited_mark = "_edited" if has_edited else ""
 
-        # Настройка навигации
-        toc_sections = [
-            epub.Link('title.xhtml', 'Титульная страница', 'title'),
-        ]
+        filename = f"{novel.title.replace(' ', '_')}_{chapters_range}{edited_mark}_{timestamp}.epub"
+        epub_path = self.epub_dir / filename
 
-        if any(ch['is_edited'] for ch in chapters):
-            toc_sections.append(epub.Link('edit_info.xhtml', 'Информация о редактировании', 'edit_info'))
+        # Книга пишется в архив потоково: страницы не накапливаются в памяти
+        identifier_date = datetime.now().strftime("%Y%m%d")
+        with StreamingEpubWriter(
+            epub_path,
+            identifier=f'{novel.title.lower().replace(" ", "-")}-{identifier_date}',
+            title=novel.title,
+            language='ru',
+            author=novel.author or 'Неизвестный автор',
+            description=f'Перевод романа "{novel.title}" с редакторской правкой.'
+        ) as writer:
+            # CSS стили
+            nav_css = epub.EpubItem(
+                uid="style_nav",
+                file_name="style/nav.css",
+                media_type="text/css",
+                content=self._get_css_styles()
+            )
+            writer.add_item(nav_css)
 
-        toc_sections.extend([
-            epub.Link('toc.xhtml', 'Оглавление', 'toc'),
-            (epub.Section('Главы'), toc_list[:len(chapters)])
-        ])
+            # Титульная страница
+            writer.add_page(self._create_title_page(novel))
 
-        book.toc = tuple(toc_sections)
+            # Страница с информацией о редактировании
+            if has_edited:
+                writer.add_page(self._create_edit_info_page(chapters, prefix_mode, prefix_text))
 
-        # Добавляем NCX и Nav файлы
-        book.add_item(epub.EpubNcx())
-        book.add_item(epub.EpubNav())
+            # Оглавление
+            writer.add_page(self._create_toc_page(chapters, prefix_mode, prefix_text))
 
-        # spine
-        book.spine = spine_list
+            # Главы: каждая страница сразу уходит в архив, неизменившиеся берутся из кэша
+            css_version = content_hash(nav_css.content)
+            cached_count = 0
+            for chapter in chapters:
+                formatted_title = self._format_chapter_title(chapter['number'], chapter['title'], prefix_mode, prefix_text)
+                cache_key = self.render_cache.key('translation', css_version, formatted_title, chapter['content'])
 
-        # Определяем путь для сохранения
-        chapters_range = f"{chapters[0]['number']}-{chapters[-1]['number']}"
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                xhtml = self.render_cache.get(cache_key)
+                if xhtml is None:
+                    xhtml = writer.to_xhtml(self._create_chapter_page(chapter, nav_css, prefix_mode, prefix_text))
+                    self.render_cache.put(cache_key, xhtml)
+                else:
+                    cached_count += 1
 
-        # Добавляем пометку если есть отредактированные главы
-        edited_mark = "_edited" if any(ch['is_edited'] for ch in chapters) else ""
+                writer.add_xhtml(f'chapter_{chapter["number"]:03d}.xhtml', formatted_title, xhtml, toc_section='Главы')
 
-        filename = f"{novel.title.replace(' ', '_')}_{chapters_range}{edited_mark}_{timestamp}.epub"
-        epub_path = self.epub_dir / filename
+        logger.info(f"Глав из кэша рендеринга: {cached_count}/{len(chapters)}")
+        self.render_cache.prune()
 
-        # Сохраняем EPUB
-        epub.write_epub(str(epub_path), book, {})
-        
         return str(epub_path)
 
     def _get_css_styles(self) -> str:
@@ -556,48 +543,6 @@ class EPUBService:
         if not novel:
             raise ValueError(f"Новелла с ID {novel_id} не найдена")
 
-        # Создаём книгу
-        book = epub.EpubBook()
-
-        # Метаданные
-        timestamp = datetime.now().strftime("%Y%m%d")
-        book.set_identifier(f'{novel.title.lower().replace(" ", "-")}-bilingual-{timestamp}')
-        book.set_title(f"{novel.title} (双语版 / Bilingual)")
-        book.set_language('ru')
-        book.add_author(novel.author or 'Неизвестный автор')
-
-        # Добавляем описание
-        book.add_metadata('DC', 'description',
-            f'Двуязычное издание романа "{novel.title}" с чередованием русского перевода и китайского оригинала.')
-
-        # CSS стили для двуязычного формата
-        style = self._get_bilingual_css_styles()
-
-        # Добавляем CSS
-        nav_css = epub.EpubItem(
-            uid="style_nav",
-            file_name="style/nav.css",
-            media_type="text/css",
-            content=style
-        )
-        book.add_item(nav_css)
-
-        # Создаём титульную страницу
-        title_page = self._create_bilingual_title_page(novel)
-        book.add_item(title_page)
-
-        # Создаём страницу с информацией о формате
-        info_page = self._create_bilingual_info_page()
-        book.add_item(info_page)
-
-        # Создаём оглавление
-        toc_page = self._create_bilingual_toc_page(chapters)
-        book.add_item(toc_page)
-
-        # Список для навигации
-        toc_list = []
-        spine_list = ['nav', title_page, info_page, toc_page]
-
         # Проверка что EPUBService инициализирован с Flask app
         if not self.app:
             raise RuntimeError(
@@ -607,11 +552,9 @@ class EPUBService:
 
         # Загружаем глоссарий ОДИН РАЗ для всей новеллы (оптимизация)
         from app.models import GlossaryItem
-        from concurrent.futures import ThreadPoolExecutor, as_completed
         from flask import has_app_context
         from app.utils.character_stats import CharacterStatsTracker
         import time
-        import threading
 
         logger.info(f"🔍 Основной поток: has_app_context = {has_app_context()}")
 
@@ -628,49 +571,17 @@ class EPUBService:
         character_tracker = CharacterStatsTracker()
         LogService.log_info(f"📊 Создан трекер статистики иероглифов", novel_id=novel_id)
 
-        # Последовательная обработка глав (без ThreadPoolExecutor)
-        LogService.log_info(f"🔨 Последовательная обработка {len(chapters)} глав", novel_id=novel_id)
-
         start_time = time.time()
 
-        # Обрабатываем главы последовательно в основном потоке
-        for i, chapter in enumerate(chapters, 1):
-            try:
-                ch = self._create_bilingual_chapter_page(
-                    chapter, nav_css, novel_id, glossary_dict,
-                    chapter_index=i, character_tracker=character_tracker
-                )
-                book.add_item(ch)
-                spine_list.append(ch)
-                toc_list.append(ch)
-
-                # Логируем прогресс каждую 100-ю главу
-                if i % 100 == 0:
-                    LogService.log_info(f"   Обработано {i}/{len(chapters)} глав", novel_id=novel_id)
-
-            except Exception as e:
-                logger.error(f"❌ Ошибка при обработке главы {chapter['number']}: {e}")
-                raise
-
-        elapsed = time.time() - start_time
-        LogService.log_info(f"✅ Все главы обработаны за {elapsed:.1f}с (скорость: {len(chapters)/elapsed:.1f} глав/сек)", novel_id=novel_id)
-
-        # Настройка навигации
-        toc_sections = [
-            epub.Link('title.xhtml', 'Титульная страница', 'title'),
-            epub.Link('info.xhtml', 'О формате', 'info'),
-            epub.Link('toc.xhtml', 'Оглавление', 'toc'),
-            (epub.Section('Главы'), toc_list[:len(chapters)])
-        ]
-
-        book.toc = tuple(toc_sections)
-
-        # Добавляем NCX и Nav файлы
-        book.add_item(epub.EpubNcx())
-        book.add_item(epub.EpubNav())
+        # Этап 1 (последовательно): данные глав из БД, выравнивание и новизна иероглифов
+        # (новизна зависит от порядка глав, поэтому считается здесь, а не в воркерах)
+        render_jobs = self._prepare_bilingual_chapter_jobs(
+            novel, chapters, character_tracker,
+            render_version=content_hash(self._get_bilingual_css_styles(), glossary_dict)
+        )
 
-        # spine
-        book.spine = spine_list
+        prepare_elapsed = time.time() - start_time
+        LogService.log_info(f"📋 Данные {len(render_jobs)} глав подготовлены за {prepare_elapsed:.1f}с", novel_id=novel_id)
 
         # Определяем путь для сохранения
         chapters_range = f"{chapters[0]['number']}-{chapters[-1]['number']}"
@@ -679,8 +590,43 @@ class EPUBService:
         filename = f"{novel.title.replace(' ', '_')}_bilingual_{chapters_range}_{timestamp}.epub"
         epub_path = self.epub_dir / filename
 
-        # Сохраняем EPUB
-        epub.write_epub(str(epub_path), book, {})
+        # Книга пишется в архив потоково: каждая глава уходит в архив сразу после рендеринга
+        identifier_date = datetime.now().strftime("%Y%m%d")
+        with StreamingEpubWriter(
+            epub_path,
+            identifier=f'{novel.title.lower().replace(" ", "-")}-bilingual-{identifier_date}',
+            title=f"{novel.title} (双语版 / Bilingual)",
+            language='ru',
+            author=novel.author or 'Неизвестный автор',
+            description=f'Двуязычное издание романа "{novel.title}" с чередованием русского перевода и китайского оригинала.'
+        ) as writer:
+            # CSS стили для двуязычного формата
+            nav_css = epub.EpubItem(
+                uid="style_nav",
+                file_name="style/nav.css",
+                media_type="text/css",
+                content=self._get_bilingual_css_styles()
+            )
+            writer.add_item(nav_css)
+
+            # Титульная страница, информация о формате и оглавление
+            writer.add_page(self._create_bilingual_title_page(novel))
+            writer.add_page(self._create_bilingual_info_page())
+            writer.add_page(self._create_bilingual_toc_page(chapters))
+
+            # Этап 2 (параллельно): статистика, выделение терминов и HTML глав;
+            # неизменившиеся главы берутся из кэша рендеринга
+            rendered = self._render_bilingual_chapters(render_jobs, glossary_dict, novel_id, nav_css, writer.to_xhtml)
+            for i, (number, formatted_title, xhtml) in enumerate(rendered, 1):
+                writer.add_xhtml(f'chapter_{number:03d}.xhtml', formatted_title, xhtml, toc_section='Главы')
+
+                # Логируем прогресс каждую 100-ю главу
+                if i % 100 == 0:
+                    LogService.log_info(f"   Обработано {i}/{len(chapters)} глав", novel_id=novel_id)
+
+        elapsed = time.time() - start_time
+        LogService.log_info(f"✅ Все главы обработаны за {elapsed:.1f}с (скорость: {len(chapters)/elapsed:.1f} глав/сек)", novel_id=novel_id)
+        self.render_cache.prune()
 
         return str(epub_path)
 
@@ -1001,134 +947,210 @@ class EPUBService:
 
         return toc_page
 
-    def _create_bilingual_chapter_page(self, chapter: Dict, nav_css: epub.EpubItem, novel_id: int, glossary_dict: Optional[Dict] = None, chapter_index: int = 0, character_tracker=None) -> epub.EpubHtml:
-        """Создание страницы главы с двуязычным содержимым (с LLM выравниванием)"""
-        from app.utils.text_alignment import BilingualTextAligner
-        from app.models import Chapter, Novel
-        from app.services.bilingual_alignment_service import BilingualAlignmentService
-        from app import db
-        import time
+    def _prepare_bilingual_chapter_jobs(self, novel, chapters: List[Dict], character_tracker,
+                                        render_version: str = '') -> List[Dict]:
+        """
+        Последовательная подготовка данных для рендеринга глав: главы из БД, выравнивание
+        (кэш или LLM), зависящая от порядка глав новизна иероглифов и ключ кэша рендеринга.
 
-        # Замер времени обработки главы
-        chapter_start_time = time.time()
-        timings = {}  # Словарь для хранения времени каждого этапа
+        Args:
+            render_version: Хэш CSS и глоссария (входит в ключ кэша каждой главы)
 
-        # Этап 1: Загрузка Novel из БД
-        t1 = time.time()
-        novel = Novel.query.get(novel_id)
-        timings['load_novel'] = time.time() - t1
-
-        # Глоссарий передаётся извне (загружен один раз для всей новеллы)
-        if glossary_dict is None:
-            glossary_dict = {}
-
-        # Этап 2: Загрузка Chapter из БД
-        t2 = time.time()
-        db_chapter = Chapter.query.filter_by(
-            novel_id=novel_id,
-            chapter_number=chapter['number']
-        ).first()
-        timings['load_chapter'] = time.time() - t2
-
-        if not db_chapter:
-            logger.warning(f"⚠️  Глава {chapter['number']} не найдена в БД для novel_id={novel_id}")
-            content_html = f'<p class="russian-sentence">{chapter["content"]}</p>'
-            used_terms = set()
-        elif not db_chapter.original_text:
-            logger.warning(f"⚠️  Глава {chapter['number']}: нет оригинального текста (original_text пуст)")
-            logger.info(f"   Заголовок главы: {db_chapter.original_title}")
-            content_html = f'<p class="russian-sentence">{chapter["content"]}</p>'
-            used_terms = set()
+        Returns:
+            Список заданий (простые данные, которые можно передать в другой процесс)
+        """
+        from app.models import Chapter
+        from app import db
+        from app.services.bilingual_alignment_service import BilingualAlignmentService
+        from app.services.chapter_bulk_loader import ChapterBulkLoader
+
+        # Если префикс пустой, то не добавляем префикс вообще (согласно подсказке в форме)
+        if novel.epub_chapter_prefix_text == '':
+            prefix_mode = 'never'
+            prefix_text = ''
         else:
-            # Используем LLM выравнивание
-            # Логи только каждую 100-ю главу для уменьшения шума
-            verbose = (chapter_index % 100 == 0)
-
-            if verbose:
-                LogService.log_info(f"✅ Глава {chapter['number']}: начинаем LLM выравнивание", novel_id=novel_id)
-                LogService.log_info(f"   Заголовок: {db_chapter.original_title}", novel_id=novel_id)
-
-            # Этап 3: Получение выравнивания
-            t3 = time.time()
-            alignment_service = BilingualAlignmentService()
-            alignments = alignment_service.align_chapter(
-                chapter=db_chapter,
-                force_refresh=False,  # Используем кэш если есть
-                save_to_cache=True    # Сохраняем результат
+            prefix_mode = novel.epub_add_chapter_prefix if novel.epub_add_chapter_prefix else 'auto'
+            prefix_text = novel.epub_chapter_prefix_text if novel.epub_chapter_prefix_text is not None else 'Глава'
+
+        # Оригиналы глав и кэш выравниваний — пакетно, только нужные колонки
+        db_chapters = {
+            ch.chapter_number: ch
+            for ch in db.session.query(
+                Chapter.id, Chapter.chapter_number, Chapter.original_title, Chapter.original_text
+            ).filter(Chapter.novel_id == novel.id)
+        }
+        cached_alignments = ChapterBulkLoader.load_alignments(novel.id)
+
+        alignment_service = BilingualAlignmentService(engine=EPUB_ALIGNMENT_ENGINE or None)
+        save_alignments = alignment_service.engine != 'statistical'
+        jobs = []
+
+        for i, chapter in enumerate(chapters, 1):
+            job = {
+                'number': chapter['number'],
+                'content': chapter['content'],
+                'formatted_title': self._format_chapter_title(
+                    chapter_number=chapter['number'],
+                    title=chapter['title'],
+                    prefix_mode=prefix_mode,
+                    prefix_text=prefix_text
+                ),
+                'aligned_pairs': None,
+                'original_text': None,
+                'new_chars': None,
+                'total_unique_so_far': 0
+            }
+
+            db_chapter = db_chapters.get(chapter['number'])
+            if not db_chapter:
+                logger.warning(f"⚠️  Глава {chapter['number']} не найдена в БД для novel_id={novel.id}")
+            elif not db_chapter.original_text:
+                logger.warning(f"⚠️  Глава {chapter['number']}: нет оригинального текста (original_text пуст)")
+                logger.info(f"   Заголовок главы: {db_chapter.original_title}")
+            else:
+                alignments = cached_alignments.get(db_chapter.id)
+                if alignments is None:
+                    # Кэша нет — выравнивание (LLM-результат сохраняется)
+                    alignments = alignment_service.align_chapter(
+                        chapter=Chapter.query.get(db_chapter.id),
+                        force_refresh=False,
+                        save_to_cache=save_alignments
+                    )
+                job['aligned_pairs'] = [(pair['ru'], pair['zh']) for pair in alignments]
+                job['original_text'] = db_chapter.original_text
+                job['new_chars'], job['total_unique_so_far'] = character_tracker.advance(
+                    chapter['number'], db_chapter.original_text
+                )
+
+            job['cache_key'] = self.render_cache.key(
+                'bilingual', render_version, job['formatted_title'], job['content'],
+                job['aligned_pairs'], job['original_text'],
+                sorted(job['new_chars']) if job['new_chars'] is not None else None,
+                job['total_unique_so_far']
             )
-            timings['alignment'] = time.time() - t3
-
-            if verbose:
-                LogService.log_info(f"   Получено выравнивание: {len(alignments)} пар", novel_id=novel_id)
-
-            # Этап 4: Конвертация формата
-            t4 = time.time()
-            aligned_pairs = [(pair['ru'], pair['zh']) for pair in alignments]
-            timings['convert_format'] = time.time() - t4
-
-            # Этап 4.5: Подсчёт статистики иероглифов (если есть трекер)
-            chapter_stats = None
-            if character_tracker and db_chapter.original_text:
-                t_stats = time.time()
-                chapter_stats = character_tracker.process_chapter(
-                    chapter_num=chapter['number'],
-                    chinese_text=db_chapter.original_text
+            jobs.append(job)
+
+            # Логи только каждую 100-ю главу для уменьшения шума
+            if i % 100 == 0:
+                LogService.log_info(f"   Подготовлено {i}/{len(chapters)} глав", novel_id=novel.id)
+
+        return jobs
+
+    def _render_bilingual_chapters(self, jobs: List[Dict], glossary_dict: Dict, novel_id: int,
+                                   nav_css, to_xhtml):
+        """
+        XHTML глав в порядке jobs: (номер, заголовок, XHTML).
+        Главы, найденные в кэше рендеринга, не рендерятся; остальные рендерятся
+        в пуле процессов и сохраняются в кэш.
+        """
+        cached = {index for index, job in enumerate(jobs) if self.render_cache.contains(job['cache_key'])}
+        pending = [job for index, job in enumerate(jobs) if index not in cached]
+        LogService.log_info(
+            f"♻️ Из кэша рендеринга: {len(cached)} глав, к рендерингу: {len(pending)}",
+            novel_id=novel_id
+        )
+
+        rendered = self._render_bilingual_contents(pending, glossary_dict, novel_id)
+
+        for index, job in enumerate(jobs):
+            jobs[index] = None  # исходные данные главы больше не нужны
+
+            xhtml = self.render_cache.get(job['cache_key']) if index in cached else None
+            if xhtml is None:
+                if index in cached:
+                    # Запись пропала из кэша после проверки — рендерим здесь
+                    content = EPUBService._render_bilingual_chapter_html(job, glossary_dict)
+                else:
+                    content = next(rendered)
+
+                page = epub.EpubHtml(
+                    title=job['formatted_title'],
+                    file_name=f'chapter_{job["number"]:03d}.xhtml',
+                    content=content
                 )
-                timings['char_stats'] = time.time() - t_stats
-
-                if verbose:
-                    LogService.log_info(
-                        f"   📊 Статистика: {chapter_stats['total_chars']} иероглифов, "
-                        f"{len(chapter_stats['new_chars'])} новых, "
-                        f"всего изучено: {chapter_stats['total_unique_so_far']}",
-                        novel_id=novel_id
-                    )
+                page.add_item(nav_css)
+                xhtml = to_xhtml(page)
+                self.render_cache.put(job['cache_key'], xhtml)
+
+            yield job['number'], job['formatted_title'], xhtml
+
+    def _render_bilingual_contents(self, jobs: List[Dict], glossary_dict: Dict, novel_id: int):
+        """
+        HTML содержимого глав в порядке jobs, рендеринг в пуле процессов.
+        Если пул недоступен (например, внутри демонического процесса), главы
+        рендерятся последовательно в текущем процессе.
+        """
+        if not jobs:
+            return
+        workers = EPUB_RENDER_WORKERS or os.cpu_count() or 1
+
+        if workers > 1 and len(jobs) > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Не fork: в воркере Celery уже работают потоки (запись логов в БД, event loop,
+            # пулы HTTP), и дочерний процесс может унаследовать захваченную блокировку и зависнуть.
+            # forkserver/spawn запускают чистый процесс; словарь BKRS и таблица pinyin
+            # загружаются в каждом воркере пула при первом обращении.
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+            workers = min(workers, len(jobs))
+            executor = None
+            try:
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context(start_method),
+                    initializer=_init_bilingual_render_worker,
+                    initargs=(glossary_dict,)
+                )
+                results = executor.map(
+                    _render_bilingual_chapter_job, jobs,
+                    chunksize=max(1, min(16, len(jobs) // (workers * 4)))
+                )
+            except (AssertionError, OSError, ValueError) as e:
+                if executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                LogService.log_warning(
+                    f"⚠️ Пул процессов для EPUB недоступен ({e}), рендеринг глав последовательно",
+                    novel_id=novel_id
+                )
+            else:
+                LogService.log_info(f"🔨 Параллельный рендеринг {len(jobs)} глав ({workers} процессов)", novel_id=novel_id)
+                with executor:
+                    yield from results
+                return
+
+        LogService.log_info(f"🔨 Последовательный рендеринг {len(jobs)} глав", novel_id=novel_id)
+        for index, job in enumerate(jobs):
+            jobs[index] = None  # исходные данные главы больше не нужны
+            yield EPUBService._render_bilingual_chapter_html(job, glossary_dict)
 
-            # Этап 5: Форматирование для EPUB с глоссарием и статистикой
-            t5 = time.time()
+    @staticmethod
+    def _render_bilingual_chapter_html(job: Dict, glossary_dict: Dict) -> str:
+        """Создание XHTML главы с двуязычным содержимым (без обращений к БД)"""
+        from app.utils.text_alignment import BilingualTextAligner
+        from app.utils.character_stats import CharacterStatsTracker
+
+        if job['aligned_pairs'] is None:
+            content_html = f'<p class="russian-sentence">{job["content"]}</p>'
+        else:
+            # Статистика иероглифов по результату последовательного прохода
+            chapter_stats = CharacterStatsTracker.build_chapter_stats(
+                job['original_text'], job['new_chars'], job['total_unique_so_far']
+            )
+
+            # Форматирование для EPUB с глоссарием и статистикой
             content_html, used_terms = BilingualTextAligner.format_for_epub(
-                aligned_pairs,
+                job['aligned_pairs'],
                 mode='sentence',
                 style='alternating',
                 glossary_dict=glossary_dict,
                 include_glossary_section=True,
                 chapter_stats=chapter_stats
             )
-            timings['format_epub'] = time.time() - t5
-
-            if verbose:
-                LogService.log_info(f"   Использовано терминов глоссария: {len(used_terms)}", novel_id=novel_id)
-
-        # Этап 6: Форматирование заголовка
-        t6 = time.time()
-        if novel:
-            # Если префикс пустой, то не добавляем префикс вообще (согласно подсказке в форме)
-            if novel.epub_chapter_prefix_text == '':
-                prefix_mode = 'never'
-                prefix_text = ''
-            else:
-                prefix_mode = novel.epub_add_chapter_prefix if novel.epub_add_chapter_prefix else 'auto'
-                prefix_text = novel.epub_chapter_prefix_text if novel.epub_chapter_prefix_text is not None else 'Глава'
-
-            formatted_title = self._format_chapter_title(
-                chapter_number=chapter['number'],
-                title=chapter['title'],
-                prefix_mode=prefix_mode,
-                prefix_text=prefix_text
-            )
-        else:
-            # Если новелла не найдена, используем стандартное форматирование
-            formatted_title = self._format_chapter_title(
-                chapter_number=chapter['number'],
-                title=chapter['title'],
-                prefix_mode='auto',
-                prefix_text='Глава'
-            )
-        timings['format_title'] = time.time() - t6
 
-        # Этап 7: Создание HTML контента
-        t7 = time.time()
-        chapter_content = f"""
+        formatted_title = job['formatted_title']
+        return f"""
         <!DOCTYPE html>
         <html>
         <head>
@@ -1141,26 +1163,3 @@ class EPUBService:
         </body>
         </html>
         """
-        timings['create_html'] = time.time() - t7
-
-        # Этап 8: Создание EPUB страницы
-        t8 = time.time()
-        chapter_page = epub.EpubHtml(
-            title=formatted_title,
-            file_name=f'chapter_{chapter["number"]:03d}.xhtml',
-            content=chapter_content
-        )
-        chapter_page.add_item(nav_css)
-        timings['create_epub_page'] = time.time() - t8
-
-        # Логируем детальное время обработки главы (только каждую 100-ю)
-        if chapter_index % 100 == 0:
-            chapter_elapsed = time.time() - chapter_start_time
-
-            # Формируем строку с топ-3 самых медленных этапов
-            sorted_timings = sorted(timings.items(), key=lambda x: x[1], reverse=True)
-            top3 = ', '.join([f"{name}={val*1000:.0f}ms" for name, val in sorted_timings[:3]])
-
-            LogService.log_info(f"   ⏱️  Глава обработана за {chapter_elapsed:.2f}с | Топ-3: {top3}", novel_id=novel_id)
-
-        return chapter_page 
\ No newline at end of file
@@ -0,0 +1,290 @@
+"""
+Клиенты асинхронных Batch API провайдеров (пакетные задания со скидкой, без интерактивной задержки)
+
+Поддерживаются:
+- Gemini: models/{model}:batchGenerateContent (запросы inline), статус — batches/{id}
+- Anthropic: /messages/batches, результаты — JSONL по results_url
+
+Запрос пакета — словарь {'custom_id', 'system_prompt', 'user_prompt', 'temperature', 'max_tokens'};
+результат — {custom_id: {'success', 'content', 'finish_reason', 'usage', 'error'}}.
+LLM_BATCH_ENDPOINT переопределяет endpoint провайдера (например, для локального
+tools/llm_batch_stub_server.py), интерактивные запросы при этом не меняются.
+"""
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from app.models.ai_model import AIModel
+from app.services.ai_adapter_service import GEMINI_SAFETY_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+LLM_BATCH_ENDPOINT = os.getenv('LLM_BATCH_ENDPOINT', '').rstrip('/')
+LLM_BATCH_POLL_INTERVAL = float(os.getenv('LLM_BATCH_POLL_INTERVAL', '60'))
+LLM_BATCH_MAX_WAIT_HOURS = float(os.getenv('LLM_BATCH_MAX_WAIT_HOURS', '24'))
+
+# Итоговые состояния пакета (общие для всех провайдеров)
+BATCH_RUNNING = 'running'
+BATCH_SUCCEEDED = 'succeeded'
+BATCH_FAILED = 'failed'
+BATCH_CANCELLED = 'cancelled'
+BATCH_EXPIRED = 'expired'
+
+
+class BatchError(Exception):
+    """Ошибка создания пакета или получения его результатов"""
+
+
+class LLMBatchClient(ABC):
+    """Базовый клиент: отправка пакета, опрос статуса, получение результатов"""
+
+    def __init__(self, model: AIModel):
+        self.model = model
+        self.api_key = model.api_key or (model.api_keys[0] if getattr(model, 'api_keys', None) else None)
+        self.endpoint = LLM_BATCH_ENDPOINT or (model.api_endpoint or '').rstrip('/')
+        self._client = httpx.Client(timeout=300.0)
+
+    def close(self):
+        self._client.close()
+
+    @abstractmethod
+    def submit(self, requests: List[Dict], display_name: str) -> str:
+        """Создание пакета; возвращает его идентификатор"""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Состояние пакета: BATCH_RUNNING или одно из итоговых"""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Dict[str, Dict]:
+        """Результаты завершённого пакета: {custom_id: результат}"""
+
+    @abstractmethod
+    def cancel(self, batch_id: str):
+        """Отмена пакета у провайдера (ошибки только логируются)"""
+
+    def wait(self, batch_id: str, should_stop: Callable[[], bool] = None) -> str:
+        """
+        Ожидание завершения пакета с опросом раз в LLM_BATCH_POLL_INTERVAL секунд.
+        should_stop() == True — пакет отменяется у провайдера, возвращается BATCH_CANCELLED.
+        """
+        deadline = time.monotonic() + LLM_BATCH_MAX_WAIT_HOURS * 3600
+        while True:
+            state = self.status(batch_id)
+            if state != BATCH_RUNNING:
+                return state
+            if should_stop and should_stop():
+                self.cancel(batch_id)
+                return BATCH_CANCELLED
+            if time.monotonic() > deadline:
+                logger.warning(f"Пакет {batch_id} не завершился за {LLM_BATCH_MAX_WAIT_HOURS} ч, отменяем")
+                self.cancel(batch_id)
+                return BATCH_EXPIRED
+            time.sleep(LLM_BATCH_POLL_INTERVAL)
+
+    def _check(self, response: httpx.Response, action: str) -> Dict:
+        if response.status_code != 200:
+            raise BatchError(f"{self.model.provider}: {action} — HTTP {response.status_code}: {response.text[:500]}")
+        return response.json()
+
+
+class GeminiBatchClient(LLMBatchClient):
+    """Gemini Batch Mode с запросами inline"""
+
+    _STATES = {
+        'BATCH_STATE_PENDING': BATCH_RUNNING,
+        'BATCH_STATE_RUNNING': BATCH_RUNNING,
+        'BATCH_STATE_SUCCEEDED': BATCH_SUCCEEDED,
+        'BATCH_STATE_FAILED': BATCH_FAILED,
+        'BATCH_STATE_CANCELLED': BATCH_CANCELLED,
+        'BATCH_STATE_EXPIRED': BATCH_EXPIRED,
+    }
+
+    def submit(self, requests: List[Dict], display_name: str) -> str:
+        body = {
+            'batch': {
+                'display_name': display_name,
+                'input_config': {
+                    'requests': {
+                        'requests': [
+                            {'request': self._request_body(request), 'metadata': {'key': request['custom_id']}}
+                            for request in requests
+                        ]
+                    }
+                }
+            }
+        }
+        response = self._client.post(
+            f"{self.endpoint}/models/{self.model.model_id}:batchGenerateContent",
+            params={'key': self.api_key},
+            json=body
+        )
+        return self._check(response, 'создание пакета')['name']
+
+    def status(self, batch_id: str) -> str:
+        data = self._get(batch_id)
+        state = (data.get('metadata') or {}).get('state')
+        if state is None and data.get('done'):
+            return BATCH_FAILED if data.get('error') else BATCH_SUCCEEDED
+        return self._STATES.get(state, BATCH_RUNNING)
+
+    def results(self, batch_id: str) -> Dict[str, Dict]:
+        data = self._get(batch_id)
+        output = data.get('response') or (data.get('metadata') or {}).get('output') or {}
+        inlined = (output.get('inlinedResponses') or {}).get('inlinedResponses', [])
+
+        results = {}
+        for item in inlined:
+            key = (item.get('metadata') or {}).get('key')
+            if key is None:
+                continue
+            if item.get('error'):
+                results[key] = {'success': False, 'error': item['error'].get('message', str(item['error']))}
+                continue
+            results[key] = self._parse_response(item.get('response') or {})
+        return results
+
+    def cancel(self, batch_id: str):
+        try:
+            self._client.post(f"{self.endpoint}/{batch_id}:cancel", params={'key': self.api_key})
+        except httpx.HTTPError as e:
+            logger.warning(f"Не удалось отменить пакет Gemini {batch_id}: {e}")
+
+    def _get(self, batch_id: str) -> Dict:
+        return self._check(self._client.get(f"{self.endpoint}/{batch_id}", params={'key': self.api_key}),
+                           'статус пакета')
+
+    def _request_body(self, request: Dict) -> Dict:
+        """Тело generateContent — как у интерактивного запроса AIAdapterService._call_gemini"""
+        return {
+            'contents': [{'parts': [{'text': request['system_prompt']}, {'text': request['user_prompt']}]}],
+            'generationConfig': {
+                'temperature': request['temperature'],
+                'maxOutputTokens': min(request['max_tokens'], self.model.max_output_tokens),
+                'topP': 0.95,
+                'topK': 40
+            },
+            'safetySettings': GEMINI_SAFETY_SETTINGS
+        }
+
+    @staticmethod
+    def _parse_response(response: Dict) -> Dict:
+        candidates = response.get('candidates') or []
+        if not candidates:
+            block_reason = (response.get('promptFeedback') or {}).get('blockReason')
+            return {'success': False, 'error': f"Промпт заблокирован: {block_reason}" if block_reason else 'Нет кандидатов в ответе'}
+
+        parts = (candidates[0].get('content') or {}).get('parts', [])
+        content = ''.join(part['text'] for part in parts if 'text' in part and not part.get('thought'))
+        finish_reason = candidates[0].get('finishReason', 'UNKNOWN')
+        return {
+            'success': bool(content) and finish_reason != 'MAX_TOKENS',
+            'content': content,
+            'finish_reason': finish_reason,
+            'usage': response.get('usageMetadata', {}),
+            'error': None if content else 'Пустой ответ'
+        }
+
+
+class AnthropicBatchClient(LLMBatchClient):
+    """Anthropic Message Batches"""
+
+    def submit(self, requests: List[Dict], display_name: str) -> str:
+        body = {
+            'requests': [
+                {
+                    'custom_id': request['custom_id'],
+                    'params': {
+                        'model': self.model.model_id,
+                        'system': request['system_prompt'],
+                        'messages': [{'role': 'user', 'content': request['user_prompt']}],
+                        'temperature': request['temperature'],
+                        'max_tokens': min(request['max_tokens'], self.model.max_output_tokens)
+                    }
+                }
+                for request in requests
+            ]
+        }
+        response = self._client.post(f"{self.endpoint}/messages/batches", headers=self._headers(), json=body)
+        return self._check(response, 'создание пакета')['id']
+
+    def status(self, batch_id: str) -> str:
+        data = self._get(batch_id)
+        if data.get('processing_status') != 'ended':
+            return BATCH_RUNNING
+        counts = data.get('request_counts') or {}
+        if counts.get('succeeded'):
+            return BATCH_SUCCEEDED
+        if counts.get('canceled'):
+            return BATCH_CANCELLED
+        if counts.get('expired'):
+            return BATCH_EXPIRED
+        return BATCH_FAILED
+
+    def results(self, batch_id: str) -> Dict[str, Dict]:
+        results_url = self._get(batch_id).get('results_url')
+        if not results_url:
+            raise BatchError(f"anthropic: у пакета {batch_id} нет results_url")
+        if LLM_BATCH_ENDPOINT:
+            # Ссылка на результаты указывает на провайдера — ведём её на переопределённый endpoint
+            results_url = f"{self.endpoint}/messages/batches/{batch_id}/results"
+
+        response = self._client.get(results_url, headers=self._headers())
+        if response.status_code != 200:
+            raise BatchError(f"anthropic: результаты пакета — HTTP {response.status_code}: {response.text[:500]}")
+
+        results = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            result = item.get('result') or {}
+            if result.get('type') != 'succeeded':
+                error = (result.get('error') or {}).get('error', {}).get('message') or result.get('type')
+                results[item['custom_id']] = {'success': False, 'error': error}
+                continue
+            message = result.get('message') or {}
+            content = ''.join(block.get('text', '') for block in message.get('content', []) if block.get('type') == 'text')
+            finish_reason = message.get('stop_reason', 'unknown')
+            results[item['custom_id']] = {
+                'success': bool(content) and finish_reason != 'max_tokens',
+                'content': content,
+                'finish_reason': finish_reason,
+                'usage': message.get('usage', {}),
+                'error': None if content else 'Пустой ответ'
+            }
+        return results
+
+    def cancel(self, batch_id: str):
+        try:
+            self._client.post(f"{self.endpoint}/messages/batches/{batch_id}/cancel", headers=self._headers())
+        except httpx.HTTPError as e:
+            logger.warning(f"Не удалось отменить пакет Anthropic {batch_id}: {e}")
+
+    def _get(self, batch_id: str) -> Dict:
+        return self._check(self._client.get(f"{self.endpoint}/messages/batches/{batch_id}", headers=self._headers()),
+                           'статус пакета')
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            'x-api-key': self.api_key or '',
+            'anthropic-version': '2023-06-01',
+            'Content-Type': 'application/json'
+        }
+
+
+_BATCH_CLIENTS = {
+    'gemini': GeminiBatchClient,
+    'anthropic': AnthropicBatchClient,
+}
+
+
+def get_batch_client(model: AIModel) -> Optional[LLMBatchClient]:
+    """Клиент Batch API для модели или None, если провайдер пакетный режим не поддерживает"""
+    client_class = _BATCH_CLIENTS.get(model.provider)
+    return client_class(model) if client_class else None
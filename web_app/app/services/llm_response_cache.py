@@ -0,0 +1,133 @@
+"""
+Кэш ответов LLM по содержимому запроса (Redis, общий для всех процессов воркера)
+
+Ключ — хэш (провайдер, модель, endpoint, system/user промпты, температура, лимит токенов,
+дополнительные параметры запроса вроде disable_thinking). Повторный запуск главы после
+падения воркера или перезапуска задачи получает уже оплаченные ответы из кэша.
+
+Записи живут LLM_CACHE_TTL_HOURS часов; при превышении LLM_CACHE_MAX_MB удаляются самые старые.
+"""
+import hashlib
+import json
+import os
+from typing import Iterable, Optional, Tuple
+
+import redis
+
+from app.utils.redis_client import get_shared_redis, log_redis_unavailable
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', '168'))
+LLM_CACHE_MAX_MB = float(os.getenv('LLM_CACHE_MAX_MB', '512'))
+
+KEY_PREFIX = 'llmcache'
+INDEX_KEY = f'{KEY_PREFIX}:index'   # zset: ключ записи → время записи
+SIZES_KEY = f'{KEY_PREFIX}:sizes'   # hash: ключ записи → размер в байтах
+BYTES_KEY = f'{KEY_PREFIX}:bytes'   # общий размер записей
+
+# Запись с учётом размера: удаляет истёкшие записи из индекса (порциями),
+# заменяет старую версию записи и вытесняет самые старые при превышении лимита.
+_PUT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1])
+local ttl = tonumber(ARGV[2])
+local max_bytes = tonumber(ARGV[3])
+
+local function forget(key)
+    local size = tonumber(redis.call('HGET', KEYS[3], key) or '0')
+    redis.call('DECRBY', KEYS[4], size)
+    redis.call('HDEL', KEYS[3], key)
+    redis.call('ZREM', KEYS[2], key)
+end
+
+for _, key in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now - ttl, 'LIMIT', 0, 100)) do
+    forget(key)
+end
+forget(KEYS[1])
+
+local size = string.len(ARGV[1])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+redis.call('ZADD', KEYS[2], now, KEYS[1])
+redis.call('HSET', KEYS[3], KEYS[1], size)
+local total = redis.call('INCRBY', KEYS[4], size)
+
+while total > max_bytes do
+    local oldest = redis.call('ZRANGE', KEYS[2], 0, 0)[1]
+    if not oldest or oldest == KEYS[1] then
+        break
+    end
+    forget(oldest)
+    redis.call('DEL', oldest)
+    total = tonumber(redis.call('GET', KEYS[4]) or '0')
+end
+return total
+"""
+
+_DELETE_SCRIPT = """
+local size = tonumber(redis.call('HGET', KEYS[3], KEYS[1]) or '0')
+redis.call('DECRBY', KEYS[4], size)
+redis.call('HDEL', KEYS[3], KEYS[1])
+redis.call('ZREM', KEYS[2], KEYS[1])
+return redis.call('DEL', KEYS[1])
+"""
+
+def _get_redis() -> redis.Redis:
+    # URL — LLM_CACHE_REDIS_URL, по умолчанию RATE_LIMIT_REDIS_URL
+    return get_shared_redis('LLM_CACHE_REDIS_URL')
+
+
+def _log_unavailable(e: Exception):
+    log_redis_unavailable('Кэш ответов LLM', e, 'кэширование отключено')
+
+
+class LLMResponseCache:
+    """Операции с кэшем ответов LLM; при недоступном Redis ведёт себя как пустой кэш"""
+
+    @staticmethod
+    def make_key(provider: str, model_id: str, endpoint: Optional[str], system_prompt: str,
+                 user_prompt: str, temperature: Optional[float], max_tokens: Optional[int],
+                 options: dict) -> str:
+        """Ключ записи по всем параметрам, влияющим на ответ"""
+        payload = json.dumps(
+            [provider, model_id, endpoint or '', system_prompt or '', user_prompt or '',
+             temperature, max_tokens, options],
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return f"{KEY_PREFIX}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def get(key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(ответ, finish_reason) или None"""
+        try:
+            raw = _get_redis().get(key)
+        except redis.RedisError as e:
+            _log_unavailable(e)
+            return None
+        if not raw:
+            return None
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            return None
+        return entry.get('content'), entry.get('finish_reason')
+
+    @staticmethod
+    def put(key: str, content: str, finish_reason: Optional[str] = None):
+        value = json.dumps({'content': content, 'finish_reason': finish_reason}, ensure_ascii=False)
+        try:
+            _get_redis().eval(
+                _PUT_SCRIPT, 4, key, INDEX_KEY, SIZES_KEY, BYTES_KEY,
+                value, max(1, int(LLM_CACHE_TTL_HOURS * 3600)), int(LLM_CACHE_MAX_MB * 1024 * 1024)
+            )
+        except redis.RedisError as e:
+            _log_unavailable(e)
+
+    @staticmethod
+    def delete(keys: Iterable[str]):
+        """Удаление записей (например, ответов, отклонённых валидацией)"""
+        try:
+            client = _get_redis()
+            for key in keys:
+                client.eval(_DELETE_SCRIPT, 4, key, INDEX_KEY, SIZES_KEY, BYTES_KEY)
+        except redis.RedisError as e:
+            _log_unavailable(e)
@@ -1,7 +1,12 @@
 """
 Сервис для работы с логами
 """
+import atexit
 import logging
+import os
+import queue
+import threading
+import time
 import traceback
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
@@ -18,8 +23,119 @@ except ImportError:
         pass
 
 
+# Параметры пакетной записи логов в БД
+LOG_DB_BATCH_SIZE = int(os.getenv('LOG_DB_BATCH_SIZE', '100'))
+LOG_DB_FLUSH_INTERVAL = float(os.getenv('LOG_DB_FLUSH_INTERVAL', '0.5'))
+LOG_DB_QUEUE_SIZE = 10000
+
+
+class LogBatchWriter:
+    """
+    Фоновая пакетная запись логов: записи копятся в очереди и вставляются в БД
+    одним bulk insert каждые LOG_DB_BATCH_SIZE записей или LOG_DB_FLUSH_INTERVAL секунд.
+    Пишет через собственное соединение engine — сессия вызывающего кода не затрагивается.
+    WebSocket-уведомления отправляются одним событием 'log_entries' на пакет.
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=LOG_DB_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # После fork (Celery prefork) поток родителя в дочернем процессе не существует
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=LOG_DB_QUEUE_SIZE)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='log-batch-writer', daemon=True)
+            self._thread.start()
+
+    def put(self, row: Dict[str, Any]):
+        """Поставить запись в очередь (вызывается из emit, требует app context для engine)."""
+        if self._engine is None:
+            self._engine = db.engine
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            print(f"Очередь логов переполнена, запись потеряна: {row.get('message', '')[:100]}")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + LOG_DB_FLUSH_INTERVAL
+            while len(batch) < LOG_DB_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(LogEntry.__table__.insert(), batch)
+        except Exception as e:
+            print(f"Ошибка сохранения логов ({len(batch)} записей): {e}")
+            return
+
+        try:
+            socketio.emit('log_entries', [self._to_dict(row) for row in batch])
+        except Exception as e:
+            print(f"Ошибка отправки логов через WebSocket: {e}")
+
+    @staticmethod
+    def _to_dict(row: Dict[str, Any]) -> Dict[str, Any]:
+        """Тот же формат, что LogEntry.to_dict (id у пакетной вставки не возвращается)"""
+        level = row['level'].upper()
+        return {
+            'id': None,
+            'task_id': row['task_id'],
+            'novel_id': row['novel_id'],
+            'chapter_id': row['chapter_id'],
+            'level': row['level'],
+            'message': row['message'],
+            'module': row['module'],
+            'function': row['function'],
+            'extra_data': row['extra_data'],
+            'created_at': row['created_at'].isoformat(),
+            'is_error': level in ['ERROR', 'CRITICAL'],
+            'is_warning': level == 'WARNING',
+            'is_info': level == 'INFO',
+            'is_debug': level == 'DEBUG'
+        }
+
+    def flush(self, timeout: float = 5):
+        """Дописать очередь синхронно (при завершении процесса)."""
+        if self._engine is None or self._pid != os.getpid():
+            return
+        batch = []
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+
+_log_writer = LogBatchWriter()
+atexit.register(_log_writer.flush)
+
+
 class DatabaseHandler(logging.Handler):
-    """Хендлер для сохранения логов в базу данных"""
+    """Хендлер для сохранения логов в базу данных (пакетно, в фоновом потоке)"""
     
     def __init__(self, task_id: Optional[int] = None, novel_id: Optional[int] = None, 
                  chapter_id: Optional[int] = None):
@@ -33,36 +149,53 @@ class DatabaseHandler(logging.Handler):
             # Получаем информацию о модуле и функции
             module = record.module if hasattr(record, 'module') else None
             function = record.funcName if hasattr(record, 'funcName') else None
-            
-            # Создаем запись лога
-            log_entry = LogEntry(
-                task_id=self.task_id,
-                novel_id=self.novel_id,
-                chapter_id=self.chapter_id,
-                level=record.levelname,
-                message=record.getMessage(),
-                module=module,
-                function=function,
-                extra_data=getattr(record, 'extra_data', None)
-            )
-            
-            # Сохраняем в базу данных
-            db.session.add(log_entry)
-            db.session.commit()
-            
-            # Отправляем через WebSocket
-            self._emit_websocket(log_entry)
+
+            # Привязка к задаче/новелле/главе передаётся с записью (логгер общий для разных вызовов)
+            _log_writer.put({
+                'task_id': getattr(record, 'log_task_id', self.task_id),
+                'novel_id': getattr(record, 'log_novel_id', self.novel_id),
+                'chapter_id': getattr(record, 'log_chapter_id', self.chapter_id),
+                'level': record.levelname,
+                'message': record.getMessage(),
+                'module': module,
+                'function': function,
+                'extra_data': getattr(record, 'extra_data', None),
+                'created_at': datetime.utcfromtimestamp(record.created)
+            })
             
         except Exception as e:
-            # Если не удалось сохранить лог, выводим в консоль
+            # Если не удалось поставить лог в очередь, выводим в консоль
             print(f"Ошибка сохранения лога: {e}")
-    
-    def _emit_websocket(self, log_entry: LogEntry):
-        """Отправка лога через WebSocket"""
-        try:
-            socketio.emit('log_entry', log_entry.to_dict())
-        except Exception as e:
-            print(f"Ошибка отправки лога через WebSocket: {e}")
+
+
+# Кэш task_id → task_type для определения источника сообщений консоли
+_task_type_cache: Dict[int, Optional[str]] = {}
+
+
+def _console_source(message: str, task_id: Optional[int], novel_id: Optional[int]) -> str:
+    """Источник сообщения для консоли: тип задачи либо по ключевым словам"""
+    if task_id:
+        if task_id not in _task_type_cache:
+            task = Task.query.get(task_id)
+            _task_type_cache[task_id] = task.task_type if task else None
+        return _task_type_cache[task_id] or 'system'
+    if novel_id:
+        # Определяем источник на основе контекста
+        message_lower = message.lower()
+        if 'редактур' in message_lower or 'отредактирован' in message_lower:
+            return 'editor'
+        elif 'перевод' in message_lower or 'переведен' in message_lower:
+            return 'translator'
+        elif 'парсинг' in message_lower or 'обработк' in message_lower:
+            return 'parser'
+    return 'system'
+
+
+def _record_extra(task_id, novel_id, chapter_id, extra_data) -> Dict[str, Any]:
+    extra = {'log_task_id': task_id, 'log_novel_id': novel_id, 'log_chapter_id': chapter_id}
+    if extra_data:
+        extra['extra_data'] = extra_data
+    return extra
 
 
 class LogService:
@@ -97,112 +230,40 @@ class LogService:
                  chapter_id: Optional[int] = None, extra_data: Optional[Dict] = None):
         """Логирование информационного сообщения"""
         logger = LogService.get_logger(task_id, novel_id, chapter_id)
-        if extra_data:
-            logger.info(message, extra={'extra_data': extra_data})
-        else:
-            logger.info(message)
-        
+        logger.info(message, extra=_record_extra(task_id, novel_id, chapter_id, extra_data))
+
         # Отправляем в консоль
-        source = 'system'
-        if task_id:
-            task = Task.query.get(task_id)
-            if task and task.task_type:
-                source = task.task_type
-        elif novel_id:
-            # Определяем источник на основе контекста
-            if 'редактур' in message.lower() or 'отредактирован' in message.lower():
-                source = 'editor'
-            elif 'перевод' in message.lower() or 'переведен' in message.lower():
-                source = 'translator'
-            elif 'парсинг' in message.lower() or 'обработк' in message.lower():
-                source = 'parser'
-            else:
-                source = 'system'
-        add_console_message(message, 'INFO', source)
+        add_console_message(message, 'INFO', _console_source(message, task_id, novel_id))
     
     @staticmethod
     def log_error(message: str, task_id: Optional[int] = None, novel_id: Optional[int] = None,
                   chapter_id: Optional[int] = None, extra_data: Optional[Dict] = None):
         """Логирование ошибки"""
         logger = LogService.get_logger(task_id, novel_id, chapter_id)
-        if extra_data:
-            logger.error(message, extra={'extra_data': extra_data})
-        else:
-            logger.error(message)
-        
+        logger.error(message, extra=_record_extra(task_id, novel_id, chapter_id, extra_data))
+
         # Отправляем в консоль
-        source = 'system'
-        if task_id:
-            task = Task.query.get(task_id)
-            if task and task.task_type:
-                source = task.task_type
-        elif novel_id:
-            # Определяем источник на основе контекста
-            if 'редактур' in message.lower() or 'отредактирован' in message.lower():
-                source = 'editor'
-            elif 'перевод' in message.lower() or 'переведен' in message.lower():
-                source = 'translator'
-            elif 'парсинг' in message.lower() or 'обработк' in message.lower():
-                source = 'parser'
-            else:
-                source = 'system'
-        add_console_message(message, 'ERROR', source)
+        add_console_message(message, 'ERROR', _console_source(message, task_id, novel_id))
     
     @staticmethod
     def log_warning(message: str, task_id: Optional[int] = None, novel_id: Optional[int] = None,
                     chapter_id: Optional[int] = None, extra_data: Optional[Dict] = None):
         """Логирование предупреждения"""
         logger = LogService.get_logger(task_id, novel_id, chapter_id)
-        if extra_data:
-            logger.warning(message, extra={'extra_data': extra_data})
-        else:
-            logger.warning(message)
-        
+        logger.warning(message, extra=_record_extra(task_id, novel_id, chapter_id, extra_data))
+
         # Отправляем в консоль
-        source = 'system'
-        if task_id:
-            task = Task.query.get(task_id)
-            if task and task.task_type:
-                source = task.task_type
-        elif novel_id:
-            # Определяем источник на основе контекста
-            if 'редактур' in message.lower() or 'отредактирован' in message.lower():
-                source = 'editor'
-            elif 'перевод' in message.lower() or 'переведен' in message.lower():
-                source = 'translator'
-            elif 'парсинг' in message.lower() or 'обработк' in message.lower():
-                source = 'parser'
-            else:
-                source = 'system'
-        add_console_message(message, 'WARNING', source)
+        add_console_message(message, 'WARNING', _console_source(message, task_id, novel_id))
     
     @staticmethod
     def log_debug(message: str, task_id: Optional[int] = None, novel_id: Optional[int] = None,
                   chapter_id: Optional[int] = None, extra_data: Optional[Dict] = None):
         """Логирование отладочной информации"""
         logger = LogService.get_logger(task_id, novel_id, chapter_id)
-        if extra_data:
-            logger.debug(message, extra={'extra_data': extra_data})
-        else:
-            logger.debug(message)
-        
+        logger.debug(message, extra=_record_extra(task_id, novel_id, chapter_id, extra_data))
+
         # Отправляем в консоль
-        source = 'system'
-        if task_id:
-            task = Task.query.get(task_id)
-            if task and task.task_type:
-                source = task.task_type
-        elif novel_id:
-            # Определяем источник на основе контекста
-            if 'редактур' in message.lower() or 'отредактирован' in message.lower():
-                source = 'editor'
-            elif 'перевод' in message.lower() or 'переведен' in message.lower():
-                source = 'translator'
-            elif 'парсинг' in message.lower() or 'обработк' in message.lower():
-                source = 'parser'
-            else:
-                source = 'system'
-        add_console_message(message, 'DEBUG', source)
+        add_console_message(message, 'DEBUG', _console_source(message, task_id, novel_id))
     
     @staticmethod
     def get_logs(task_id: Optional[int] = None, novel_id: Optional[int] = None,
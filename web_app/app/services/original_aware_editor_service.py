@@ -18,20 +18,8 @@ from app.services.log_service import LogService
 from app.services.prompt_template_service import PromptTemplateService
 from app.services.glossary_service import GlossaryService
 
-# Для нормализации традиционного/упрощённого китайского
-try:
-    from opencc import OpenCC
-    _opencc_t2s = OpenCC('t2s')  # Traditional to Simplified
-
-    def normalize_chinese(text: str) -> str:
-        """Нормализация китайского текста: традиционный → упрощённый"""
-        if not text:
-            return text
-        return _opencc_t2s.convert(text)
-except ImportError:
-    def normalize_chinese(text: str) -> str:
-        """Fallback: без нормализации если OpenCC не установлен"""
-        return text
+# Поиск терминов глоссария (с нормализацией традиционного/упрощённого китайского)
+from app.utils.glossary_matcher import GlossaryMatcher, filter_glossary_by_text
 
 logger = logging.getLogger(__name__)
 
@@ -868,18 +856,14 @@ class OriginalAwareEditorService(GlossaryAwareEditorService):
         if not original_text:
             return ""
 
-        # Нормализуем оригинальный текст для поиска
-        original_normalized = normalize_chinese(original_text)
+        # Термины главы находим за один проход по тексту
+        glossary = filter_glossary_by_text(glossary, original_text)
 
         result = ["ГЛОССАРИЙ ТЕРМИНОВ:"]
 
         for category in ['characters', 'locations', 'terms', 'techniques', 'artifacts']:
-            terms = glossary.get(category, {})
-            for chinese, russian in terms.items():
-                # Проверяем и оригинальный и нормализованный вариант
-                chinese_normalized = normalize_chinese(chinese)
-                if chinese in original_text or chinese_normalized in original_normalized:
-                    result.append(f"  {chinese} = {russian}")
+            for chinese, russian in glossary.get(category, {}).items():
+                result.append(f"  {chinese} = {russian}")
 
         # Если ничего не найдено, возвращаем пустую строку
         if len(result) == 1:
@@ -898,11 +882,10 @@ class OriginalAwareEditorService(GlossaryAwareEditorService):
 
         if original_text:
             # Контекстная фильтрация - только персонажи из этой главы
-            original_normalized = normalize_chinese(original_text)
+            found_terms = GlossaryMatcher.for_glossary(glossary).find_terms(original_text)
             result.append("ПЕРСОНАЖИ:")
             for chinese, russian in characters.items():
-                chinese_normalized = normalize_chinese(chinese)
-                if chinese in original_text or chinese_normalized in original_normalized:
+                if chinese in found_terms:
                     result.append(f"  {chinese} = {russian}")
         else:
             # Fallback - первые 100 персонажей
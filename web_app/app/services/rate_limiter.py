@@ -0,0 +1,387 @@
+"""
+Распределённые лимитеры для LLM провайдеров (Redis, общие для всех процессов воркера):
+token bucket RPM/TPM и адаптивный лимитер параллельности (AIMD).
+
+Бюджеты RPM/TPM хранятся в Redis, поэтому их соблюдают все процессы prefork воркера
+вместе. Вызывающий ждёт ровно столько, сколько требует бюджет, вместо фиксированных пауз.
+
+Лимиты задаются per модель в provider_config:
+    {"rate_limit": {"rpm": 15, "tpm": 1000000}}
+либо по умолчанию для провайдера через окружение:
+    LLM_RATE_LIMIT_GEMINI_RPM=15, LLM_RATE_LIMIT_GEMINI_TPM=1000000
+Без настроек ограничение не применяется.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import redis
+
+from app.utils.redis_client import get_shared_redis, log_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ratelimit'
+
+# Атомарное списание из всех bucket'ов запроса (RPM и TPM) по принципу «всё или ничего»:
+# возвращает 0, если токены списаны из каждого, иначе — сколько миллисекунд ждать
+# до появления нужного количества во всех (ничего не списывается).
+# KEYS — bucket'ы, ARGV — тройки (ёмкость, скорость в сек, стоимость) в том же порядке.
+# Время берётся у Redis, чтобы воркеры на разных хостах видели одни часы.
+_TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local balances = {}
+local wait_ms = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1])
+    local ts = tonumber(bucket[2])
+    if tokens == nil then
+        tokens = capacity
+        ts = now
+    end
+
+    tokens = math.min(capacity, tokens + (now - ts) * rate / 1000)
+    balances[i] = tokens
+    if tokens < cost then
+        wait_ms = math.max(wait_ms, math.ceil((cost - tokens) * 1000 / rate))
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local tokens = balances[i]
+    if wait_ms == 0 then
+        tokens = tokens - tonumber(ARGV[i * 3])
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity * 1000 / rate) + 60000)
+end
+return wait_ms
+"""
+
+# Дополнительное списание (после ответа — фактические токены сверх оценки), баланс может уйти в минус
+_TOKEN_DEBIT_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + (now - ts) * rate / 1000) - cost
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 60000)
+return 0
+"""
+
+# Короткие вызовы Redis из event loop (лимитеры) — в собственном пуле потоков, а не в
+# пуле loop'а по умолчанию: его занимают кэш ответов и колбэки частей, и ожидающие
+# слота запросы не должны отнимать у них потоки (и наоборот)
+_redis_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ratelimit-redis')
+
+
+def _get_redis() -> redis.Redis:
+    return get_shared_redis('RATE_LIMIT_REDIS_URL')
+
+
+class TokenBucketRateLimiter:
+    """
+    Пара bucket'ов RPM (запросы) и TPM (токены) для одного провайдера/ключа.
+    Bucket вмещает минутный бюджет и пополняется равномерно.
+    """
+
+    def __init__(self, name: str, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+
+    def _buckets(self, tokens: int):
+        """(ключ, ёмкость, скорость в сек, стоимость) для каждого настроенного лимита"""
+        buckets = []
+        if self.rpm:
+            buckets.append((f"{KEY_PREFIX}:{self.name}:rpm", self.rpm, self.rpm / 60.0, 1))
+        if self.tpm and tokens:
+            # Запрос больше минутного бюджета всё равно должен пройти — ограничиваем стоимость ёмкостью
+            buckets.append((f"{KEY_PREFIX}:{self.name}:tpm", self.tpm, self.tpm / 60.0, min(tokens, self.tpm)))
+        return buckets
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Одна попытка списания. Возвращает время ожидания в секундах (0 — бюджет получен)."""
+        client = _get_redis()
+        buckets = self._buckets(tokens)
+        if not buckets:
+            return 0
+        try:
+            # RPM и TPM списываются одним скриптом: ожидание одного не расходует бюджет другого
+            args = [value for _, capacity, rate, cost in buckets for value in (capacity, rate, cost)]
+            wait_ms = client.eval(_TOKEN_BUCKET_SCRIPT, len(buckets), *[key for key, *_ in buckets], *args)
+            return wait_ms / 1000.0
+        except redis.RedisError as e:
+            # Redis недоступен — не блокируем перевод, работаем без ограничения
+            log_redis_unavailable('Rate limiter', e, 'ограничение отключено')
+            return 0
+
+    def acquire(self, tokens: int = 0, timeout: float = 600) -> bool:
+        """Дождаться бюджета на один запрос из tokens токенов (блокирует поток)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0, timeout: float = 600) -> bool:
+        """То же, что acquire, но не блокирует event loop."""
+        deadline = time.monotonic() + timeout
+        while True:
+            wait = await asyncio.get_running_loop().run_in_executor(_redis_executor, self._try_acquire, tokens)
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            if wait >= 5:
+                logger.info(f"⏳ Rate limit {self.name}: ожидание {wait:.1f}с")
+            await asyncio.sleep(wait)
+
+    def debit(self, tokens: int):
+        """Списать токены сверх оценки по фактическому usage ответа."""
+        if not self.tpm or tokens <= 0:
+            return
+        try:
+            _get_redis().eval(_TOKEN_DEBIT_SCRIPT, 1, f"{KEY_PREFIX}:{self.name}:tpm",
+                              self.tpm, self.tpm / 60.0, tokens)
+        except redis.RedisError:
+            pass
+
+
+def get_rate_limiter(model, api_key: Optional[str] = None) -> Optional[TokenBucketRateLimiter]:
+    """
+    Лимитер для модели и конкретного API ключа (бюджеты провайдеров считаются per ключ).
+    None — лимиты не настроены.
+    """
+    provider = (getattr(model, 'provider', None) or '').lower()
+    config = (getattr(model, 'provider_config', None) or {}).get('rate_limit') or {}
+
+    rpm = config.get('rpm') or os.getenv(f'LLM_RATE_LIMIT_{provider.upper()}_RPM')
+    tpm = config.get('tpm') or os.getenv(f'LLM_RATE_LIMIT_{provider.upper()}_TPM')
+    if not rpm and not tpm:
+        return None
+
+    # Ключ не храним в Redis в открытом виде
+    key_id = hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else 'default'
+    return TokenBucketRateLimiter(
+        name=f"{provider}:{key_id}",
+        rpm=int(rpm) if rpm else None,
+        tpm=int(tpm) if tpm else None,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Распределённый адаптивный лимитер параллельности (AIMD)
+# ---------------------------------------------------------------------------
+
+# Захват слота: чистим просроченные аренды (упавшие процессы), проверяем текущий лимит.
+# KEYS: active (zset token→expires_ms), limit; ARGV: max_concurrent, token, lease_ms
+_SLOT_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+    redis.call('PEXPIRE', KEYS[1], tonumber(ARGV[3]))
+    return 1
+end
+return 0
+"""
+
+# Additive increase: +1 к лимиту после серии успехов. KEYS: limit, streak; ARGV: max_concurrent, streak_size
+_SLOT_SUCCESS_SCRIPT = """
+local streak = redis.call('INCR', KEYS[2])
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if streak >= tonumber(ARGV[2]) and limit < tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], limit + 1)
+    redis.call('SET', KEYS[2], 0)
+    return limit + 1
+end
+return 0
+"""
+
+# Multiplicative decrease (здесь -1, как у локального лимитера, минимум 1). KEYS: limit, streak; ARGV: max_concurrent
+_SLOT_429_SCRIPT = """
+redis.call('SET', KEYS[2], 0)
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if limit > 1 then
+    redis.call('SET', KEYS[1], limit - 1)
+    return limit - 1
+end
+return 0
+"""
+
+
+class DistributedConcurrencyLimiter:
+    """
+    Адаптивный лимитер параллельности, общий для всех процессов воркера (Redis).
+    Интерфейс как у AdaptiveConcurrencyLimiter (acquire/release/report_success/report_429),
+    но acquire возвращает аренду, которую нужно передать в release: так освобождается
+    ровно захваченный слот (Redis или локальный), даже если Redis успел пропасть или вернуться.
+
+    Слот — аренда в sorted set с временем истечения: если процесс упал, не освободив слот,
+    аренда истечёт сама. При недоступности Redis лимитер работает локально (fallback).
+    """
+
+    SUCCESS_STREAK = 5
+    # Аренда должна пережить самый долгий запрос (таймаут Ollama/OpenRouter — 30 минут)
+    LEASE_SECONDS = 2000
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, name: str, max_concurrent: int, fallback=None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.fallback = fallback
+        self._active_key = f"climit:{name}:active"
+        self._limit_key = f"climit:{name}:limit"
+        self._streak_key = f"climit:{name}:streak"
+        self._using_fallback = False
+
+    @property
+    def current_limit(self) -> int:
+        try:
+            value = _get_redis().get(self._limit_key)
+            return int(value) if value is not None else self.max_concurrent
+        except redis.RedisError:
+            return self.fallback.current_limit if self.fallback else self.max_concurrent
+
+    def _switch_to_fallback(self, error) -> bool:
+        if self.fallback is None:
+            return False
+        if not self._using_fallback:
+            logger.warning(f"⚠️ Лимитер {self.name}: Redis недоступен ({error}), переключаемся на локальный")
+            self._using_fallback = True
+        return True
+
+    def _try_acquire(self, token: str, fallback_timeout: float = 0) -> Optional[Tuple[str, Optional[str]]]:
+        """Одна попытка захвата: аренда или None, если все слоты заняты"""
+        try:
+            acquired = _get_redis().eval(
+                _SLOT_ACQUIRE_SCRIPT, 2, self._active_key, self._limit_key,
+                self.max_concurrent, token, int(self.LEASE_SECONDS * 1000)
+            )
+            self._using_fallback = False
+        except redis.RedisError as e:
+            if not self._switch_to_fallback(e):
+                return ('none', None)
+            return ('fallback', None) if self.fallback.acquire(timeout=fallback_timeout) else None
+        return ('redis', token) if acquired else None
+
+    def acquire(self, timeout: float = 300) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Захватить слот. Блокирует поток пока занято current_limit слотов во всех процессах.
+
+        Returns:
+            Аренда для release: ('redis', token), ('fallback', None) или ('none', None)
+            (Redis недоступен и fallback нет — без ограничения); None — таймаут
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while True:
+            lease = self._try_acquire(token, fallback_timeout=max(0, deadline - time.monotonic()))
+            if lease:
+                return lease
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    async def acquire_async(self, timeout: float = 300) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        То же, что acquire, но ожидание слота — asyncio.sleep в event loop: ожидающие
+        запросы не держат потоки, в пул уходят только короткие вызовы Redis.
+        """
+        loop = asyncio.get_running_loop()
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + timeout
+        while True:
+            attempt = loop.run_in_executor(_redis_executor, self._try_acquire, token)
+            try:
+                lease = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                # Слот может быть получен уже после отмены — возвращаем его
+                def release_if_acquired(f):
+                    if not f.cancelled() and f.exception() is None and f.result():
+                        self.release(f.result())
+                attempt.add_done_callback(release_if_acquired)
+                raise
+            if lease:
+                return lease
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    def release(self, lease: Tuple[str, Optional[str]]):
+        """Освободить слот, захваченный acquire (аренда — его результат)."""
+        kind, token = lease
+        if kind == 'fallback':
+            self.fallback.release()
+            return
+        if kind != 'redis':
+            return
+        try:
+            _get_redis().zrem(self._active_key, token)
+        except redis.RedisError:
+            pass  # аренда истечёт сама
+
+    async def release_async(self, lease: Tuple[str, Optional[str]]):
+        """release вне event loop (вызов Redis)"""
+        await asyncio.shield(asyncio.get_running_loop().run_in_executor(_redis_executor, self.release, lease))
+
+    async def report_success_async(self):
+        """report_success вне event loop (вызов Redis)"""
+        await asyncio.get_running_loop().run_in_executor(_redis_executor, self.report_success)
+
+    async def report_429_async(self):
+        """report_429 вне event loop (вызов Redis)"""
+        await asyncio.get_running_loop().run_in_executor(_redis_executor, self.report_429)
+
+    def report_success(self):
+        """Сообщить об успешном запросе. После серии успехов во всём пуле увеличивает лимит."""
+        try:
+            new_limit = _get_redis().eval(
+                _SLOT_SUCCESS_SCRIPT, 2, self._limit_key, self._streak_key,
+                self.max_concurrent, self.SUCCESS_STREAK
+            )
+            if new_limit:
+                logger.info(f"📈 Адаптивный лимит {self.name} увеличен до {new_limit}/{self.max_concurrent}")
+        except redis.RedisError:
+            if self.fallback:
+                self.fallback.report_success()
+
+    def report_429(self):
+        """Сообщить о 429 ошибке. Уменьшает общий лимит (минимум 1)."""
+        try:
+            new_limit = _get_redis().eval(
+                _SLOT_429_SCRIPT, 2, self._limit_key, self._streak_key, self.max_concurrent
+            )
+            if new_limit:
+                logger.warning(f"📉 Адаптивный лимит {self.name} уменьшен до {new_limit}/{self.max_concurrent}")
+        except redis.RedisError:
+            if self.fallback:
+                self.fallback.report_429()
@@ -0,0 +1,83 @@
+"""
+Контрольные точки перевода по частям главы (Redis, общие для всех процессов воркера)
+
+Каждая переведённая часть сохраняется в hash главы сразу после перевода. Поле —
+номер части и хэш (промпт перевода, температура, текст части), поэтому повтор задачи
+или перезапуск воркера переводит только недостающие части, а изменённый текст,
+промпт или температура автоматически дают новые поля.
+
+Hash удаляется после сохранения перевода главы и при окончательном отказе валидации;
+незавершённые контрольные точки живут TRANSLATION_CHECKPOINT_TTL_HOURS часов.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import redis
+
+from app.utils.redis_client import get_shared_redis, log_redis_unavailable
+
+TRANSLATION_CHECKPOINT_ENABLED = os.getenv('TRANSLATION_CHECKPOINT_ENABLED', 'true').lower() == 'true'
+TRANSLATION_CHECKPOINT_TTL_HOURS = float(os.getenv('TRANSLATION_CHECKPOINT_TTL_HOURS', '72'))
+
+KEY_PREFIX = 'translation_parts'
+
+def _get_redis() -> redis.Redis:
+    # URL — TRANSLATION_CHECKPOINT_REDIS_URL, по умолчанию RATE_LIMIT_REDIS_URL
+    return get_shared_redis('TRANSLATION_CHECKPOINT_REDIS_URL')
+
+
+def _log_unavailable(e: Exception):
+    log_redis_unavailable('Контрольные точки перевода', e, 'главы переводятся целиком')
+
+
+class TranslationCheckpoint:
+    """Операции с контрольными точками; при недоступном Redis ведёт себя как пустое хранилище"""
+
+    @staticmethod
+    def chapter_key(chapter_id: int) -> str:
+        return f"{KEY_PREFIX}:{chapter_id}"
+
+    @staticmethod
+    def field(index: int, part: str, prompt: str, temperature: Optional[float]) -> str:
+        """Поле hash: номер части и хэш всего, что определяет её перевод (кроме контекста главы)"""
+        payload = json.dumps([prompt or '', temperature, part], ensure_ascii=False)
+        return f"{index}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+
+    @staticmethod
+    def load(chapter_id: int, parts: List[str], prompt: str, temperature: Optional[float]) -> Dict[int, str]:
+        """Сохранённые переводы частей: {номер части: перевод}"""
+        if not TRANSLATION_CHECKPOINT_ENABLED or not parts:
+            return {}
+        fields = [TranslationCheckpoint.field(index, part, prompt, temperature) for index, part in enumerate(parts)]
+        try:
+            values = _get_redis().hmget(TranslationCheckpoint.chapter_key(chapter_id), fields)
+        except redis.RedisError as e:
+            _log_unavailable(e)
+            return {}
+        return {index: value for index, value in enumerate(values) if value}
+
+    @staticmethod
+    def save(chapter_id: int, index: int, part: str, prompt: str, temperature: Optional[float],
+             translation: str):
+        if not TRANSLATION_CHECKPOINT_ENABLED or not translation:
+            return
+        key = TranslationCheckpoint.chapter_key(chapter_id)
+        try:
+            pipe = _get_redis().pipeline()
+            pipe.hset(key, TranslationCheckpoint.field(index, part, prompt, temperature), translation)
+            pipe.expire(key, max(1, int(TRANSLATION_CHECKPOINT_TTL_HOURS * 3600)))
+            pipe.execute()
+        except redis.RedisError as e:
+            _log_unavailable(e)
+
+    @staticmethod
+    def clear(chapter_id: int):
+        """Удаление всех контрольных точек главы"""
+        if not TRANSLATION_CHECKPOINT_ENABLED:
+            return
+        try:
+            _get_redis().delete(TranslationCheckpoint.chapter_key(chapter_id))
+        except redis.RedisError as e:
+            _log_unavailable(e)
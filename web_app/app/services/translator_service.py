@@ -6,31 +6,28 @@ import time
 import json
 import re
 import logging
+import threading
 from typing import Dict, List, Optional, Tuple
 import httpx
 from httpx_socks import SyncProxyTransport
+from sqlalchemy import func
 from app.models import Chapter, Translation, GlossaryItem, PromptTemplate
 from app import db
 from app.services.settings_service import SettingsService
 from app.services.log_service import LogService
+from app.services.translation_checkpoint import TranslationCheckpoint
 
-# Для нормализации традиционного/упрощённого китайского
-try:
-    from opencc import OpenCC
-    _opencc_t2s = OpenCC('t2s')  # Traditional to Simplified
-
-    def normalize_chinese(text: str) -> str:
-        """Нормализация китайского текста: традиционный → упрощённый"""
-        if not text:
-            return text
-        return _opencc_t2s.convert(text)
-except ImportError:
-    def normalize_chinese(text: str) -> str:
-        """Fallback: без нормализации если OpenCC не установлен"""
-        return text
+# Нормализация традиционного/упрощённого китайского и поиск терминов глоссария
+from app.utils.glossary_matcher import (
+    GlossaryMatcher, TermPrefixTrie, filter_glossary_by_text, normalize_chinese_many
+)
 
 logger = logging.getLogger(__name__)
 
+# Префиксные деревья глоссариев для проверки конфликтов: {novel_id: (отпечаток, дерево)}
+_glossary_prefix_cache: Dict[int, Tuple[tuple, TermPrefixTrie]] = {}
+_glossary_prefix_lock = threading.Lock()
+
 
 class SafeDict(dict):
     """Словарь для str.format_map(), возвращающий плейсхолдер при отсутствии ключа.
@@ -697,8 +694,8 @@ class LLMTranslator:
         if not original_text or not glossary:
             return "Глоссарий пуст"
 
-        # Нормализуем оригинальный текст для поиска
-        original_normalized = normalize_chinese(original_text)
+        # Термины главы находим за один проход по тексту
+        glossary = filter_glossary_by_text(glossary, original_text)
 
         lines = []
 
@@ -711,10 +708,7 @@ class LLMTranslator:
         ]:
             found = []
             for chinese, russian in glossary.get(category, {}).items():
-                # Проверяем и оригинальный и нормализованный вариант
-                chinese_normalized = normalize_chinese(chinese)
-                if chinese in original_text or chinese_normalized in original_normalized:
-                    found.append(f"- {chinese} = {russian}")
+                found.append(f"- {chinese} = {russian}")
             if found:
                 lines.append(f"{label}:")
                 lines.extend(found)
@@ -726,38 +720,58 @@ class LLMTranslator:
 class TranslationContext:
     """Контекст для перевода главы"""
 
-    def __init__(self, novel_id: int, original_text: str = None):
+    # Сколько резюме предыдущих глав попадает в контекст
+    MAX_PREVIOUS_SUMMARIES = 5
+    # Минимальная длина текста для включения в контекст (фильтр заметок автора)
+    MIN_CHAPTER_LENGTH = 500
+
+    def __init__(self, novel_id: int, original_text: str = None, previous_summaries: List[Dict] = None):
+        """
+        Args:
+            previous_summaries: готовые резюме предыдущих глав (конвейерный перевод передаёт их
+                                из памяти, не дожидаясь сохранения глав в БД). None — загрузить из БД.
+        """
         self.novel_id = novel_id
         self.original_text = original_text
-        self.previous_summaries = []
+        self.previous_summaries = list(previous_summaries) if previous_summaries is not None else []
         self.glossary = {}
-        self._load_context()
+        self._load_context(load_summaries=previous_summaries is None)
     
-    def _load_context(self):
+    def _load_context(self, load_summaries: bool = True):
         """Загрузка контекста из базы данных"""
         # Загружаем резюме предыдущих глав (до 5)
         from app.models import Chapter
-        chapters = Chapter.query.filter_by(
-            novel_id=self.novel_id, 
-            status='translated'
-        ).order_by(Chapter.chapter_number.desc()).limit(5).all()
-        
-        # Минимальная длина текста для включения в контекст (фильтр заметок автора)
-        MIN_CHAPTER_LENGTH = 500
-
-        for chapter in reversed(chapters):
-            if chapter.current_translation and chapter.current_translation.summary:
-                # Пропускаем заметки автора (< 500 символов)
-                if not chapter.original_text or len(chapter.original_text) < MIN_CHAPTER_LENGTH:
-                    continue
-                self.previous_summaries.append({
-                    'title': chapter.original_title,
-                    'summary': chapter.current_translation.summary
-                })
+        if load_summaries:
+            chapters = Chapter.query.filter_by(
+                novel_id=self.novel_id, 
+                status='translated'
+            ).order_by(Chapter.chapter_number.desc()).limit(self.MAX_PREVIOUS_SUMMARIES).all()
+
+            for chapter in reversed(chapters):
+                if chapter.current_translation and chapter.current_translation.summary:
+                    # Пропускаем заметки автора (< 500 символов)
+                    if not chapter.original_text or len(chapter.original_text) < self.MIN_CHAPTER_LENGTH:
+                        continue
+                    self.previous_summaries.append({
+                        'title': chapter.original_title,
+                        'summary': chapter.current_translation.summary
+                    })
         
         # Загружаем глоссарий
         self.glossary = GlossaryItem.get_glossary_dict(self.novel_id)
 
+    def summaries_after(self, chapter: Chapter, summary: Optional[str]) -> List[Dict]:
+        """Резюме, которые увидит следующая глава: текущие + резюме этой главы"""
+        return self.append_summary(self.previous_summaries, chapter, summary)
+
+    @classmethod
+    def append_summary(cls, summaries: List[Dict], chapter: Chapter, summary: Optional[str]) -> List[Dict]:
+        """Добавить резюме главы к списку (с теми же фильтрами, что и при загрузке из БД)"""
+        summaries = list(summaries)
+        if summary and chapter.original_text and len(chapter.original_text) >= cls.MIN_CHAPTER_LENGTH:
+            summaries.append({'title': chapter.original_title, 'summary': summary})
+        return summaries[-cls.MAX_PREVIOUS_SUMMARIES:]
+
     def _format_context_glossary(self) -> str:
         """
         Форматирование глоссария с фильтрацией по контексту главы.
@@ -767,16 +781,15 @@ class TranslationContext:
         if not self.original_text or not self.glossary:
             return ""
 
-        # Нормализуем оригинальный текст для поиска
-        original_normalized = normalize_chinese(self.original_text)
+        # Термины главы находим за один проход по тексту
+        found_terms = GlossaryMatcher.for_glossary(self.glossary).find_terms(self.original_text)
 
         lines = []
         found_any = False
 
         def term_matches(chinese: str) -> bool:
             """Проверяет, есть ли термин в тексте (с учётом нормализации)"""
-            chinese_norm = normalize_chinese(chinese)
-            return chinese in self.original_text or chinese_norm in original_normalized
+            return chinese in found_terms
 
         # Персонажи
         chars_found = []
@@ -914,8 +927,31 @@ class TranslatorService:
 
         logger.info("✅ TranslatorService инициализирован (legacy mode)")
 
-    def translate_chapter(self, chapter: Chapter) -> bool:
-        """Перевод главы с использованием шаблона промпта и глоссария"""
+    def _pace(self, seconds: float):
+        """
+        Пауза между запросами частей, если для модели не настроен rate limiter
+        (с настроенным RPM/TPM темп выдерживает token bucket)
+        """
+        rate_limited = getattr(self, '_rate_limited', None)
+        if rate_limited is None:
+            from app.services.rate_limiter import get_rate_limiter
+            model = getattr(self.translator, 'model', None)
+            rate_limited = self._rate_limited = model is not None and get_rate_limiter(model) is not None
+        if not rate_limited:
+            time.sleep(seconds)
+
+    def translate_chapter(self, chapter: Chapter, previous_summaries: List[Dict] = None,
+                          on_summary_ready=None, should_stop=None) -> bool:
+        """
+        Перевод главы с использованием шаблона промпта и глоссария
+
+        Args:
+            previous_summaries: резюме предыдущих глав для контекста (None — из БД)
+            on_summary_ready: callback(summaries) — вызывается сразу после генерации резюме
+                              со списком резюме для следующей главы (конвейерный перевод)
+            should_stop: callable() -> bool — задача отменена; проверяется перед сохранением
+                         терминов и перевода (переведённые части остаются в контрольных точках)
+        """
         LogService.log_info(f"Начинаем перевод главы {chapter.chapter_number}: {chapter.original_title}", 
                           novel_id=chapter.novel_id, chapter_id=chapter.id)
         print(f"🔄 Перевод главы {chapter.chapter_number}: {chapter.original_title}")
@@ -948,14 +984,8 @@ class TranslatorService:
             # Создаем контекст перевода с оригинальным текстом для контекстной фильтрации глоссария
             LogService.log_info(f"Создаем контекст перевода для главы {chapter.chapter_number}",
                               novel_id=chapter.novel_id, chapter_id=chapter.id)
-            context = TranslationContext(chapter.novel_id, chapter.original_text)
-            context_prompt = context.build_context_prompt()
-
-            # Добавляем оригинальное название главы в контекст для лучшего понимания LLM
-            if chapter.original_title:
-                context_prompt = f"НАЗВАНИЕ ГЛАВЫ: {chapter.original_title}\n\n{context_prompt}" if context_prompt else f"НАЗВАНИЕ ГЛАВЫ: {chapter.original_title}"
-                LogService.log_info(f"Добавлено название главы в контекст: {chapter.original_title}",
-                                  novel_id=chapter.novel_id, chapter_id=chapter.id)
+            context = TranslationContext(chapter.novel_id, chapter.original_text, previous_summaries)
+            context_prompt = self._chapter_context_prompt(chapter, context)
 
             LogService.log_info(f"Контекст перевода создан, длина: {len(context_prompt)} символов",
                               novel_id=chapter.novel_id, chapter_id=chapter.id)
@@ -984,7 +1014,37 @@ class TranslatorService:
             
             translated_parts = []
             retry_with_smaller_parts = False
-            
+
+            # Конкурентный перевод частей: контекст общий, части независимы.
+            # Заблокированные/неудачные части дальше обрабатываются тем же циклом, что и в последовательном режиме.
+            novel_config = chapter.novel.config or {}
+            translation_temperature = novel_config.get('translation_temperature', 0.1)
+            parallel_parts = int(novel_config.get('translation_parallel_parts', 3) or 1)
+
+            # Части, переведённые до падения воркера или предыдущей попытки задачи
+            checkpointed_parts = self._load_part_checkpoints(
+                chapter, text_parts, formatted_translation_prompt, translation_temperature
+            )
+            missing_indexes = [i for i in range(len(text_parts)) if i not in checkpointed_parts]
+
+            prefetched_parts = None
+            if parallel_parts > 1 and len(missing_indexes) > 1 and hasattr(self.translator, 'translate_parts'):
+                LogService.log_info(f"Параллельный перевод {len(missing_indexes)} частей главы {chapter.chapter_number} (до {parallel_parts} одновременно)",
+                                  novel_id=chapter.novel_id, chapter_id=chapter.id)
+                missing_translations = self.translator.translate_parts(
+                    [text_parts[i] for i in missing_indexes],
+                    formatted_translation_prompt,
+                    context_prompt,
+                    chapter.id,
+                    temperature=translation_temperature,
+                    max_concurrent=parallel_parts,
+                    on_part_done=lambda position, translated: self._save_part_checkpoint(
+                        chapter.id, missing_indexes[position], text_parts[missing_indexes[position]],
+                        formatted_translation_prompt, translation_temperature, translated
+                    )
+                )
+                prefetched_parts = dict(zip(missing_indexes, missing_translations))
+
             for i, part in enumerate(text_parts):
                 LogService.log_info(f"Перевод части {i+1}/{len(text_parts)} главы {chapter.chapter_number}", 
                                   novel_id=chapter.novel_id, chapter_id=chapter.id)
@@ -994,16 +1054,25 @@ class TranslatorService:
                 novel_config = chapter.novel.config or {}
                 translation_temperature = novel_config.get('translation_temperature', 0.1)
                 
-                # Переводим часть
-                LogService.log_info(f"Отправляем запрос на перевод части {i+1} с температурой {translation_temperature}", 
-                                  novel_id=chapter.novel_id, chapter_id=chapter.id)
-                translated_part = self.translator.translate_text(
-                    part, 
-                    formatted_translation_prompt,
-                    context_prompt,
-                    chapter.id,
-                    temperature=translation_temperature
-                )
+                # Часть из контрольной точки или уже переведённая в параллельном режиме
+                part_complete = True
+                if i in checkpointed_parts:
+                    LogService.log_info(f"♻️ Часть {i+1} восстановлена из контрольной точки",
+                                      novel_id=chapter.novel_id, chapter_id=chapter.id)
+                    translated_parts.append(checkpointed_parts[i])
+                    continue
+                if prefetched_parts is not None:
+                    translated_part = prefetched_parts[i]
+                else:
+                    LogService.log_info(f"Отправляем запрос на перевод части {i+1} с температурой {translation_temperature}", 
+                                      novel_id=chapter.novel_id, chapter_id=chapter.id)
+                    translated_part = self.translator.translate_text(
+                        part, 
+                        formatted_translation_prompt,
+                        context_prompt,
+                        chapter.id,
+                        temperature=translation_temperature
+                    )
                 
                 # Проверяем, не заблокирован ли контент
                 if translated_part == "CONTENT_BLOCKED_NEED_SPLIT":
@@ -1028,12 +1097,12 @@ class TranslatorService:
                         # Разбиваем по китайским знакам препинания
                         sentences_raw = re.split(r'([。！？；，])', part)  # Включаем запятую для более мелкого разбиения
                         sentences = []
-                        for i in range(0, len(sentences_raw)-1, 2):
-                            if i+1 < len(sentences_raw):
-                                sentences.append(sentences_raw[i] + sentences_raw[i+1])
+                        for k in range(0, len(sentences_raw)-1, 2):
+                            if k+1 < len(sentences_raw):
+                                sentences.append(sentences_raw[k] + sentences_raw[k+1])
                             else:
-                                if sentences_raw[i].strip():
-                                    sentences.append(sentences_raw[i])
+                                if sentences_raw[k].strip():
+                                    sentences.append(sentences_raw[k])
                         # Добавляем последний элемент если он не пустой
                         if len(sentences_raw) % 2 == 1 and sentences_raw[-1].strip():
                             sentences.append(sentences_raw[-1])
@@ -1093,8 +1162,9 @@ class TranslatorService:
                             LogService.log_warning(f"Мини-фрагмент {j+1} всё ещё заблокирован, добавляем заметку", 
                                                  novel_id=chapter.novel_id, chapter_id=chapter.id)
                             sub_translations.append("[Фрагмент временно недоступен для перевода]")
-                        
-                        time.sleep(0.5)  # Маленькая пауза между мини-фрагментами
+                            part_complete = False
+
+                        self._pace(0.5)  # Маленькая пауза между мини-фрагментами
                     
                     # Объединяем мини-переводы
                     translated_part = " ".join(sub_translations)
@@ -1110,7 +1180,13 @@ class TranslatorService:
                 LogService.log_info(f"Часть {i+1} переведена успешно, длина: {len(translated_part)} символов", 
                                   novel_id=chapter.novel_id, chapter_id=chapter.id)
                 translated_parts.append(translated_part)
-                time.sleep(1)  # Пауза между частями
+                # Части с заметками о заблокированных фрагментах при повторе переводятся заново;
+                # успешные ответы параллельного режима уже сохранены по мере готовности
+                if part_complete and (prefetched_parts is None or translated_part != prefetched_parts.get(i)):
+                    self._save_part_checkpoint(chapter.id, i, part, formatted_translation_prompt,
+                                               translation_temperature, translated_part)
+                if prefetched_parts is None:
+                    self._pace(1)  # Пауза между частями
             
             # Если нужно переразбить на более мелкие части
             if retry_with_smaller_parts and len(text_parts) == 1:
@@ -1123,12 +1199,20 @@ class TranslatorService:
                 LogService.log_info(f"Текст переразбит на {len(text_parts)} ультра-мелких частей (по 100 слов)", 
                                   novel_id=chapter.novel_id, chapter_id=chapter.id)
                 
+                checkpointed_parts = self._load_part_checkpoints(
+                    chapter, text_parts, formatted_translation_prompt, translation_temperature
+                )
                 translated_parts = []
                 for i, part in enumerate(text_parts):
+                    if i in checkpointed_parts:
+                        translated_parts.append(checkpointed_parts[i])
+                        continue
+
                     LogService.log_info(f"Перевод мелкой части {i+1}/{len(text_parts)}", 
                                       novel_id=chapter.novel_id, chapter_id=chapter.id)
                     print(f"   📝 Перевод мелкой части {i+1}/{len(text_parts)}")
                     
+                    part_complete = True
                     translated_part = self.translator.translate_text(
                         part, 
                         formatted_translation_prompt,
@@ -1165,7 +1249,8 @@ class TranslatorService:
                                 ultra_translations.append(ultra_translation)
                             else:
                                 ultra_translations.append("[Фрагмент недоступен]")
-                            time.sleep(0.3)
+                                part_complete = False
+                            self._pace(0.3)
                         
                         translated_part = " ".join(ultra_translations)
                     
@@ -1175,7 +1260,10 @@ class TranslatorService:
                         return False
                     
                     translated_parts.append(translated_part)
-                    time.sleep(0.5)
+                    if part_complete:
+                        self._save_part_checkpoint(chapter.id, i, part, formatted_translation_prompt,
+                                                   translation_temperature, translated_part)
+                    self._pace(0.5)
             
             # Объединяем части
             LogService.log_info(f"Объединяем переведенные части главы {chapter.chapter_number}", 
@@ -1191,84 +1279,7 @@ class TranslatorService:
             LogService.log_info(f"Заголовок: '{title}', длина контента: {len(content)} символов",
                               novel_id=chapter.novel_id, chapter_id=chapter.id)
 
-            # ========== НОВАЯ ЛОГИКА: Проверка и коррекция названия ==========
-            # Проверяем настройку в конфиге новеллы
-            novel_config = chapter.novel.config or {}
-            validate_title_glossary = novel_config.get('validate_title_glossary', False)
-            translate_title_separately = novel_config.get('translate_title_separately', False)
-
-            if title and validate_title_glossary:
-                # Проверяем соответствие названия глоссарию
-                glossary_dict = context.glossary if hasattr(context, 'glossary') else {}
-
-                if glossary_dict and chapter.original_title:
-                    is_valid = self.validate_title_with_glossary(
-                        title=title,
-                        original_title=chapter.original_title,
-                        glossary=glossary_dict,
-                        chapter_id=chapter.id
-                    )
-
-                    if not is_valid or translate_title_separately:
-                        # Название некорректно или требуется отдельный перевод
-                        reason = "не соответствует глоссарию" if not is_valid else "настроен отдельный перевод"
-                        LogService.log_info(
-                            f"Название '{title}' {reason}. Переводим отдельно с глоссарием.",
-                            novel_id=chapter.novel_id,
-                            chapter_id=chapter.id
-                        )
-                        print(f"   🔄 Название {reason}, переводим отдельно...")
-
-                        corrected_title = self.translate_title_with_glossary(
-                            original_title=chapter.original_title,
-                            glossary=glossary_dict,
-                            chapter_id=chapter.id
-                        )
-
-                        if corrected_title:
-                            LogService.log_info(
-                                f"Название скорректировано: '{title}' → '{corrected_title}'",
-                                novel_id=chapter.novel_id,
-                                chapter_id=chapter.id
-                            )
-                            print(f"   ✅ Название скорректировано: '{corrected_title}'")
-                            title = corrected_title
-                        else:
-                            LogService.log_warning(
-                                f"Не удалось скорректировать название, оставляем оригинал: '{title}'",
-                                novel_id=chapter.novel_id,
-                                chapter_id=chapter.id
-                            )
-                    else:
-                        LogService.log_info(
-                            f"Название '{title}' корректно, соответствует глоссарию",
-                            novel_id=chapter.novel_id,
-                            chapter_id=chapter.id
-                        )
-            elif not title and chapter.original_title:
-                # Название не извлечено, но есть оригинал - переводим отдельно
-                LogService.log_info(
-                    f"Название не извлечено из перевода. Переводим '{chapter.original_title}' отдельно.",
-                    novel_id=chapter.novel_id,
-                    chapter_id=chapter.id
-                )
-                print(f"   🔄 Название не извлечено, переводим отдельно...")
-
-                glossary_dict = context.glossary if hasattr(context, 'glossary') else {}
-                title = self.translate_title_with_glossary(
-                    original_title=chapter.original_title,
-                    glossary=glossary_dict,
-                    chapter_id=chapter.id
-                )
-
-                if title:
-                    LogService.log_info(
-                        f"Название переведено отдельно: '{title}'",
-                        novel_id=chapter.novel_id,
-                        chapter_id=chapter.id
-                    )
-                    print(f"   ✅ Название переведено: '{title}'")
-            # ========== КОНЕЦ НОВОЙ ЛОГИКИ ==========
+            title = self._resolve_chapter_title(chapter, title, context)
 
             # Валидируем перевод с возможностью повторной попытки
             LogService.log_info(f"Валидируем перевод главы {chapter.chapter_number}", 
@@ -1277,179 +1288,108 @@ class TranslatorService:
             
             # Если есть критические проблемы с абзацами, пробуем перевести еще раз
             if validation['critical']:
+                # Отклонённые ответы не должны вернуться из кэша LLM при повторном запуске главы
+                self._forget_cached_responses(chapter.id)
+
                 # Проверяем, является ли проблема связанной с абзацами
                 paragraph_issue = any('абзац' in issue.lower() for issue in validation['critical_issues'])
                 
                 if paragraph_issue:
-                    LogService.log_warning(f"Проблема с абзацами в главе {chapter.chapter_number}, пробуем перевести заново",
+                    LogService.log_warning(f"Проблема с абзацами в главе {chapter.chapter_number}, перепроверяем части",
                                          novel_id=chapter.novel_id, chapter_id=chapter.id)
                     print(f"   ⚠️ Проблема с абзацами: {validation['critical_issues']}")
-                    print(f"   🔄 Повторная попытка перевода...")
-
-                    # Задержка перед повторным переводом (60 секунд)
-                    retry_delay = 60
-                    LogService.log_info(f"⏳ Ожидание {retry_delay} секунд перед повторным переводом...",
-                                      novel_id=chapter.novel_id, chapter_id=chapter.id)
-                    print(f"   ⏳ Ожидание {retry_delay} секунд для стабилизации LLM...")
-
-                    # Ожидание с логированием каждые 10 секунд
-                    remaining = retry_delay
-                    while remaining > 0:
-                        wait_chunk = min(10, remaining)
-                        time.sleep(wait_chunk)
-                        remaining -= wait_chunk
-                        if remaining > 0:
-                            LogService.log_info(f"   ⏱️  Осталось: {remaining} секунд",
-                                              novel_id=chapter.novel_id, chapter_id=chapter.id)
 
-                    # Увеличиваем temperature для получения другого результата
-                    retry_temperature = min(translation_temperature + 0.2, 1.0)
-                    LogService.log_info(f"🌡️ Увеличиваем temperature: {translation_temperature} → {retry_temperature}",
-                                      novel_id=chapter.novel_id, chapter_id=chapter.id)
-                    print(f"   🌡️ Temperature для повторной попытки: {retry_temperature}")
+                    # До двух повторов: переводятся заново только части, не прошедшие
+                    # собственную проверку, с увеличенной temperature для другого результата
+                    retry_temperature = translation_temperature
+                    for attempt in (2, 3):
+                        # Без паузы перед повтором: другой результат даёт temperature,
+                        # а темп запросов выдерживают rate limiter и _pace
+                        retry_temperature = min(retry_temperature + 0.2, 1.0)
+
+                        failed_indexes = [
+                            i for i, (part, translated_part) in enumerate(zip(text_parts, translated_parts))
+                            if self.validate_part_translation(part, translated_part)
+                        ]
+                        if not failed_indexes:
+                            # Ни одна часть по отдельности не виновата — переводим все
+                            failed_indexes = list(range(len(text_parts)))
 
-                    # Повторный перевод
-                    translated_parts_retry = []
-                    for i, part in enumerate(text_parts):
-                        LogService.log_info(f"Повторный перевод части {i+1}/{len(text_parts)} главы {chapter.chapter_number}",
+                        LogService.log_info(f"🌡️ Попытка {attempt}: перевод частей {[i + 1 for i in failed_indexes]} из {len(text_parts)}, "
+                                          f"temperature {translation_temperature} → {retry_temperature}",
                                           novel_id=chapter.novel_id, chapter_id=chapter.id)
-                        print(f"   📝 Повторный перевод части {i+1}/{len(text_parts)}")
+                        print(f"   🔄 Попытка {attempt}: перевод {len(failed_indexes)}/{len(text_parts)} частей, temperature {retry_temperature}")
 
-                        translated_part = self.translator.translate_text(
-                            part,
-                            formatted_translation_prompt,
-                            context_prompt,
-                            chapter.id,
-                            temperature=retry_temperature
+                        retranslated = self._retranslate_parts(
+                            chapter, text_parts, failed_indexes, formatted_translation_prompt,
+                            context_prompt, retry_temperature, parallel_parts
                         )
-                        
-                        if not translated_part:
-                            LogService.log_error(f"Ошибка повторного перевода части {i+1} главы {chapter.chapter_number}", 
+                        if retranslated is None:
+                            LogService.log_error(f"Попытка {attempt}: не удалось перевести части главы {chapter.chapter_number}",
                                                novel_id=chapter.novel_id, chapter_id=chapter.id)
-                            break
-                        
-                        translated_parts_retry.append(translated_part)
-                    
-                    if len(translated_parts_retry) == len(text_parts):
-                        # Объединяем части повторного перевода
-                        full_translation = '\n\n'.join(translated_parts_retry)
+                            continue
+
+                        for i, translated_part in retranslated.items():
+                            translated_parts[i] = translated_part
+                        full_translation = '\n\n'.join(translated_parts)
                         title, content = self.extract_title_and_content(full_translation)
-                        
-                        # Повторная валидация
-                        validation = self.validate_translation(chapter.original_text, content, chapter.chapter_number)
-                        
-                        if validation['critical']:
-                            LogService.log_error(f"Критические проблемы остались после повторного перевода главы {chapter.chapter_number}: {validation['critical_issues']}",
-                                               novel_id=chapter.novel_id, chapter_id=chapter.id)
-                            print(f"   ❌ Критические проблемы остались после повторной попытки: {validation['critical_issues']}")
 
-                            # ========== ТРЕТЬЯ ПОПЫТКА: Ожидание 5 минут ==========
-                            LogService.log_warning(f"⏳ Глава {chapter.chapter_number}: ожидание 5 минут перед третьей попыткой перевода...",
-                                                 novel_id=chapter.novel_id, chapter_id=chapter.id)
-                            print(f"   ⏳ Ожидание 5 минут (300 секунд) перед третьей попыткой...")
-
-                            # Ожидание 5 минут с логированием каждую минуту
-                            long_retry_delay = 300
-                            remaining = long_retry_delay
-                            while remaining > 0:
-                                wait_chunk = min(60, remaining)
-                                time.sleep(wait_chunk)
-                                remaining -= wait_chunk
-                                if remaining > 0:
-                                    LogService.log_info(f"⏱️ Осталось: {remaining // 60} мин {remaining % 60} сек до третьей попытки",
-                                                      novel_id=chapter.novel_id, chapter_id=chapter.id)
-                                    print(f"   ⏱️ Осталось: {remaining // 60} мин {remaining % 60} сек")
-
-                            # Ещё увеличиваем temperature для третьей попытки
-                            third_retry_temperature = min(retry_temperature + 0.2, 1.0)
-                            LogService.log_info(f"🌡️ Третья попытка: temperature {retry_temperature} → {third_retry_temperature}",
+                        validation = self.validate_translation(chapter.original_text, content, chapter.chapter_number)
+                        if not validation['critical']:
+                            LogService.log_info(f"✅ Попытка {attempt} успешна! Качество: {self.calculate_quality_score(validation)}",
                                               novel_id=chapter.novel_id, chapter_id=chapter.id)
-                            print(f"   🌡️ Temperature для третьей попытки: {third_retry_temperature}")
-
-                            # Третья попытка перевода
-                            translated_parts_third = []
-                            for i, part in enumerate(text_parts):
-                                LogService.log_info(f"Третья попытка перевода части {i+1}/{len(text_parts)} главы {chapter.chapter_number}",
-                                                  novel_id=chapter.novel_id, chapter_id=chapter.id)
-                                print(f"   📝 Третья попытка перевода части {i+1}/{len(text_parts)}")
-
-                                translated_part = self.translator.translate_text(
-                                    part,
-                                    formatted_translation_prompt,
-                                    context_prompt,
-                                    chapter.id,
-                                    temperature=third_retry_temperature
-                                )
+                            print(f"   ✅ Попытка {attempt} успешна")
+                            break
 
-                                if not translated_part:
-                                    LogService.log_error(f"Ошибка третьей попытки перевода части {i+1} главы {chapter.chapter_number}",
-                                                       novel_id=chapter.novel_id, chapter_id=chapter.id)
-                                    break
+                        LogService.log_error(f"Критические проблемы остались после попытки {attempt} главы {chapter.chapter_number}: {validation['critical_issues']}",
+                                           novel_id=chapter.novel_id, chapter_id=chapter.id)
+                        print(f"   ❌ Критические проблемы остались после попытки {attempt}: {validation['critical_issues']}")
 
-                                translated_parts_third.append(translated_part)
+                    if validation['critical']:
+                        # Если и третья попытка не помогла - выводим диагностику и возвращаем ошибку
+                        LogService.log_error(f"❌ Критические проблемы после ТРЁХ попыток главы {chapter.chapter_number}: {validation['critical_issues']}",
+                                           novel_id=chapter.novel_id, chapter_id=chapter.id)
+                        print(f"   ❌ Критические проблемы после ТРЁХ попыток: {validation['critical_issues']}")
 
-                            if len(translated_parts_third) == len(text_parts):
-                                # Объединяем части третьего перевода
-                                full_translation = '\n\n'.join(translated_parts_third)
-                                title, content = self.extract_title_and_content(full_translation)
+                        # Выводим текст для диагностики
+                        print("\n" + "="*80)
+                        print("🔍 ДИАГНОСТИКА ПРОБЛЕМЫ С ПЕРЕВОДОМ (после 3 попыток)")
+                        print("="*80)
 
-                                # Финальная валидация
-                                validation = self.validate_translation(chapter.original_text, content, chapter.chapter_number)
+                        print(f"\n📊 СТАТИСТИКА:")
+                        print(f"   Оригинал: {validation['stats']['original_words']} слов, {validation['stats']['orig_paragraphs']} абзацев")
+                        print(f"   Перевод:  {validation['stats']['translated_words']} слов, {validation['stats']['trans_paragraphs']} абзацев")
+                        print(f"   Проблема: {validation['critical_issues']}")
 
-                                if not validation['critical']:
-                                    LogService.log_info(f"✅ Третья попытка успешна! Качество: {self.calculate_quality_score(validation)}",
-                                                      novel_id=chapter.novel_id, chapter_id=chapter.id)
-                                    print(f"   ✅ Третья попытка успешна!")
-                                else:
-                                    # Если и третья попытка не помогла - выводим диагностику и возвращаем ошибку
-                                    LogService.log_error(f"❌ Критические проблемы после ТРЁХ попыток главы {chapter.chapter_number}: {validation['critical_issues']}",
-                                                       novel_id=chapter.novel_id, chapter_id=chapter.id)
-                                    print(f"   ❌ Критические проблемы после ТРЁХ попыток: {validation['critical_issues']}")
-
-                                    # Выводим текст для диагностики
-                                    print("\n" + "="*80)
-                                    print("🔍 ДИАГНОСТИКА ПРОБЛЕМЫ С ПЕРЕВОДОМ (после 3 попыток)")
-                                    print("="*80)
-
-                                    print(f"\n📊 СТАТИСТИКА:")
-                                    print(f"   Оригинал: {validation['stats']['original_words']} слов, {validation['stats']['orig_paragraphs']} абзацев")
-                                    print(f"   Перевод:  {validation['stats']['translated_words']} слов, {validation['stats']['trans_paragraphs']} абзацев")
-                                    print(f"   Проблема: {validation['critical_issues']}")
-
-                                    print(f"\n📄 ОРИГИНАЛЬНЫЙ ТЕКСТ (полностью):")
-                                    print("-"*80)
-                                    print(chapter.original_text)
-                                    print("-"*80)
-
-                                    print(f"\n📄 ТЕКСТ ПЕРЕВОДА (полностью):")
-                                    print("-"*80)
-                                    print(content)
-                                    print("-"*80)
-
-                                    print("\n💡 Для копирования текста откройте страницу 'Логи системы'")
-                                    print("   и нажмите кнопку 'Включить автообновление' чтобы остановить обновления")
-
-                                    # Также логируем в файл для истории
-                                    LogService.log_error(f"📄 Оригинал ({len(chapter.original_text)} символов): {chapter.original_text[:500]}...",
-                                                       novel_id=chapter.novel_id, chapter_id=chapter.id)
-                                    LogService.log_error(f"📄 Перевод ({len(content)} символов): {content[:500]}...",
-                                                       novel_id=chapter.novel_id, chapter_id=chapter.id)
-
-                                    return False
-                            else:
-                                # Не удалось перевести все части в третьей попытке
-                                LogService.log_error(f"❌ Третья попытка не удалась: переведено {len(translated_parts_third)}/{len(text_parts)} частей",
-                                                   novel_id=chapter.novel_id, chapter_id=chapter.id)
-                                return False
-                        else:
-                            LogService.log_info(f"Повторный перевод успешен, качество: {self.calculate_quality_score(validation)}", 
-                                              novel_id=chapter.novel_id, chapter_id=chapter.id)
-                            print(f"   ✅ Повторный перевод успешен")
+                        print(f"\n📄 ОРИГИНАЛЬНЫЙ ТЕКСТ (полностью):")
+                        print("-"*80)
+                        print(chapter.original_text)
+                        print("-"*80)
+
+                        print(f"\n📄 ТЕКСТ ПЕРЕВОДА (полностью):")
+                        print("-"*80)
+                        print(content)
+                        print("-"*80)
+
+                        print("\n💡 Для копирования текста откройте страницу 'Логи системы'")
+                        print("   и нажмите кнопку 'Включить автообновление' чтобы остановить обновления")
+
+                        # Также логируем в файл для истории
+                        LogService.log_error(f"📄 Оригинал ({len(chapter.original_text)} символов): {chapter.original_text[:500]}...",
+                                           novel_id=chapter.novel_id, chapter_id=chapter.id)
+                        LogService.log_error(f"📄 Перевод ({len(content)} символов): {content[:500]}...",
+                                           novel_id=chapter.novel_id, chapter_id=chapter.id)
+
+                        self._forget_cached_responses(chapter.id)
+                        TranslationCheckpoint.clear(chapter.id)
+                        return False
                 else:
                     # Если проблема не с абзацами, сразу возвращаем ошибку
                     LogService.log_error(f"Критические проблемы в переводе главы {chapter.chapter_number}: {validation['critical_issues']}", 
                                        novel_id=chapter.novel_id, chapter_id=chapter.id)
                     print(f"   ❌ Критические проблемы в переводе: {validation['critical_issues']}")
+                    self._forget_cached_responses(chapter.id)
+                    TranslationCheckpoint.clear(chapter.id)
                     return False
             
             LogService.log_info(f"Валидация пройдена, качество: {self.calculate_quality_score(validation)}", 
@@ -1469,6 +1409,15 @@ class TranslatorService:
                 else:
                     LogService.log_warning(f"Не удалось сгенерировать резюме для главы {chapter.chapter_number}", 
                                          novel_id=chapter.novel_id, chapter_id=chapter.id)
+
+            # Следующая глава конвейера ждёт только резюме — отпускаем её до извлечения терминов
+            if on_summary_ready:
+                on_summary_ready(context.summaries_after(chapter, summary))
+
+            if should_stop and should_stop():
+                LogService.log_warning(f"🛑 Глава {chapter.chapter_number}: перевод отменён, не сохраняем",
+                                     novel_id=chapter.novel_id, chapter_id=chapter.id)
+                return False
             
             # Извлекаем новые термины с контекстной фильтрацией глоссария
             if formatted_terms_prompt:
@@ -1485,59 +1434,11 @@ class TranslatorService:
                     LogService.log_info(f"Новых терминов не найдено в главе {chapter.chapter_number}", 
                                       novel_id=chapter.novel_id, chapter_id=chapter.id)
             
-            # Сохраняем перевод
-            LogService.log_info(f"Сохраняем перевод главы {chapter.chapter_number} в базу данных", 
-                              novel_id=chapter.novel_id, chapter_id=chapter.id)
-            
-            # Рассчитываем ориентировочное время перевода на основе длины текста
-            # Предполагаем скорость ~1000 символов в минуту
-            estimated_translation_time = max(30, min(300, len(content) / 1000 * 60))  # 30-300 секунд
-            
-            # Определяем модель, используемую для перевода
-            model_used = None
-            if hasattr(self.translator, 'model') and hasattr(self.translator.model, 'model_id'):
-                # UniversalLLMTranslator с AIModel
-                model_used = self.translator.model.model_id
-            elif hasattr(self.translator, 'config') and hasattr(self.translator.config, 'model_name'):
-                # LLMTranslator - легаси режим
-                model_used = self.translator.config.model_name
-            else:
-                # Запасной вариант - берём из конфига новеллы
-                novel_config = chapter.novel.config or {}
-                model_used = novel_config.get('translation_model', 'unknown')
-            
-            LogService.log_info(f"Используется модель: {model_used}", novel_id=chapter.novel_id, chapter_id=chapter.id)
-            
-            translation = Translation(
-                chapter_id=chapter.id,
-                translated_title=title,
-                translated_text=content,
-                summary=summary,
-                quality_score=self.calculate_quality_score(validation),
-                translation_time=estimated_translation_time,
-                model_used=model_used,
-                metadata={
-                    'template_used': prompt_template.name,
-                    'validation': validation,
-                    'parts_count': len(text_parts),
-                    'translation_method': 'estimated_timing'
-                }
+            self._save_chapter_translation(
+                chapter, title, content, summary, validation,
+                template_name=prompt_template.name, parts_count=len(text_parts)
             )
             
-            db.session.add(translation)
-            chapter.status = 'translated'
-            
-            # Обновляем счетчик переведенных глав в новелле
-            from app.models import Novel
-            novel = Novel.query.get(chapter.novel_id)
-            if novel:
-                translated_count = Chapter.query.filter_by(novel_id=chapter.novel_id, status='translated').count()
-                novel.translated_chapters = translated_count
-                LogService.log_info(f"Обновлен счетчик переведенных глав: {translated_count}", 
-                                  novel_id=chapter.novel_id, chapter_id=chapter.id)
-            
-            db.session.commit()
-            
             LogService.log_info(f"Глава {chapter.chapter_number} переведена и сохранена успешно", 
                               novel_id=chapter.novel_id, chapter_id=chapter.id)
             print(f"   ✅ Глава {chapter.chapter_number} переведена успешно")
@@ -1554,6 +1455,155 @@ class TranslatorService:
             db.session.rollback()
             return False
 
+    @staticmethod
+    def _chapter_context_prompt(chapter: Chapter, context: TranslationContext) -> str:
+        """Контекст перевода главы; оригинальное название — первым, для лучшего понимания LLM"""
+        context_prompt = context.build_context_prompt()
+        if chapter.original_title:
+            context_prompt = f"НАЗВАНИЕ ГЛАВЫ: {chapter.original_title}\n\n{context_prompt}" if context_prompt else f"НАЗВАНИЕ ГЛАВЫ: {chapter.original_title}"
+            LogService.log_info(f"Добавлено название главы в контекст: {chapter.original_title}",
+                              novel_id=chapter.novel_id, chapter_id=chapter.id)
+        return context_prompt
+
+    def _resolve_chapter_title(self, chapter: Chapter, title: str, context: TranslationContext) -> str:
+        """Проверка названия главы по глоссарию и отдельный перевод, если название не извлечено или неверно"""
+        # Проверяем настройку в конфиге новеллы
+        novel_config = chapter.novel.config or {}
+        validate_title_glossary = novel_config.get('validate_title_glossary', False)
+        translate_title_separately = novel_config.get('translate_title_separately', False)
+
+        if title and validate_title_glossary:
+            # Проверяем соответствие названия глоссарию
+            glossary_dict = context.glossary if hasattr(context, 'glossary') else {}
+
+            if glossary_dict and chapter.original_title:
+                is_valid = self.validate_title_with_glossary(
+                    title=title,
+                    original_title=chapter.original_title,
+                    glossary=glossary_dict,
+                    chapter_id=chapter.id
+                )
+
+                if not is_valid or translate_title_separately:
+                    # Название некорректно или требуется отдельный перевод
+                    reason = "не соответствует глоссарию" if not is_valid else "настроен отдельный перевод"
+                    LogService.log_info(
+                        f"Название '{title}' {reason}. Переводим отдельно с глоссарием.",
+                        novel_id=chapter.novel_id,
+                        chapter_id=chapter.id
+                    )
+                    print(f"   🔄 Название {reason}, переводим отдельно...")
+
+                    corrected_title = self.translate_title_with_glossary(
+                        original_title=chapter.original_title,
+                        glossary=glossary_dict,
+                        chapter_id=chapter.id
+                    )
+
+                    if corrected_title:
+                        LogService.log_info(
+                            f"Название скорректировано: '{title}' → '{corrected_title}'",
+                            novel_id=chapter.novel_id,
+                            chapter_id=chapter.id
+                        )
+                        print(f"   ✅ Название скорректировано: '{corrected_title}'")
+                        title = corrected_title
+                    else:
+                        LogService.log_warning(
+                            f"Не удалось скорректировать название, оставляем оригинал: '{title}'",
+                            novel_id=chapter.novel_id,
+                            chapter_id=chapter.id
+                        )
+                else:
+                    LogService.log_info(
+                        f"Название '{title}' корректно, соответствует глоссарию",
+                        novel_id=chapter.novel_id,
+                        chapter_id=chapter.id
+                    )
+        elif not title and chapter.original_title:
+            # Название не извлечено, но есть оригинал - переводим отдельно
+            LogService.log_info(
+                f"Название не извлечено из перевода. Переводим '{chapter.original_title}' отдельно.",
+                novel_id=chapter.novel_id,
+                chapter_id=chapter.id
+            )
+            print(f"   🔄 Название не извлечено, переводим отдельно...")
+
+            glossary_dict = context.glossary if hasattr(context, 'glossary') else {}
+            title = self.translate_title_with_glossary(
+                original_title=chapter.original_title,
+                glossary=glossary_dict,
+                chapter_id=chapter.id
+            )
+
+            if title:
+                LogService.log_info(
+                    f"Название переведено отдельно: '{title}'",
+                    novel_id=chapter.novel_id,
+                    chapter_id=chapter.id
+                )
+                print(f"   ✅ Название переведено: '{title}'")
+
+        return title
+
+    def _save_chapter_translation(self, chapter: Chapter, title: str, content: str, summary: Optional[str],
+                                  validation: Dict, template_name: str, parts_count: int,
+                                  translation_method: str = 'estimated_timing'):
+        """Сохранение перевода главы, статуса и счётчика переведённых глав новеллы"""
+        # Сохраняем перевод
+        LogService.log_info(f"Сохраняем перевод главы {chapter.chapter_number} в базу данных", 
+                          novel_id=chapter.novel_id, chapter_id=chapter.id)
+        
+        # Рассчитываем ориентировочное время перевода на основе длины текста
+        # Предполагаем скорость ~1000 символов в минуту
+        estimated_translation_time = max(30, min(300, len(content) / 1000 * 60))  # 30-300 секунд
+        
+        # Определяем модель, используемую для перевода
+        model_used = None
+        if hasattr(self.translator, 'model') and hasattr(self.translator.model, 'model_id'):
+            # UniversalLLMTranslator с AIModel
+            model_used = self.translator.model.model_id
+        elif hasattr(self.translator, 'config') and hasattr(self.translator.config, 'model_name'):
+            # LLMTranslator - легаси режим
+            model_used = self.translator.config.model_name
+        else:
+            # Запасной вариант - берём из конфига новеллы
+            novel_config = chapter.novel.config or {}
+            model_used = novel_config.get('translation_model', 'unknown')
+        
+        LogService.log_info(f"Используется модель: {model_used}", novel_id=chapter.novel_id, chapter_id=chapter.id)
+        
+        translation = Translation(
+            chapter_id=chapter.id,
+            translated_title=title,
+            translated_text=content,
+            summary=summary,
+            quality_score=self.calculate_quality_score(validation),
+            translation_time=estimated_translation_time,
+            model_used=model_used,
+            metadata={
+                'template_used': template_name,
+                'validation': validation,
+                'parts_count': parts_count,
+                'translation_method': translation_method
+            }
+        )
+        
+        db.session.add(translation)
+        chapter.status = 'translated'
+        
+        # Обновляем счетчик переведенных глав в новелле
+        from app.models import Novel
+        novel = Novel.query.get(chapter.novel_id)
+        if novel:
+            translated_count = Chapter.query.filter_by(novel_id=chapter.novel_id, status='translated').count()
+            novel.translated_chapters = translated_count
+            LogService.log_info(f"Обновлен счетчик переведенных глав: {translated_count}", 
+                              novel_id=chapter.novel_id, chapter_id=chapter.id)
+        
+        db.session.commit()
+        TranslationCheckpoint.clear(chapter.id)
+
     def preprocess_text(self, text: str) -> str:
         """Предобработка текста для перевода (сохраняет структуру абзацев)"""
         # Применяем обработку звуковых эффектов
@@ -1808,16 +1858,11 @@ class TranslatorService:
         LogService.log_info(f"Отдельный перевод названия: '{original_title}'", chapter_id=chapter_id)
 
         # Контекстная фильтрация глоссария — только термины из заголовка
-        title_normalized = normalize_chinese(original_title)
-        filtered_glossary = {}
-        for category, terms in glossary.items():
-            filtered = {}
-            for chinese, russian in terms.items():
-                chinese_normalized = normalize_chinese(chinese)
-                if chinese in original_title or chinese_normalized in title_normalized:
-                    filtered[chinese] = russian
-            if filtered:
-                filtered_glossary[category] = filtered
+        filtered_glossary = {
+            category: terms
+            for category, terms in filter_glossary_by_text(glossary, original_title).items()
+            if terms
+        }
         glossary_text = self._format_glossary_for_prompt(filtered_glossary)
 
         title_prompt = f"""Ты профессиональный переводчик китайских веб-новелл жанра сянься.
@@ -1957,6 +2002,95 @@ class TranslatorService:
 
         return "\n".join(lines) if lines else "Глоссарий пуст"
 
+    def _load_part_checkpoints(self, chapter: Chapter, parts: List[str], prompt: str,
+                               temperature: Optional[float]) -> Dict[int, str]:
+        """Переводы частей из контрольных точек главы: {номер части: перевод}"""
+        restored = TranslationCheckpoint.load(chapter.id, parts, prompt, temperature)
+        if restored:
+            LogService.log_info(f"♻️ Восстановлено из контрольных точек {len(restored)}/{len(parts)} частей главы {chapter.chapter_number}",
+                              novel_id=chapter.novel_id, chapter_id=chapter.id)
+        return restored
+
+    @staticmethod
+    def _save_part_checkpoint(chapter_id: int, index: int, part: str, prompt: str,
+                              temperature: Optional[float], translated: Optional[str]):
+        """Контрольная точка успешно переведённой части"""
+        if translated and translated != "CONTENT_BLOCKED_NEED_SPLIT":
+            TranslationCheckpoint.save(chapter_id, index, part, prompt, temperature, translated)
+
+    def _forget_cached_responses(self, chapter_id: int):
+        """Удаление ответов главы из кэша LLM (если переводчик его поддерживает)"""
+        if hasattr(self.translator, 'forget_cached_responses'):
+            self.translator.forget_cached_responses(chapter_id)
+
+    def validate_part_translation(self, original_part: str, translated_part: str) -> List[str]:
+        """
+        Проверка одной части перевода теми же порогами, что и критические проблемы главы.
+        Абзацы считаются по непустым строкам: так одинаково считаются и «\n\n», и «\n» форматы.
+
+        Returns:
+            Список проблем (пустой — часть в порядке)
+        """
+        issues = []
+        if not translated_part:
+            return ["Часть не переведена"]
+
+        length_ratio = len(translated_part) / len(original_part) if original_part else 0
+        if length_ratio < 0.6:
+            issues.append(f"Перевод части слишком короткий: {length_ratio:.2f} от оригинала")
+
+        # Короткие части (авторские примечания и т.п.) по абзацам не проверяются
+        if len(original_part) >= 200:
+            orig_paragraphs = len([line for line in original_part.split('\n') if line.strip()])
+            trans_paragraphs = len([line for line in translated_part.split('\n') if line.strip()])
+            para_ratio = trans_paragraphs / orig_paragraphs if orig_paragraphs else 1.0
+            if para_ratio < 0.6:
+                issues.append(f"Критическая разница в абзацах части: {orig_paragraphs} → {trans_paragraphs} ({para_ratio:.1%})")
+
+        return issues
+
+    def _retranslate_parts(self, chapter: Chapter, text_parts: List[str], indexes: List[int], prompt: str,
+                           context_prompt: str, temperature: float,
+                           max_concurrent: int) -> Optional[Dict[int, str]]:
+        """
+        Повторный перевод выбранных частей главы (параллельно, если переводчик умеет).
+
+        Returns:
+            {номер части: перевод} или None, если хотя бы одну часть перевести не удалось
+        """
+        checkpointed_parts = self._load_part_checkpoints(chapter, text_parts, prompt, temperature)
+        results = {i: checkpointed_parts[i] for i in indexes if i in checkpointed_parts}
+        pending = [i for i in indexes if i not in results]
+
+        if max_concurrent > 1 and len(pending) > 1 and hasattr(self.translator, 'translate_parts'):
+            translations = self.translator.translate_parts(
+                [text_parts[i] for i in pending],
+                prompt,
+                context_prompt,
+                chapter.id,
+                temperature=temperature,
+                max_concurrent=max_concurrent,
+                on_part_done=lambda position, translated: self._save_part_checkpoint(
+                    chapter.id, pending[position], text_parts[pending[position]], prompt, temperature, translated
+                )
+            )
+        else:
+            translations = []
+            for i in pending:
+                translated_part = self.translator.translate_text(
+                    text_parts[i], prompt, context_prompt, chapter.id, temperature=temperature
+                )
+                self._save_part_checkpoint(chapter.id, i, text_parts[i], prompt, temperature, translated_part)
+                translations.append(translated_part)
+
+        for i, translated_part in zip(pending, translations):
+            if not translated_part or translated_part == "CONTENT_BLOCKED_NEED_SPLIT":
+                LogService.log_error(f"Ошибка повторного перевода части {i+1} главы {chapter.chapter_number}",
+                                   novel_id=chapter.novel_id, chapter_id=chapter.id)
+                return None
+            results[i] = translated_part
+        return results
+
     def validate_translation(self, original: str, translated: str, chapter_num: int) -> Dict:
         """Валидация качества перевода (как в рабочем скрипте)"""
         import re  # Убедимся, что re доступен
@@ -2189,37 +2323,65 @@ class TranslatorService:
         
         return True
 
-    def _find_glossary_conflicts(self, new_terms: Dict, novel_id: int) -> list:
+    @staticmethod
+    def _glossary_fingerprint(novel_id: int) -> tuple:
+        """Отпечаток активного глоссария новеллы: (количество, максимальный id, время изменения)"""
+        return tuple(db.session.query(
+            func.count(GlossaryItem.id), func.max(GlossaryItem.id), func.max(GlossaryItem.updated_at)
+        ).filter(
+            GlossaryItem.novel_id == novel_id, GlossaryItem.is_active == True
+        ).one())
+
+    def _get_glossary_prefix_trie(self, novel_id: int) -> Tuple[TermPrefixTrie, tuple]:
+        """
+        Префиксное дерево активных терминов новеллы: нормализованный китайский → русский.
+
+        Кэшируется на процесс; актуальность проверяется одним агрегатным запросом
+        (количество, максимальный id и время изменения), так что правки глоссария
+        в веб-интерфейсе или другом воркере приводят к перестроению.
+        """
+        fingerprint = self._glossary_fingerprint(novel_id)
+
+        with _glossary_prefix_lock:
+            cached = _glossary_prefix_cache.get(novel_id)
+        if cached and cached[0] == fingerprint:
+            return cached[1], fingerprint
+
+        rows = db.session.query(
+            GlossaryItem.english_term, GlossaryItem.russian_term
+        ).filter(
+            GlossaryItem.novel_id == novel_id, GlossaryItem.is_active == True
+        ).order_by(GlossaryItem.id).all()
+
+        normalized = normalize_chinese_many([row.english_term for row in rows])
+        trie = TermPrefixTrie(zip(normalized, (row.russian_term for row in rows)))
+
+        with _glossary_prefix_lock:
+            _glossary_prefix_cache[novel_id] = (fingerprint, trie)
+        return trie, fingerprint
+
+    def _find_glossary_conflicts(self, new_terms: Dict, novel_id: int,
+                                 prefix_trie: Optional[TermPrefixTrie] = None) -> list:
         """
         Поиск конфликтов: новый составной термин содержит базовый термин,
         но русский перевод не согласован.
         Пример: 赤母 = Красная Матерь, но 赤母凡蛻 = Поземный линяк Червонной Матери
         """
-        # Загружаем все существующие термины
-        existing_items = GlossaryItem.query.filter_by(
-            novel_id=novel_id, is_active=True
-        ).all()
-
-        existing_map = {}  # chinese_normalized → russian
-        for item in existing_items:
-            existing_map[normalize_chinese(item.english_term)] = item.russian_term
+        if prefix_trie is None:
+            prefix_trie, _ = self._get_glossary_prefix_trie(novel_id)
+        if not len(prefix_trie):
+            return []
 
         conflicts = []
 
         for category, terms in new_terms.items():
-            for eng, rus in terms.items():
-                eng_norm = normalize_chinese(eng)
-
+            terms_normalized = normalize_chinese_many(list(terms))
+            for (eng, rus), eng_norm in zip(terms.items(), terms_normalized):
                 # Ищем базовые термины, которые являются ПРЕФИКСОМ нового
                 # Префикс, а не просто подстрока — чтобы избежать ложных срабатываний:
                 # 赤母 → 赤母凡蛻 (префикс, реальный конфликт) ✓
                 # 道剑 → 诡道剑 (суффикс, разные слова: 诡道+剑) ✗
-                for base_zh, base_ru in existing_map.items():
-                    if len(base_zh) >= len(eng_norm):
-                        continue  # Базовый не короче нового
-                    if not eng_norm.startswith(base_zh):
-                        continue  # Базовый не является префиксом нового
-
+                for base_zh, base_ru in prefix_trie.iter_prefixes(eng_norm):
                     # Базовый термин найден в составном — проверяем консистентность
                     # Берём корень русского перевода (первые 4+ символа) для нечёткого сравнения
                     base_ru_stem = base_ru[:min(len(base_ru), max(4, len(base_ru) // 2))]
@@ -2290,10 +2452,29 @@ class TranslatorService:
 
         return fixes
 
+    def _extend_glossary_prefix_trie(self, novel_id: int, prefix_trie: TermPrefixTrie,
+                                     fingerprint: tuple, new_items: List[Dict]):
+        """
+        Добавление только что сохранённых терминов в кэшированное дерево.
+        Если за это время глоссарий менял кто-то ещё, кэш сбрасывается.
+        """
+        new_fingerprint = self._glossary_fingerprint(novel_id)
+
+        with _glossary_prefix_lock:
+            cached = _glossary_prefix_cache.get(novel_id)
+            if not cached or cached[0] != fingerprint or new_fingerprint[0] != fingerprint[0] + len(new_items):
+                _glossary_prefix_cache.pop(novel_id, None)
+                return
+            for item in new_items:
+                prefix_trie.add(item['english_term'], item['russian_term'])
+            _glossary_prefix_cache[novel_id] = (new_fingerprint, prefix_trie)
+
     def save_new_terms(self, new_terms: Dict, novel_id: int, chapter_number: int):
         """Сохранение новых терминов в глоссарий с нормализацией китайского и проверкой консистентности"""
+        prefix_trie, fingerprint = self._get_glossary_prefix_trie(novel_id)
+
         # Проверяем конфликты с существующими базовыми терминами
-        conflicts = self._find_glossary_conflicts(new_terms, novel_id)
+        conflicts = self._find_glossary_conflicts(new_terms, novel_id, prefix_trie)
         if conflicts:
             logger.info(f"⚠️ Найдено {len(conflicts)} конфликтов с базовыми терминами:")
             for c in conflicts:
@@ -2309,44 +2490,50 @@ class TranslatorService:
                         new_terms[c['category']][c['compound_zh']] = fixed_ru
                         logger.info(f"🔧 Исправлен: {c['compound_zh']}: '{old_ru}' → '{fixed_ru}'")
 
-        total_saved = 0
+        # Нормализуем китайский текст (традиционный → упрощённый) одним вызовом
+        candidates = []  # (category, исходный термин, нормализованный, перевод)
         for category, terms in new_terms.items():
-            logger.info(f"📝 Обрабатываем категорию {category}: {len(terms)} терминов")
-            for eng, rus in terms.items():
-                # Нормализуем китайский текст (традиционный → упрощённый)
-                eng_normalized = normalize_chinese(eng)
-                logger.info(f"🔍 Проверяем термин: {eng} → {eng_normalized} = {rus}")
-
-                # Проверяем по нормализованному термину
-                existing = GlossaryItem.query.filter_by(
-                    novel_id=novel_id,
-                    english_term=eng_normalized
-                ).first()
-
-                # Также проверяем оригинальный вариант (если отличается)
-                if not existing and eng != eng_normalized:
-                    existing = GlossaryItem.query.filter_by(
-                        novel_id=novel_id,
-                        english_term=eng
-                    ).first()
-
-                if not existing:
-                    # Сохраняем нормализованный вариант
-                    glossary_item = GlossaryItem(
-                        novel_id=novel_id,
-                        english_term=eng_normalized,
-                        russian_term=rus,
-                        category=category,
-                        first_appearance_chapter=chapter_number,
-                        is_auto_generated=True,
-                        is_active=True
-                    )
-                    db.session.add(glossary_item)
-                    total_saved += 1
-                    logger.info(f"✅ Сохранен новый термин: {eng_normalized} = {rus} (категория: {category})")
-                else:
-                    logger.info(f"ℹ️ Термин уже существует: {eng_normalized}")
+            logger.debug(f"📝 Обрабатываем категорию {category}: {len(terms)} терминов")
+            for (eng, rus), eng_normalized in zip(terms.items(), normalize_chinese_many(list(terms))):
+                candidates.append((category, eng, eng_normalized, rus))
+
+        # Один запрос на все термины: нормализованные и исходные варианты
+        lookup_terms = {eng for _, eng, _, _ in candidates} | {norm for _, _, norm, _ in candidates}
+        existing_terms = set()
+        if lookup_terms:
+            existing_terms = {
+                row.english_term for row in db.session.query(GlossaryItem.english_term).filter(
+                    GlossaryItem.novel_id == novel_id,
+                    GlossaryItem.english_term.in_(lookup_terms)
+                )
+            }
 
+        new_items = []
+        for category, eng, eng_normalized, rus in candidates:
+            if eng_normalized in existing_terms or eng in existing_terms:
+                logger.debug(f"ℹ️ Термин уже существует: {eng_normalized}")
+                continue
+
+            # Сохраняем нормализованный вариант; повтор в другой категории не дублируем
+            existing_terms.add(eng_normalized)
+            new_items.append({
+                'novel_id': novel_id,
+                'english_term': eng_normalized,
+                'russian_term': rus,
+                'category': category,
+                'first_appearance_chapter': chapter_number,
+                'is_auto_generated': True,
+                'is_active': True
+            })
+            logger.debug(f"✅ Новый термин: {eng_normalized} = {rus} (категория: {category})")
+
+        if new_items:
+            db.session.bulk_insert_mappings(GlossaryItem, new_items)
         db.session.commit()
+
+        total_saved = len(new_items)
+        if new_items:
+            self._extend_glossary_prefix_trie(novel_id, prefix_trie, fingerprint, new_items)
+
         logger.info(f"📚 Всего сохранено новых терминов: {total_saved}")
         print(f"   📚 Сохранено {total_saved} новых терминов") 
\ No newline at end of file
@@ -1,40 +1,35 @@
 """
 Универсальный переводчик через AI модели с поддержкой всех провайдеров
 """
+import os
 import time
+import atexit
 import logging
 import asyncio
 import random
 import threading
-from typing import Optional, List, Dict
+import contextvars
+import concurrent.futures
+from typing import Optional, List, Dict, Tuple
 from app.models import AIModel
 from app.services.ai_adapter_service import AIAdapterService
 from app.services.log_service import LogService
+from app.services.rate_limiter import DistributedConcurrencyLimiter
+from app.services.llm_response_cache import LLMResponseCache, LLM_CACHE_ENABLED
 from app.services.original_aware_editor_service import RateLimitError, ProhibitedContentError, LengthLimitError
 
-# Для нормализации традиционного/упрощённого китайского
-try:
-    from opencc import OpenCC
-    _opencc_t2s = OpenCC('t2s')  # Traditional to Simplified
-
-    def normalize_chinese(text: str) -> str:
-        """Нормализация китайского текста: традиционный → упрощённый"""
-        if not text:
-            return text
-        return _opencc_t2s.convert(text)
-except ImportError:
-    def normalize_chinese(text: str) -> str:
-        """Fallback: без нормализации если OpenCC не установлен"""
-        return text
+# Поиск терминов глоссария (с нормализацией традиционного/упрощённого китайского)
+from app.utils.glossary_matcher import filter_glossary_by_text
 
 logger = logging.getLogger(__name__)
 
 
 class AdaptiveConcurrencyLimiter:
     """
-    Адаптивный лимитер параллельности для Ollama endpoints.
+    Адаптивный лимитер параллельности в памяти процесса.
     Уменьшает параллельность при 429, увеличивает при серии успехов.
-    Работает между потоками ThreadPoolExecutor.
+    Работает между потоками ThreadPoolExecutor; используется как fallback
+    для DistributedConcurrencyLimiter, когда Redis недоступен.
     """
 
     def __init__(self, max_concurrent: int):
@@ -81,20 +76,126 @@ class AdaptiveConcurrencyLimiter:
                 logger.warning(f"📉 Адаптивный лимит уменьшен до {self.current_limit}/{self.max_concurrent}")
 
 
-# Глобальный registry лимитеров per endpoint
-_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+# Глобальный registry лимитеров per endpoint.
+# Состояние лимитера хранится в Redis и общее для всех процессов prefork воркера;
+# локальный AdaptiveConcurrencyLimiter — fallback при недоступности Redis.
+_limiters: Dict[str, DistributedConcurrencyLimiter] = {}
 _limiter_lock = threading.Lock()
 
 
-def _get_limiter(endpoint: str, max_concurrent: int) -> AdaptiveConcurrencyLimiter:
+def _get_limiter(endpoint: str, max_concurrent: int) -> DistributedConcurrencyLimiter:
     """Получить или создать лимитер для endpoint."""
     with _limiter_lock:
         if endpoint not in _limiters:
-            _limiters[endpoint] = AdaptiveConcurrencyLimiter(max_concurrent)
+            _limiters[endpoint] = DistributedConcurrencyLimiter(
+                endpoint, max_concurrent, fallback=AdaptiveConcurrencyLimiter(max_concurrent)
+            )
             logger.info(f"Создан адаптивный лимитер для {endpoint}: max_concurrent={max_concurrent}")
         return _limiters[endpoint]
 
 
+class WorkerEventLoop:
+    """
+    Долгоживущий event loop воркера в фоновом daemon-потоке.
+    Один loop на процесс: пул HTTP-соединений AIAdapterService живёт вместе с ним,
+    а корутины из разных потоков (ThreadPoolExecutor задач) выполняются в нём конкурентно.
+    После fork (Celery prefork) loop пересоздаётся в дочернем процессе.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Получить запущенный loop (ленивый старт, thread-safe)."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                thread = threading.Thread(target=run, name='llm-event-loop', daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop, self._thread, self._pid = loop, thread, os.getpid()
+                logger.info(f"Запущен фоновый event loop воркера (pid={self._pid})")
+            return self._loop
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """
+        Запланировать корутину в loop воркера из любого потока.
+        Корутина выполняется в копии contextvars вызывающего потока
+        (Flask app context и сессия БД остаются доступны).
+        """
+        loop = self.get_loop()
+        ctx = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def start():
+            # Future остаётся в состоянии PENDING, чтобы future.cancel() из вызывающего потока
+            # мог отменить уже запущенную задачу
+            if future.cancelled():
+                coro.close()
+                return
+            task = ctx.run(loop.create_task, coro)
+
+            def on_task_done(t: asyncio.Task):
+                if future.cancelled():
+                    return
+                if t.cancelled():
+                    future.cancel()
+                elif t.exception() is not None:
+                    future.set_exception(t.exception())
+                else:
+                    future.set_result(t.result())
+
+            def on_future_done(f: concurrent.futures.Future):
+                if f.cancelled():
+                    loop.call_soon_threadsafe(task.cancel)
+
+            task.add_done_callback(on_task_done)
+            future.add_done_callback(on_future_done)
+
+        loop.call_soon_threadsafe(start)
+        return future
+
+    def run(self, coro):
+        """Выполнить корутину в loop воркера и дождаться результата (блокирует вызывающий поток)."""
+        future = self.submit(coro)
+        try:
+            return future.result()
+        except BaseException:
+            # Terminated/KeyboardInterrupt в вызывающем потоке — отменяем корутину в loop
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 5):
+        """Закрыть HTTP-клиенты пула и остановить loop (при завершении процесса)."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or self._pid != os.getpid() or not thread.is_alive():
+                return
+            self._loop = None
+        from app.services.ai_adapter_service import close_http_clients
+        try:
+            asyncio.run_coroutine_threadsafe(close_http_clients(), loop).result(timeout=timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=timeout)
+
+
+# Общий loop процесса воркера
+worker_loop = WorkerEventLoop()
+atexit.register(worker_loop.shutdown)
+
+
 class UniversalLLMTranslator:
     """
     Универсальный переводчик, поддерживающий все AI провайдеры
@@ -105,6 +206,10 @@ class UniversalLLMTranslator:
     _global_key_index = 0  # Последний работающий ключ
     _global_failed_keys = set()  # Неработающие ключи
 
+    # Температуры служебных запросов (резюме и извлечение терминов)
+    SUMMARY_TEMPERATURE = 0.3
+    TERMS_TEMPERATURE = 0.2
+
     def __init__(self, model: AIModel):
         """
         Инициализация переводчика
@@ -119,6 +224,11 @@ class UniversalLLMTranslator:
         self.last_finish_reason = None
         self.save_prompt_history = True
 
+        # Кэш ответов: повтор того же запроса этим же экземпляром считается
+        # намеренной пересэмплировкой (retry) и идёт в модель мимо кэша
+        self.use_response_cache = LLM_CACHE_ENABLED
+        self._cache_keys_seen: Dict[Optional[int], set] = {}  # chapter_id → ключи кэша
+
         # Для отслеживания текущей главы и типа промпта (для истории)
         self.current_chapter_id = None
         self.current_prompt_type = 'translation'
@@ -194,6 +304,16 @@ class UniversalLLMTranslator:
 
     async def make_request_async(self, system_prompt: str, user_prompt: str, temperature: float = None, **kwargs) -> Optional[str]:
         """Асинхронный запрос к AI модели с умной ротацией ключей"""
+        content, _ = await self._make_request_async(system_prompt, user_prompt, temperature, **kwargs)
+        return content
+
+    async def _make_request_async(self, system_prompt: str, user_prompt: str, temperature: float = None,
+                                  **kwargs) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Запрос к AI модели: (ответ, finish_reason именно этого запроса).
+        self.last_finish_reason общий для конкурентных запросов экземпляра, поэтому
+        решения по конкретному ответу (например, кэшировать ли его) принимаются по возвращённому значению.
+        """
         # Убираем общее логирование чтобы избежать дублирования
         # Каждый адаптер будет логировать свой запрос индивидуально
         
@@ -231,6 +351,7 @@ class UniversalLLMTranslator:
                     temp_model.max_output_tokens = self.model.max_output_tokens
                     temp_model.default_temperature = self.model.default_temperature
                     temp_model.supports_system_prompt = self.model.supports_system_prompt
+                    temp_model.provider_config = self.model.provider_config
 
                     # Создаём адаптер напрямую, обходя __init__
                     adapter = AIAdapterService.__new__(AIAdapterService)
@@ -251,7 +372,7 @@ class UniversalLLMTranslator:
                         if self.save_prompt_history and self.current_chapter_id:
                             self._save_prompt_history(system_prompt, user_prompt, result['content'], result, True)
 
-                        return result['content']
+                        return result['content'], result.get('finish_reason', 'unknown')
 
                     # Обработка ошибок
                     error = result.get('error', '')
@@ -331,12 +452,18 @@ class UniversalLLMTranslator:
                     if self.save_prompt_history and self.current_chapter_id:
                         self._save_prompt_history(system_prompt, user_prompt, result['content'], result, True)
 
-                    return result['content']
+                    return result['content'], result.get('finish_reason', 'unknown')
                 else:
                     error = result.get('error', 'Неизвестная ошибка')
                     error_type = result.get('error_type', 'general')
                     LogService.log_error(f"Ошибка {self.model.provider}: {error} (тип: {error_type})")
 
+                    # 429 от провайдеров без собственной обработки ниже (Ollama/NVIDIA сигналят сами)
+                    if result.get('status_code') == 429 and self.model.provider not in ('ollama', 'ollama_turbo', 'nvidia'):
+                        limiter_endpoint = self._limiter_endpoint()
+                        if limiter_endpoint in _limiters:
+                            await _limiters[limiter_endpoint].report_429_async()
+
                     # Логируем полный результат для отладки
                     LogService.log_error(f"Полный результат ошибки: {result}")
 
@@ -420,7 +547,7 @@ class UniversalLLMTranslator:
                         # Сигнализируем адаптивному лимитеру
                         endpoint = getattr(self.model, 'api_endpoint', '')
                         if endpoint and endpoint in _limiters:
-                            _limiters[endpoint].report_429()
+                            await _limiters[endpoint].report_429_async()
 
                         # Уважаем Retry-After если сервер его прислал
                         server_retry_after = result.get('retry_after')
@@ -463,7 +590,7 @@ class UniversalLLMTranslator:
                                 if self.save_prompt_history and self.current_chapter_id:
                                     self._save_prompt_history(system_prompt, user_prompt, retry_result['content'], retry_result, True)
 
-                                return retry_result['content']
+                                return retry_result['content'], retry_result.get('finish_reason', 'unknown')
 
                             retry_error_type = retry_result.get('error_type', 'general')
                             # Для NVIDIA продолжаем retry на любой server-busy ошибке;
@@ -474,7 +601,7 @@ class UniversalLLMTranslator:
                             )
                             if retry_error_type in retry_busy_types:
                                 if endpoint and endpoint in _limiters:
-                                    _limiters[endpoint].report_429()
+                                    await _limiters[endpoint].report_429_async()
                                 server_retry_after = retry_result.get('retry_after')
                                 continue
                             else:
@@ -482,7 +609,7 @@ class UniversalLLMTranslator:
                                 LogService.log_error(f"❌ Тип ошибки изменился: {retry_error_type}")
                                 if self.save_prompt_history and self.current_chapter_id:
                                     self._save_prompt_history(system_prompt, user_prompt, None, retry_result, False, retry_result.get('error', ''))
-                                return None
+                                return None, None
 
                         LogService.log_error(f"❌ Все {max_retries_429} retry исчерпаны (server-busy)")
                         if self.save_prompt_history and self.current_chapter_id:
@@ -500,7 +627,7 @@ class UniversalLLMTranslator:
                             raise RateLimitError(
                                 f"NVIDIA NIM server-busy ({error_type}) не сбросился после {max_retries_429} retry (~1 час)"
                             )
-                        return None
+                        return None, None
 
                     # Специальная обработка для Ollama server error (500), upstream error (502), service unavailable (503), upstream timeout (504), timeout, unexpected error с длинными повторами
                     if self.model.provider in ('ollama', 'ollama_turbo') and error_type in ['upstream_error', 'upstream_timeout', 'server_error', 'service_unavailable', 'timeout', 'unexpected']:
@@ -562,7 +689,7 @@ class UniversalLLMTranslator:
                                 if self.save_prompt_history and self.current_chapter_id:
                                     self._save_prompt_history(system_prompt, user_prompt, retry_result['content'], retry_result, True)
 
-                                return retry_result['content']
+                                return retry_result['content'], retry_result.get('finish_reason', 'unknown')
                             else:
                                 retry_error_type = retry_result.get('error_type', 'general')
                                 retry_error = retry_result.get('error', 'Неизвестная ошибка')
@@ -587,13 +714,13 @@ class UniversalLLMTranslator:
                                     LogService.log_error(f"🛑 Прерывание повторов {error_name} из-за смены типа ошибки")
                                     if self.save_prompt_history and self.current_chapter_id:
                                         self._save_prompt_history(system_prompt, user_prompt, None, retry_result, False, retry_error)
-                                    return None
+                                    return None, None
 
                         if switched_to_429:
                             # Переключаемся на быстрые retry для 429
                             endpoint = getattr(self.model, 'api_endpoint', '')
                             if endpoint and endpoint in _limiters:
-                                _limiters[endpoint].report_429()
+                                await _limiters[endpoint].report_429_async()
 
                             max_retries_429 = 15
                             for attempt_429 in range(1, max_retries_429 + 1):
@@ -610,23 +737,23 @@ class UniversalLLMTranslator:
                                         _limiters[endpoint].report_success()
                                     if self.save_prompt_history and self.current_chapter_id:
                                         self._save_prompt_history(system_prompt, user_prompt, retry_result['content'], retry_result, True)
-                                    return retry_result['content']
+                                    return retry_result['content'], retry_result.get('finish_reason', 'unknown')
 
                                 retry_error_type = retry_result.get('error_type', 'general')
                                 if retry_error_type == 'concurrent_slot':
                                     if endpoint and endpoint in _limiters:
-                                        _limiters[endpoint].report_429()
+                                        await _limiters[endpoint].report_429_async()
                                     continue
                                 else:
                                     LogService.log_error(f"❌ Тип ошибки изменился: {retry_error_type}")
                                     if self.save_prompt_history and self.current_chapter_id:
                                         self._save_prompt_history(system_prompt, user_prompt, None, retry_result, False, retry_result.get('error', ''))
-                                    return None
+                                    return None, None
 
                             LogService.log_error(f"❌ Все {max_retries_429} быстрых retry исчерпаны после переключения с {error_name}")
                             if self.save_prompt_history and self.current_chapter_id:
                                 self._save_prompt_history(system_prompt, user_prompt, None, result, False, f"429 после {max_retries_429} попыток")
-                            return None
+                            return None, None
 
                         # Все попытки исчерпаны без переключения
                         LogService.log_error(f"❌ Все {len(retry_delays)} попыток исчерпаны, {error_name} сохраняется")
@@ -636,7 +763,7 @@ class UniversalLLMTranslator:
                         if self.save_prompt_history and self.current_chapter_id:
                             self._save_prompt_history(system_prompt, user_prompt, None, result, False, final_error)
 
-                        return None
+                        return None, None
 
                     # Специальная обработка для Ollama HOURLY rate limit с прогрессивными повторами
                     if self.model.provider in ('ollama', 'ollama_turbo') and error_type == 'rate_limit':
@@ -683,7 +810,7 @@ class UniversalLLMTranslator:
                                 if self.save_prompt_history and self.current_chapter_id:
                                     self._save_prompt_history(system_prompt, user_prompt, retry_result['content'], retry_result, True)
 
-                                return retry_result['content']
+                                return retry_result['content'], retry_result.get('finish_reason', 'unknown')
                             else:
                                 retry_error_type = retry_result.get('error_type', 'general')
                                 retry_error = retry_result.get('error', 'Неизвестная ошибка')
@@ -705,7 +832,7 @@ class UniversalLLMTranslator:
                                     LogService.log_error(f"🛑 Прерывание повторов из-за смены типа ошибки")
                                     if self.save_prompt_history and self.current_chapter_id:
                                         self._save_prompt_history(system_prompt, user_prompt, None, retry_result, False, retry_error)
-                                    return None
+                                    return None, None
 
                         # Если все попытки исчерпаны - останавливаем задачу
                         LogService.log_error(f"❌ Все {len(retry_delays)} попыток исчерпаны, часовой лимит всё ещё не снят")
@@ -745,7 +872,7 @@ class UniversalLLMTranslator:
                                 if self.save_prompt_history and self.current_chapter_id:
                                     self._save_prompt_history(system_prompt, user_prompt, retry_result['content'], retry_result, True)
 
-                                return retry_result['content']
+                                return retry_result['content'], retry_result.get('finish_reason', 'unknown')
                             else:
                                 retry_error_type = retry_result.get('error_type', 'general')
                                 retry_error = retry_result.get('error', 'Неизвестная ошибка')
@@ -755,12 +882,12 @@ class UniversalLLMTranslator:
                                     LogService.log_error(f"❌ Тип ошибки изменился на {retry_error_type}, прерываем повторы")
                                     if self.save_prompt_history and self.current_chapter_id:
                                         self._save_prompt_history(system_prompt, user_prompt, None, retry_result, False, retry_error)
-                                    return None
+                                    return None, None
 
                         LogService.log_error(f"❌ Все {len(retry_delays)} попыток исчерпаны, модель всё ещё перегружена")
                         if self.save_prompt_history and self.current_chapter_id:
                             self._save_prompt_history(system_prompt, user_prompt, None, result, False, f"Модель перегружена после {len(retry_delays)} попыток")
-                        return None
+                        return None, None
 
                     # Обработка service_unavailable и server_error для не-Ollama провайдеров
                     if error_type in ['service_unavailable', 'server_error']:
@@ -780,18 +907,18 @@ class UniversalLLMTranslator:
                                 self.last_finish_reason = retry_result.get('finish_reason', 'unknown')
                                 if self.save_prompt_history and self.current_chapter_id:
                                     self._save_prompt_history(system_prompt, user_prompt, retry_result['content'], retry_result, True)
-                                return retry_result['content']
+                                return retry_result['content'], retry_result.get('finish_reason', 'unknown')
 
                         LogService.log_error(f"❌ Все попытки исчерпаны")
                         if self.save_prompt_history and self.current_chapter_id:
                             self._save_prompt_history(system_prompt, user_prompt, None, result, False, error)
-                        return None
+                        return None, None
 
                     else:
                         # Для других типов ошибок сохраняем и возвращаем None
                         if self.save_prompt_history and self.current_chapter_id:
                             self._save_prompt_history(system_prompt, user_prompt, None, result, False, error)
-                        return None
+                        return None, None
 
             except Exception as e:
                 LogService.log_error(f"Исключение при вызове {self.model.provider}: {e}")
@@ -801,37 +928,133 @@ class UniversalLLMTranslator:
 
                 raise
 
+    # Потолок параллельных запросов на endpoint по умолчанию (переопределяется provider_config.max_concurrent)
+    DEFAULT_MAX_CONCURRENT = 10
+
+    def _limiter_endpoint(self) -> str:
+        """Ключ лимитера: endpoint модели, а если его нет (OpenRouter) — провайдер"""
+        return getattr(self.model, 'api_endpoint', '') or self.model.provider
+
+    def _get_request_limiter(self) -> Optional[DistributedConcurrencyLimiter]:
+        """Адаптивный лимитер для endpoint модели (общий для всех процессов воркера)"""
+        endpoint = self._limiter_endpoint()
+        if not endpoint:
+            return None
+        provider_config = getattr(self.model, 'provider_config', None) or {}
+        max_concurrent = int(provider_config.get('max_concurrent') or self.DEFAULT_MAX_CONCURRENT)
+        return _get_limiter(endpoint, max_concurrent=max_concurrent)
+
+    def _response_cache_key(self, system_prompt: str, user_prompt: str, temperature: float,
+                            kwargs: dict) -> Optional[str]:
+        """
+        Ключ кэша ответа или None, если кэш для запроса не используется.
+        use_cache=False в kwargs отключает кэш для отдельного запроса.
+        """
+        use_cache = kwargs.pop('use_cache', True)
+        if not (use_cache and self.use_response_cache):
+            return None
+        # Разметка префикса для кэша провайдера на ответ не влияет
+        options = {name: value for name, value in kwargs.items() if name != 'prompt_prefix_chars'}
+        return LLMResponseCache.make_key(
+            self.model.provider, self.model.model_id, getattr(self.model, 'api_endpoint', None),
+            system_prompt, user_prompt, temperature or self.model.default_temperature,
+            self.model.max_output_tokens, options
+        )
+
+    def _get_cached_response(self, cache_key: Optional[str]) -> Optional[Tuple[str, str]]:
+        """Ответ из кэша и его finish_reason (только для первого запроса с этим ключом в экземпляре)"""
+        if cache_key is None:
+            return None
+        seen = self._cache_keys_seen.setdefault(self.current_chapter_id, set())
+        if cache_key in seen:
+            return None
+        seen.add(cache_key)
+
+        cached = LLMResponseCache.get(cache_key)
+        if not cached or not cached[0]:
+            return None
+        content, finish_reason = cached
+        LogService.log_info(f"♻️ Ответ LLM из кэша ({self.current_prompt_type}, {len(content)} символов)")
+        return content, finish_reason or 'cached'
+
+    def _store_cached_response(self, cache_key: Optional[str], content: Optional[str],
+                               finish_reason: Optional[str]):
+        """Сохранение полного ответа (обрезанные по лимиту токенов не кэшируются)"""
+        if cache_key is None or not content or content == "CONTENT_BLOCKED_NEED_SPLIT":
+            return
+        if finish_reason in ('MAX_TOKENS', 'LENGTH', 'length'):
+            return
+        LLMResponseCache.put(cache_key, content, finish_reason)
+
+    def forget_cached_responses(self, chapter_id: Optional[int] = None):
+        """
+        Удаление из кэша ответов, полученных этим экземпляром для главы
+        (например, отклонённых валидацией), чтобы повторный запуск главы не получил их снова
+        """
+        keys = self._cache_keys_seen.get(chapter_id if chapter_id is not None else self.current_chapter_id)
+        if keys:
+            LLMResponseCache.delete(list(keys))
+
     def make_request(self, system_prompt: str, user_prompt: str, temperature: float = None, **kwargs) -> Optional[str]:
         """Синхронная обёртка над асинхронным методом с адаптивным контролем параллельности"""
-        endpoint = getattr(self.model, 'api_endpoint', '')
-        limiter = None
+        cache_key = self._response_cache_key(system_prompt, user_prompt, temperature, kwargs)
+        cached = self._get_cached_response(cache_key)
+        if cached is not None:
+            content, self.last_finish_reason = cached
+            return content
 
-        # Адаптивный лимитер только для Ollama
-        if self.model.provider in ('ollama', 'ollama_turbo') and endpoint:
-            limiter = _get_limiter(endpoint, max_concurrent=10)
+        limiter = self._get_request_limiter()
+        lease = None
 
         if limiter:
-            if not limiter.acquire(timeout=600):
+            lease = limiter.acquire(timeout=600)
+            if lease is None:
                 LogService.log_error("Таймаут ожидания слота адаптивного лимитера (10 мин)")
                 return None
 
         try:
-            result = self._execute_request(system_prompt, user_prompt, temperature, **kwargs)
+            result, finish_reason = self._execute_request(system_prompt, user_prompt, temperature, **kwargs)
             if limiter and result is not None:
                 limiter.report_success()
+            self._store_cached_response(cache_key, result, finish_reason)
             return result
         finally:
             if limiter:
-                limiter.release()
+                limiter.release(lease)
+
+    def _execute_request(self, system_prompt: str, user_prompt: str, temperature: float = None,
+                         **kwargs) -> Tuple[Optional[str], Optional[str]]:
+        """Выполнение запроса в долгоживущем event loop воркера: (ответ, finish_reason)"""
+        return worker_loop.run(self._make_request_async(system_prompt, user_prompt, temperature, **kwargs))
+
+    async def make_request_limited_async(self, system_prompt: str, user_prompt: str,
+                                         temperature: float = None, **kwargs) -> Optional[str]:
+        """Асинхронный запрос с тем же адаптивным лимитером, что и make_request (для конкурентных запросов в loop воркера)"""
+        loop = asyncio.get_running_loop()
+        cache_key = self._response_cache_key(system_prompt, user_prompt, temperature, kwargs)
+        cached = await loop.run_in_executor(None, self._get_cached_response, cache_key)
+        if cached is not None:
+            return cached[0]
+
+        limiter = self._get_request_limiter()
+        lease = None
+
+        if limiter:
+            # Ожидание слота — asyncio.sleep в loop, без потока на каждый ожидающий запрос
+            lease = await limiter.acquire_async(timeout=600)
+            if lease is None:
+                LogService.log_error("Таймаут ожидания слота адаптивного лимитера (10 мин)")
+                return None
 
-    def _execute_request(self, system_prompt: str, user_prompt: str, temperature: float = None, **kwargs) -> Optional[str]:
-        """Выполнение запроса через event loop"""
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            return loop.run_until_complete(self.make_request_async(system_prompt, user_prompt, temperature, **kwargs))
+            result, finish_reason = await self._make_request_async(system_prompt, user_prompt, temperature, **kwargs)
+            if limiter and result is not None:
+                await limiter.report_success_async()
+            await loop.run_in_executor(None, self._store_cached_response, cache_key, result, finish_reason)
+            return result
         finally:
-            loop.close()
+            if limiter:
+                await limiter.release_async(lease)
 
     def _save_prompt_history(self, system_prompt: str, user_prompt: str, response: Optional[str],
                             result: dict, success: bool, error_message: str = None):
@@ -851,6 +1074,7 @@ class UniversalLLMTranslator:
                 model_used=self.model.model_id,
                 temperature=result.get('temperature', self.model.default_temperature),
                 tokens_used=usage.get('total_tokens'),
+                cached_tokens=result.get('cached_tokens'),
                 finish_reason=result.get('finish_reason'),
                 execution_time=time.time() - self.request_start_time,
                 success=success,
@@ -870,8 +1094,60 @@ class UniversalLLMTranslator:
             self.current_prompt_type = 'translation'
         self.request_start_time = time.time()
 
-        user_prompt = f"{context}\n\nТЕКСТ ДЛЯ ПЕРЕВОДА:\n{text}"
-        return self.make_request(system_prompt, user_prompt, temperature=temperature)
+        user_prompt = self._build_translation_prompt(text, context)
+        return self.make_request(system_prompt, user_prompt, temperature=temperature,
+                                 prompt_prefix_chars=len(context or '') or None)
+
+    def translate_parts(self, parts: List[str], system_prompt: str, context: str = "",
+                        chapter_id: int = None, temperature: float = None,
+                        max_concurrent: int = 3, on_part_done=None) -> List[Optional[str]]:
+        """
+        Конкурентный перевод частей одной главы.
+        Контекст у всех частей общий, поэтому они независимы: запросы идут параллельно
+        (не больше max_concurrent одновременно, с учётом адаптивного лимитера endpoint'а),
+        результаты возвращаются в исходном порядке. Исключение первой упавшей части пробрасывается.
+
+        Args:
+            on_part_done: callback(номер части, перевод) — вызывается по мере готовности частей
+                          (в пуле потоков, например для сохранения контрольных точек)
+        """
+        self.current_chapter_id = chapter_id
+        if not hasattr(self, 'current_prompt_type') or self.current_prompt_type == 'translation':
+            self.current_prompt_type = 'translation'
+        self.request_start_time = time.time()
+
+        return worker_loop.run(self._translate_parts_async(
+            parts, system_prompt, context, temperature, max_concurrent, on_part_done
+        ))
+
+    async def _translate_parts_async(self, parts: List[str], system_prompt: str, context: str,
+                                     temperature: float, max_concurrent: int,
+                                     on_part_done=None) -> List[Optional[str]]:
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+
+        async def translate_one(index: int, text: str) -> Optional[str]:
+            async with semaphore:
+                user_prompt = self._build_translation_prompt(text, context)
+                result = await self.make_request_limited_async(system_prompt, user_prompt, temperature=temperature,
+                                                               prompt_prefix_chars=len(context or '') or None)
+            if on_part_done is not None:
+                await asyncio.get_running_loop().run_in_executor(None, on_part_done, index, result)
+            return result
+
+        results = await asyncio.gather(*(translate_one(index, part) for index, part in enumerate(parts)),
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return list(results)
+
+    @staticmethod
+    def _build_translation_prompt(text: str, context: str) -> str:
+        """
+        User-промпт для перевода части текста.
+        Контекст главы идёт первым: он общий для всех частей и кэшируется провайдером как префикс.
+        """
+        return f"{context}\n\nТЕКСТ ДЛЯ ПЕРЕВОДА:\n{text}"
 
     def generate_summary(self, text: str, summary_prompt: str, chapter_id: int = None, glossary_text: str = None) -> Optional[str]:
         """Генерация резюме главы с учётом глоссария для консистентности терминов"""
@@ -880,12 +1156,15 @@ class UniversalLLMTranslator:
             self.current_prompt_type = 'summary'
         self.request_start_time = time.time()
 
-        # Добавляем глоссарий для консистентности имён и терминов
+        user_prompt = self._build_summary_prompt(text, glossary_text)
+        return self.make_request(summary_prompt, user_prompt, temperature=self.SUMMARY_TEMPERATURE)
+
+    @staticmethod
+    def _build_summary_prompt(text: str, glossary_text: str = None) -> str:
+        """User-промпт резюме главы (глоссарий — для консистентности имён и терминов)"""
         if glossary_text:
-            user_prompt = f"ГЛОССАРИЙ ТЕРМИНОВ (используй эти переводы!):\n{glossary_text}\n\nТЕКСТ ГЛАВЫ:\n{text}"
-        else:
-            user_prompt = f"ТЕКСТ ГЛАВЫ:\n{text}"
-        return self.make_request(summary_prompt, user_prompt, temperature=0.3)
+            return f"ГЛОССАРИЙ ТЕРМИНОВ (используй эти переводы!):\n{glossary_text}\n\nТЕКСТ ГЛАВЫ:\n{text}"
+        return f"ТЕКСТ ГЛАВЫ:\n{text}"
 
     def extract_terms(self, text: str, extraction_prompt: str, existing_glossary: dict,
                      chapter_id: int = None, original_text: str = None) -> Optional[str]:
@@ -895,13 +1174,17 @@ class UniversalLLMTranslator:
             self.current_prompt_type = 'terms_extraction'
         self.request_start_time = time.time()
 
+        user_prompt = self._build_terms_prompt(text, existing_glossary, original_text)
+        return self.make_request(extraction_prompt, user_prompt, temperature=self.TERMS_TEMPERATURE)
+
+    def _build_terms_prompt(self, text: str, existing_glossary: dict, original_text: str = None) -> str:
+        """User-промпт извлечения терминов"""
         # Используем контекстную фильтрацию - только термины из текста главы
         if original_text:
             glossary_text = self._format_context_glossary_for_prompt(existing_glossary, original_text)
         else:
             glossary_text = self._format_glossary_for_prompt(existing_glossary)
-        user_prompt = f"СУЩЕСТВУЮЩИЙ ГЛОССАРИЙ:\n{glossary_text}\n\nТЕКСТ ДЛЯ АНАЛИЗА:\n{text}"
-        return self.make_request(extraction_prompt, user_prompt, temperature=0.2)
+        return f"СУЩЕСТВУЮЩИЙ ГЛОССАРИЙ:\n{glossary_text}\n\nТЕКСТ ДЛЯ АНАЛИЗА:\n{text}"
 
     def _format_glossary_for_prompt(self, glossary: dict) -> str:
         """Форматирование глоссария для промпта"""
@@ -948,8 +1231,8 @@ class UniversalLLMTranslator:
         if not original_text or not glossary:
             return "Глоссарий пуст"
 
-        # Нормализуем оригинальный текст для поиска
-        original_normalized = normalize_chinese(original_text)
+        # Термины главы находим за один проход по тексту
+        glossary = filter_glossary_by_text(glossary, original_text)
 
         lines = []
         categories = [
@@ -961,12 +1244,7 @@ class UniversalLLMTranslator:
         ]
 
         for cat_key, cat_name in categories:
-            terms = glossary.get(cat_key, {})
-            matching_terms = []
-            for eng, rus in terms.items():
-                eng_normalized = normalize_chinese(eng)
-                if eng in original_text or eng_normalized in original_normalized:
-                    matching_terms.append((eng, rus))
+            matching_terms = list(glossary.get(cat_key, {}).items())
             if matching_terms:
                 lines.append(f"{cat_name}:")
                 for eng, rus in sorted(matching_terms):
@@ -4,14 +4,11 @@
 import re
 from collections import Counter
 from typing import List, Dict, Set, Tuple, Optional
-from pypinyin import pinyin, Style
+from app.utils.pinyin_table import CJK_START, CJK_END, get_table, get_ruby_map
 
 
 class PinyinHelper:
-    """Класс для работы с pinyin"""
-
-    # Кэш для ускорения повторных запросов
-    _cache: Dict[str, str] = {}
+    """Класс для работы с pinyin (по предвычисленной таблице блока CJK)"""
 
     @classmethod
     def get_pinyin(cls, char: str) -> str:
@@ -24,13 +21,9 @@ class PinyinHelper:
         Returns:
             Pinyin с тонами (например: "hǎo")
         """
-        if char in cls._cache:
-            return cls._cache[char]
-
-        if '\u4e00' <= char <= '\u9fff':
-            py = pinyin(char, style=Style.TONE)[0][0]
-            cls._cache[char] = py
-            return py
+        code = ord(char) if len(char) == 1 else -1
+        if CJK_START <= code <= CJK_END:
+            return get_table()[code - CJK_START]
         return char
 
     @classmethod
@@ -44,13 +37,7 @@ class PinyinHelper:
         Returns:
             Pinyin с пробелами между слогами (например: "nǐ hǎo")
         """
-        result = []
-        for char in word:
-            if '\u4e00' <= char <= '\u9fff':
-                result.append(cls.get_pinyin(char))
-            else:
-                result.append(char)
-        return ' '.join(result)
+        return ' '.join(cls.get_pinyin(char) for char in word)
 
     @classmethod
     def add_ruby_tags(cls, text: str) -> str:
@@ -66,14 +53,8 @@ class PinyinHelper:
         Пример:
             "你好" → "<ruby>你<rt>nǐ</rt></ruby><ruby>好<rt>hǎo</rt></ruby>"
         """
-        result = []
-        for char in text:
-            if '\u4e00' <= char <= '\u9fff':
-                py = cls.get_pinyin(char)
-                result.append(f'<ruby>{char}<rt>{py}</rt></ruby>')
-            else:
-                result.append(char)
-        return ''.join(result)
+        # Один проход str.translate по готовым фрагментам разметки
+        return text.translate(get_ruby_map())
 
 
 def split_into_sentences_zh(text: str, max_length: int = 50) -> List[str]:
@@ -125,7 +106,8 @@ class CharacterStatsTracker:
         self.seen_chars: Set[str] = set()  # Все встреченные иероглифы
         self.chapter_first_seen: Dict[str, int] = {}  # char → номер главы где впервые
 
-    def _find_example_sentence(self, char: str, sentences: List[str]) -> Optional[str]:
+    @staticmethod
+    def _find_example_sentence(char: str, sentences: List[str]) -> Optional[str]:
         """
         Находит первое предложение, содержащее указанный иероглиф
 
@@ -160,15 +142,22 @@ class CharacterStatsTracker:
                 'total_unique_so_far': int  # Уникальных по всей книге
             }
         """
-        # Извлекаем только китайские иероглифы
-        chars = [c for c in chinese_text if '\u4e00' <= c <= '\u9fff']
-        chapter_counter = Counter(chars)
+        new_chars, total_unique_so_far = self.advance(chapter_num, chinese_text)
+        return self.build_chapter_stats(chinese_text, new_chars, total_unique_so_far)
 
-        # Разбиваем текст на предложения для примеров
-        sentences = split_into_sentences_zh(chinese_text)
+    def advance(self, chapter_num: int, chinese_text: str) -> Tuple[Set[str], int]:
+        """
+        Зависящая от порядка глав часть статистики: какие иероглифы встретились впервые.
+        Дешёвый проход (подсчёт на уровне C), выполняется последовательно по главам.
+
+        Returns:
+            (new_chars, total_unique_so_far)
+        """
+        text_counter = Counter(chinese_text)
+        chapter_counter = {c: n for c, n in text_counter.items() if '\u4e00' <= c <= '\u9fff'}
 
         # Находим новые иероглифы (впервые встретились в книге)
-        current_chars = set(chars)
+        current_chars = set(chapter_counter)
         new_chars = current_chars - self.seen_chars
 
         # Запоминаем где впервые встретили
@@ -177,12 +166,27 @@ class CharacterStatsTracker:
 
         # Обновляем глобальную статистику
         self.seen_chars.update(current_chars)
-        self.global_counter.update(chars)
+        self.global_counter.update(chapter_counter)
+
+        return new_chars, len(self.seen_chars)
+
+    @staticmethod
+    def build_chapter_stats(chinese_text: str, new_chars: Set[str], total_unique_so_far: int) -> Dict:
+        """
+        Статистика главы по результату advance(). Не зависит от других глав,
+        поэтому может выполняться параллельно (в том числе в других процессах).
+        """
+        # Извлекаем только китайские иероглифы
+        chars = [c for c in chinese_text if '\u4e00' <= c <= '\u9fff']
+        chapter_counter = Counter(chars)
+
+        # Разбиваем текст на предложения для примеров
+        sentences = split_into_sentences_zh(chinese_text)
 
         # Формируем топ-20 с pinyin и примером предложения
         top_20 = []
         for char, count in chapter_counter.most_common(20):
-            example = self._find_example_sentence(char, sentences)
+            example = CharacterStatsTracker._find_example_sentence(char, sentences)
             top_20.append({
                 'char': char,
                 'pinyin': PinyinHelper.get_pinyin(char),
@@ -203,8 +207,8 @@ class CharacterStatsTracker:
             'top_20': top_20,
             'new_chars': new_chars_with_pinyin,
             'total_chars': len(chars),
-            'unique_chars': len(current_chars),
-            'total_unique_so_far': len(self.seen_chars)
+            'unique_chars': len(chapter_counter),
+            'total_unique_so_far': total_unique_so_far
         }
 
     def get_book_summary(self) -> Dict:
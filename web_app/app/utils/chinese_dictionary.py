@@ -1,10 +1,19 @@
 """
 Китайско-русский словарь на основе BKRS (StarDict формат)
+
+Файлы словаря не загружаются в память целиком: .dict и .idx отображаются через mmap
+(страницы общие для всех процессов-воркеров), поиск идёт двоичным поиском по
+отсортированному индексу смещений, который строится один раз и хранится рядом со словарём.
+Статья декодируется и очищается только при обращении; частые слова кэшируются.
 """
+import mmap
 import os
 import struct
 import re
-from typing import Dict, Optional, List
+import threading
+from array import array
+from functools import lru_cache
+from typing import Optional, List
 from pathlib import Path
 
 
@@ -14,84 +23,176 @@ class ChineseRussianDictionary:
     """
 
     _instance = None
-    _dict_data: Dict[str, str] = {}
-    _loaded = False
+    _lock = threading.Lock()
 
     # Путь к файлам словаря
     DICT_DIR = Path(__file__).parent.parent.parent / 'data' / 'bkrs'
 
+    # Отсортированный индекс: заголовок (магия, размер и mtime .idx, число записей),
+    # затем uint32-позиции записей .idx в порядке возрастания байтов слова
+    SORTED_INDEX_NAME = 'dabkrs.idx.sorted'
+    SORTED_INDEX_MAGIC = b'BKRSIDX1'
+    SORTED_INDEX_HEADER = struct.Struct('=8sQQQ')
+
+    # Размер LRU-кэша очищенных статей
+    LOOKUP_CACHE_SIZE = 65536
+
     @classmethod
     def get_instance(cls) -> 'ChineseRussianDictionary':
         """Singleton для словаря"""
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
         return cls._instance
 
     @classmethod
     def reset(cls):
         """Сброс словаря для перезагрузки"""
-        cls._instance = None
-        cls._dict_data = {}
-        cls._loaded = False
+        with cls._lock:
+            if cls._instance is not None:
+                cls._instance._close()
+            cls._instance = None
 
     def __init__(self):
-        if not ChineseRussianDictionary._loaded:
-            self._load_dictionary()
-
-    def _load_dictionary(self):
-        """Загрузка словаря из StarDict файлов"""
+        self._dict_map: Optional[mmap.mmap] = None
+        self._idx_map: Optional[mmap.mmap] = None
+        self._sorted_map: Optional[mmap.mmap] = None
+        self._positions = None  # uint32-позиции записей .idx, отсортированные по слову
+        self._lookup_cached = lru_cache(maxsize=self.LOOKUP_CACHE_SIZE)(self._lookup_uncached)
+        self._open_dictionary()
+
+    def _open_dictionary(self):
+        """Отображение файлов словаря в память и подготовка индекса"""
         idx_path = self.DICT_DIR / 'dabkrs.idx'
         dict_path = self.DICT_DIR / 'dabkrs.dict'
 
         if not idx_path.exists() or not dict_path.exists():
             print(f"⚠️ Словарь BKRS не найден в {self.DICT_DIR}")
-            ChineseRussianDictionary._loaded = True
             return
 
-        print(f"📖 Загружаю словарь BKRS...")
-
-        # Читаем словарные статьи
         with open(dict_path, 'rb') as f:
-            dict_data = f.read()
-
-        # Читаем индекс и парсим
+            self._dict_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
         with open(idx_path, 'rb') as f:
-            idx_data = f.read()
-
+            self._idx_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        idx_stat = idx_path.stat()
+        if not self._open_sorted_index(idx_stat):
+            positions = self._build_sorted_index()
+            self._save_sorted_index(positions, idx_stat)
+            if not self._open_sorted_index(idx_stat):
+                # Каталог словаря недоступен для записи — индекс остаётся в памяти процесса
+                self._positions = positions
+
+        print(f"✅ Словарь BKRS подключён: {len(self._positions):,} записей")
+
+    def _open_sorted_index(self, idx_stat: os.stat_result) -> bool:
+        """Отображение сохранённого индекса, если он построен для текущего .idx"""
+        sorted_path = self.DICT_DIR / self.SORTED_INDEX_NAME
+        header_size = self.SORTED_INDEX_HEADER.size
+        try:
+            with open(sorted_path, 'rb') as f:
+                sorted_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        if len(sorted_map) >= header_size:
+            magic, idx_size, idx_mtime, count = self.SORTED_INDEX_HEADER.unpack_from(sorted_map)
+            if (magic == self.SORTED_INDEX_MAGIC and idx_size == idx_stat.st_size
+                    and idx_mtime == idx_stat.st_mtime_ns and len(sorted_map) == header_size + count * 4):
+                self._sorted_map = sorted_map
+                self._positions = memoryview(sorted_map)[header_size:].cast('I')
+                return True
+
+        sorted_map.close()
+        return False
+
+    def _build_sorted_index(self) -> array:
+        """Разовый проход по .idx: позиции записей, отсортированные по байтам слова"""
+        print(f"📖 Строю индекс словаря BKRS...")
+        idx_data = self._idx_map
+        entries = []
         pos = 0
-        count = 0
+        size = len(idx_data)
 
-        while pos < len(idx_data):
-            # Ищем null-terminated строку (слово)
+        while pos < size:
+            # Слово — null-terminated строка, за ней offset и size (big-endian uint32)
             null_pos = idx_data.find(b'\x00', pos)
-            if null_pos == -1:
+            if null_pos == -1 or null_pos + 9 > size:
                 break
+            if null_pos > pos:
+                entries.append((idx_data[pos:null_pos], pos))
+            pos = null_pos + 9
+
+        # При одинаковых словах порядок файла сохраняется (сортировка устойчива)
+        entries.sort(key=lambda entry: entry[0])
+        return array('I', (position for _, position in entries))
+
+    def _save_sorted_index(self, positions: array, idx_stat: os.stat_result):
+        """Атомарная запись индекса рядом со словарём (общий для всех процессов)"""
+        sorted_path = self.DICT_DIR / self.SORTED_INDEX_NAME
+        tmp_path = sorted_path.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.SORTED_INDEX_HEADER.pack(
+                    self.SORTED_INDEX_MAGIC, idx_stat.st_size, idx_stat.st_mtime_ns, len(positions)
+                ))
+                positions.tofile(f)
+            os.replace(tmp_path, sorted_path)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить индекс словаря BKRS: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _close(self):
+        """Освобождение отображений файлов"""
+        self._lookup_cached.cache_clear()
+        if isinstance(self._positions, memoryview):
+            self._positions.release()
+        self._positions = None
+        for mapped in (self._sorted_map, self._idx_map, self._dict_map):
+            if mapped is not None:
+                mapped.close()
+        self._sorted_map = self._idx_map = self._dict_map = None
+
+    def _word_at(self, position: int) -> bytes:
+        """Слово записи .idx по её позиции"""
+        return self._idx_map[position:self._idx_map.find(b'\x00', position)]
+
+    def _lookup_uncached(self, word: str) -> Optional[str]:
+        """Двоичный поиск слова в индексе, декодирование и очистка статьи"""
+        if self._positions is None or not word:
+            return None
 
-            word = idx_data[pos:null_pos].decode('utf-8', errors='ignore')
-            pos = null_pos + 1
-
-            # Читаем offset и size (big-endian uint32)
-            if pos + 8 > len(idx_data):
+        key = word.encode('utf-8')
+        positions = self._positions
+
+        # Правая граница диапазона равных слов (как bisect_right)
+        low, high = 0, len(positions)
+        while low < high:
+            middle = (low + high) // 2
+            if key < self._word_at(positions[middle]):
+                high = middle
+            else:
+                low = middle + 1
+
+        # Для повторяющихся слов берём последнюю непустую статью (как раньше при загрузке в dict)
+        index = low - 1
+        while index >= 0:
+            position = positions[index]
+            if self._word_at(position) != key:
                 break
-
-            offset = struct.unpack('>I', idx_data[pos:pos+4])[0]
-            size = struct.unpack('>I', idx_data[pos+4:pos+8])[0]
-            pos += 8
-
-            # Получаем статью
-            if offset + size <= len(dict_data):
-                article = dict_data[offset:offset+size].decode('utf-8', errors='ignore')
-                # Очищаем HTML и берём только первое значение
+            offset, size = struct.unpack_from('>II', self._idx_map, position + len(key) + 1)
+            if offset + size <= len(self._dict_map):
+                article = self._dict_map[offset:offset + size].decode('utf-8', errors='ignore')
                 clean_text = self._clean_html(article)
-                if word and clean_text:
-                    ChineseRussianDictionary._dict_data[word] = clean_text
-
-            count += 1
-            if count % 500000 == 0:
-                print(f"   Загружено {count:,} записей...")
+                if clean_text:
+                    return clean_text
+            index -= 1
 
-        ChineseRussianDictionary._loaded = True
-        print(f"✅ Словарь загружен: {len(ChineseRussianDictionary._dict_data):,} слов")
+        return None
 
     def _clean_html(self, html: str) -> str:
         """
@@ -189,7 +290,7 @@ class ChineseRussianDictionary:
         Returns:
             Русский перевод или None
         """
-        return ChineseRussianDictionary._dict_data.get(word)
+        return self._lookup_cached(word)
 
     def lookup_char(self, char: str) -> Optional[str]:
         """
@@ -225,12 +326,12 @@ class ChineseRussianDictionary:
     @property
     def is_loaded(self) -> bool:
         """Проверка загружен ли словарь"""
-        return ChineseRussianDictionary._loaded and len(ChineseRussianDictionary._dict_data) > 0
+        return self._positions is not None and len(self._positions) > 0
 
     @property
     def word_count(self) -> int:
         """Количество слов в словаре"""
-        return len(ChineseRussianDictionary._dict_data)
+        return len(self._positions) if self._positions is not None else 0
 
 
 # Удобная функция для быстрого поиска
@@ -1,9 +1,12 @@
 """
-Модуль для работы с консольным буфером (Redis-backed)
+Модуль для работы с консольным буфером (Redis Streams)
+
+Сообщения хранятся в стриме с ограничением длины, статистика по уровням и
+источникам ведётся счётчиками, которые обновляются атомарно вместе со стримом.
+Живая консоль читает только новые сообщения через XREAD BLOCK.
 """
 from datetime import datetime
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Optional, Tuple
 import redis
 import os
 
@@ -16,10 +19,47 @@ redis_client = redis.Redis(
 )
 
 MAX_BUFFER_SIZE = 1000
-BUFFER_KEY = 'console:messages'
+STREAM_KEY = 'console:stream'
+LEVELS_KEY = 'console:stats:levels'
+SOURCES_KEY = 'console:stats:sources'
+
+# Добавление сообщения: вытесняем самые старые записи (с уменьшением их счётчиков),
+# затем XADD и увеличение счётчиков нового сообщения
+_ADD_MESSAGE_SCRIPT = """
+local stream, levels, sources = KEYS[1], KEYS[2], KEYS[3]
+local max_len = tonumber(ARGV[1])
+
+local function decr(key, field)
+    if redis.call('HINCRBY', key, field, -1) <= 0 then
+        redis.call('HDEL', key, field)
+    end
+end
+
+while redis.call('XLEN', stream) >= max_len do
+    local oldest = redis.call('XRANGE', stream, '-', '+', 'COUNT', 1)[1]
+    local fields = oldest[2]
+    for i = 1, #fields, 2 do
+        if fields[i] == 'level' then
+            decr(levels, fields[i + 1])
+        elseif fields[i] == 'source' then
+            decr(sources, fields[i + 1])
+        end
+    end
+    redis.call('XDEL', stream, oldest[1])
+end
+
+local id = redis.call('XADD', stream, '*',
+    'timestamp', ARGV[2], 'level', ARGV[3], 'message', ARGV[4], 'source', ARGV[5])
+redis.call('HINCRBY', levels, ARGV[3], 1)
+redis.call('HINCRBY', sources, ARGV[5], 1)
+return id
+"""
+
+_add_message_script = redis_client.register_script(_ADD_MESSAGE_SCRIPT)
+
 
 def add_console_message(message: str, level: str = 'INFO', source: str = 'console') -> Dict[str, Any]:
-    """Добавляет сообщение в консольный буфер (Redis)"""
+    """Добавляет сообщение в консольный буфер (Redis Stream)"""
     timestamp = datetime.now().isoformat()
     console_message = {
         'timestamp': timestamp,
@@ -29,50 +69,72 @@ def add_console_message(message: str, level: str = 'INFO', source: str = 'consol
     }
 
     try:
-        # Добавляем в Redis list
-        redis_client.rpush(BUFFER_KEY, json.dumps(console_message, ensure_ascii=False))
-
-        # Ограничиваем размер буфера
-        redis_client.ltrim(BUFFER_KEY, -MAX_BUFFER_SIZE, -1)
+        _add_message_script(
+            keys=[STREAM_KEY, LEVELS_KEY, SOURCES_KEY],
+            args=[MAX_BUFFER_SIZE, timestamp, level, message, source]
+        )
     except Exception as e:
         print(f"Ошибка записи в console buffer: {e}")
 
     return console_message
 
-def get_console_buffer() -> List[Dict[str, Any]]:
-    """Возвращает копию консольного буфера из Redis"""
+def get_console_buffer(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Возвращает сообщения консольного буфера (последние limit, в хронологическом порядке)"""
     try:
-        messages = redis_client.lrange(BUFFER_KEY, 0, -1)
-        return [json.loads(msg) for msg in messages]
+        if limit:
+            entries = redis_client.xrevrange(STREAM_KEY, count=limit)
+            entries.reverse()
+        else:
+            entries = redis_client.xrange(STREAM_KEY)
+        return [fields for _, fields in entries]
     except Exception as e:
         print(f"Ошибка чтения console buffer: {e}")
         return []
 
+def get_last_message_id() -> str:
+    """ID последнего сообщения в стриме (точка, с которой читать новые сообщения)"""
+    try:
+        entries = redis_client.xrevrange(STREAM_KEY, count=1)
+        return entries[0][0] if entries else '0-0'
+    except Exception as e:
+        print(f"Ошибка чтения console buffer: {e}")
+        return '0-0'
+
+def read_console_messages(last_id: str, block_ms: int = 15000,
+                          count: int = 100) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Блокирующее чтение сообщений, появившихся после last_id.
+    Возвращает список (id, сообщение); пустой список — таймаут без новых сообщений.
+    """
+    response = redis_client.xread({STREAM_KEY: last_id}, count=count, block=block_ms)
+    if not response:
+        return []
+    _, entries = response[0]
+    return entries
+
 def clear_console_buffer():
     """Очищает консольный буфер в Redis"""
     try:
-        redis_client.delete(BUFFER_KEY)
+        redis_client.delete(STREAM_KEY, LEVELS_KEY, SOURCES_KEY)
     except Exception as e:
         print(f"Ошибка очистки console buffer: {e}")
 
 def get_console_stats() -> Dict[str, Any]:
     """Возвращает статистику консольного буфера"""
-    levels = {}
-    sources = {}
-
-    buffer = get_console_buffer()
-
-    for log in buffer:
-        level = log['level']
-        source = log['source']
-
-        levels[level] = levels.get(level, 0) + 1
-        sources[source] = sources.get(source, 0) + 1
+    try:
+        pipe = redis_client.pipeline()
+        pipe.xlen(STREAM_KEY)
+        pipe.hgetall(LEVELS_KEY)
+        pipe.hgetall(SOURCES_KEY)
+        buffer_size, levels, sources = pipe.execute()
+    except Exception as e:
+        print(f"Ошибка чтения статистики console buffer: {e}")
+        buffer_size, levels, sources = 0, {}, {}
 
     return {
-        'total': len(buffer),
-        'levels': levels,
-        'sources': sources,
-        'buffer_size': len(buffer),
+        'total': buffer_size,
+        'levels': {level: int(count) for level, count in levels.items()},
+        'sources': {source: int(count) for source, count in sources.items()},
+        'buffer_size': buffer_size,
         'max_buffer_size': MAX_BUFFER_SIZE
-    } 
\ No newline at end of file
+    }
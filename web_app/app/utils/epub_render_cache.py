@@ -0,0 +1,83 @@
+"""
+Дисковый кэш отрендеренных XHTML-страниц глав EPUB.
+
+Ключ — хэш всех входных данных страницы (текст перевода, выравнивание, версия глоссария,
+версия шаблона/CSS, заголовок с учётом префикса), поэтому при повторной сборке
+перерисовываются только изменившиеся главы.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+# Увеличивать при изменении HTML-шаблонов глав или логики рендеринга
+RENDER_CACHE_VERSION = 1
+
+EPUB_RENDER_CACHE_ENABLED = os.getenv('EPUB_RENDER_CACHE', 'true').lower() == 'true'
+EPUB_RENDER_CACHE_MAX_AGE_DAYS = int(os.getenv('EPUB_RENDER_CACHE_MAX_AGE_DAYS', '30'))
+
+
+def content_hash(*parts: Any) -> str:
+    """SHA-256 от JSON-представления частей (порядок ключей словарей не важен)"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderedChapterCache:
+    """Кэш XHTML глав: один файл на ключ в cache_dir/<2 символа ключа>/<ключ>.xhtml"""
+
+    def __init__(self, cache_dir: Path, enabled: bool = EPUB_RENDER_CACHE_ENABLED):
+        self.cache_dir = Path(cache_dir)
+        self.enabled = enabled
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f'{key}.xhtml'
+
+    def key(self, *parts: Any) -> str:
+        """Ключ страницы по её входным данным"""
+        return content_hash(RENDER_CACHE_VERSION, *parts)
+
+    def contains(self, key: str) -> bool:
+        return self.enabled and self._path(key).exists()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """XHTML страницы или None. Обновляет mtime, чтобы используемые записи не удалялись."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key: str, xhtml: bytes):
+        if not self.enabled:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Пишем во временный файл и переименовываем — читатели не увидят частичную запись
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_bytes(xhtml)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def prune(self, max_age_days: int = EPUB_RENDER_CACHE_MAX_AGE_DAYS) -> int:
+        """Удаление записей, не использовавшихся max_age_days дней. Возвращает число удалённых."""
+        if not self.enabled or not self.cache_dir.exists():
+            return 0
+        threshold = time.time() - max_age_days * 86400
+        removed = 0
+        for path in self.cache_dir.glob('*/*.xhtml'):
+            try:
+                if path.stat().st_mtime < threshold:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        return removed
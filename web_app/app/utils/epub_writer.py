@@ -0,0 +1,244 @@
+"""
+Потоковая запись EPUB: страницы пишутся в zip-архив по мере создания,
+OPF/NCX/nav — в конце. Память не растёт с длиной книги.
+"""
+import os
+import zipfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+    etree = None
+
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="EPUB/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+
+class StreamingEpubWriter:
+    """
+    Инкрементальная запись EPUB 3 (с NCX для старых читалок).
+
+    Принимает страницы ebooklib (EpubHtml) и ресурсы (EpubItem), но в отличие от
+    EpubBook не держит их в памяти: XHTML страницы сразу сжимается в архив,
+    запоминаются только метаданные для манифеста, spine и оглавления.
+
+    Пример:
+        with StreamingEpubWriter(path, identifier, title) as writer:
+            writer.add_item(css)
+            writer.add_page(title_page)
+            for page in chapter_pages:
+                writer.add_page(page, toc_section='Главы')
+    """
+
+    def __init__(self, path: str, identifier: str, title: str, language: str = 'ru',
+                 author: Optional[str] = None, description: Optional[str] = None):
+        if lxml is None:
+            raise ImportError("Модуль lxml не установлен")
+
+        self.path = str(path)
+        self.identifier = identifier
+        self.title = title
+        self.language = language
+        self.author = author
+        self.description = description
+
+        self._manifest: List[Tuple[str, str, str]] = []  # (id, href, media-type)
+        self._spine: List[str] = []
+        # Оглавление: (заголовок, href) или (название раздела, [(заголовок, href), ...])
+        self._toc: List[Tuple[str, object]] = []
+        self._toc_sections: Dict[str, List[Tuple[str, str]]] = {}
+        self._page_ids = 0
+
+        self._zip = zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED)
+        # mimetype — первым файлом и без сжатия (требование OCF)
+        self._zip.writestr(zipfile.ZipInfo('mimetype'), 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        self._zip.writestr('META-INF/container.xml', CONTAINER_XML)
+
+    def __enter__(self) -> 'StreamingEpubWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # Недописанный архив не оставляем
+            self._zip.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def add_item(self, item):
+        """Ресурс (CSS и т.п.) из epub.EpubItem"""
+        content = item.content if isinstance(item.content, bytes) else item.content.encode('utf-8')
+        self._zip.writestr(f'EPUB/{item.file_name}', content)
+        self._manifest.append((item.id, item.file_name, item.media_type))
+
+    def add_page(self, page, toc_section: Optional[str] = None):
+        """
+        Страница из epub.EpubHtml: сразу записывается в архив и добавляется в spine и оглавление.
+
+        Args:
+            page: epub.EpubHtml (используются title, file_name, content и подключённые стили)
+            toc_section: Раздел оглавления (None — верхний уровень)
+        """
+        self.add_xhtml(page.file_name, page.title, self.to_xhtml(page), toc_section)
+
+    def add_xhtml(self, file_name: str, title: str, xhtml: bytes, toc_section: Optional[str] = None):
+        """Готовый XHTML-документ страницы (например, из кэша рендеринга)"""
+        self._page_ids += 1
+        page_id = f'page_{self._page_ids}'
+
+        self._zip.writestr(f'EPUB/{file_name}', xhtml)
+        self._manifest.append((page_id, file_name, 'application/xhtml+xml'))
+        self._spine.append(page_id)
+
+        entry = (title, file_name)
+        if toc_section is None:
+            self._toc.append(entry)
+        else:
+            if toc_section not in self._toc_sections:
+                self._toc_sections[toc_section] = []
+                self._toc.append((toc_section, self._toc_sections[toc_section]))
+            self._toc_sections[toc_section].append(entry)
+
+    def to_xhtml(self, page) -> bytes:
+        """
+        XHTML-документ страницы так же, как его собирает ebooklib:
+        заголовок и стили — из свойств страницы, содержимое — дочерние элементы body.
+        """
+        head = [f'<title>{escape(page.title or "")}</title>']
+        for link in getattr(page, 'links', []):
+            attrs = ' '.join(f'{name}={quoteattr(str(value))}' for name, value in link.items() if value)
+            head.append(f'<link {attrs}/>')
+
+        body = []
+        try:
+            html_tree = lxml.html.document_fromstring(page.content)
+        except Exception:
+            html_tree = None
+        html_body = html_tree.find('body') if html_tree is not None else None
+        if html_body is not None:
+            for child in html_body:
+                body.append(etree.tostring(child, encoding='unicode', method='xml'))
+
+        language = quoteattr(self.language)
+        return (
+            "<?xml version='1.0' encoding='utf-8'?>\n"
+            "<!DOCTYPE html>\n"
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'lang={language} xml:lang={language}>\n'
+            f'<head>\n{"".join(head)}\n</head>\n'
+            f'<body>\n{"".join(body)}\n</body>\n'
+            '</html>\n'
+        ).encode('utf-8')
+
+    def close(self):
+        """Запись навигации и OPF, закрытие архива"""
+        if self._zip.fp is None:
+            return
+        self._zip.writestr('EPUB/nav.xhtml', self._build_nav())
+        self._zip.writestr('EPUB/toc.ncx', self._build_ncx())
+        self._zip.writestr('EPUB/content.opf', self._build_opf())
+        self._zip.close()
+
+    def _build_nav(self) -> str:
+        items = []
+        for label, target in self._toc:
+            if isinstance(target, list):
+                children = ''.join(
+                    f'<li><a href={quoteattr(href)}>{escape(title or "")}</a></li>' for title, href in target
+                )
+                items.append(f'<li><span>{escape(label)}</span><ol>{children}</ol></li>')
+            else:
+                items.append(f'<li><a href={quoteattr(target)}>{escape(label or "")}</a></li>')
+
+        language = quoteattr(self.language)
+        return (
+            "<?xml version='1.0' encoding='utf-8'?>\n"
+            "<!DOCTYPE html>\n"
+            f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+            f'lang={language} xml:lang={language}>\n'
+            f'<head><title>{escape(self.title)}</title></head>\n'
+            '<body>\n'
+            f'<nav epub:type="toc" id="id" role="doc-toc"><h2>{escape(self.title)}</h2><ol>{"".join(items)}</ol></nav>\n'
+            '</body>\n'
+            '</html>\n'
+        )
+
+    def _build_ncx(self) -> str:
+        points = []
+        for index, (label, target) in enumerate(self._toc):
+            if isinstance(target, list):
+                children = ''.join(
+                    f'<navPoint id="np_{index}_{child_index}"><navLabel><text>{escape(title or "")}</text></navLabel>'
+                    f'<content src={quoteattr(href)}/></navPoint>'
+                    for child_index, (title, href) in enumerate(target)
+                )
+                first_href = target[0][1] if target else ''
+                points.append(
+                    f'<navPoint id="sep_{index}"><navLabel><text>{escape(label)}</text></navLabel>'
+                    f'<content src={quoteattr(first_href)}/>{children}</navPoint>'
+                )
+            else:
+                points.append(
+                    f'<navPoint id="np_{index}"><navLabel><text>{escape(label or "")}</text></navLabel>'
+                    f'<content src={quoteattr(target)}/></navPoint>'
+                )
+
+        return (
+            "<?xml version='1.0' encoding='utf-8'?>\n"
+            '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+            f'<head><meta content={quoteattr(self.identifier)} name="dtb:uid"/>'
+            '<meta content="2" name="dtb:depth"/><meta content="0" name="dtb:totalPageCount"/>'
+            '<meta content="0" name="dtb:maxPageNumber"/></head>\n'
+            f'<docTitle><text>{escape(self.title)}</text></docTitle>\n'
+            f'<navMap>{"".join(points)}</navMap>\n'
+            '</ncx>\n'
+        )
+
+    def _build_opf(self) -> str:
+        modified = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        metadata = [
+            f'<meta property="dcterms:modified">{modified}</meta>',
+            f'<dc:identifier id="id">{escape(self.identifier)}</dc:identifier>',
+            f'<dc:title>{escape(self.title)}</dc:title>',
+            f'<dc:language>{escape(self.language)}</dc:language>',
+        ]
+        if self.author:
+            metadata.append(f'<dc:creator id="creator">{escape(self.author)}</dc:creator>')
+        if self.description:
+            metadata.append(f'<dc:description>{escape(self.description)}</dc:description>')
+
+        manifest = [
+            '<item href="nav.xhtml" id="nav" media-type="application/xhtml+xml" properties="nav"/>',
+            '<item href="toc.ncx" id="ncx" media-type="application/x-dtbncx+xml"/>',
+        ]
+        manifest.extend(
+            f'<item href={quoteattr(href)} id={quoteattr(item_id)} media-type={quoteattr(media_type)}/>'
+            for item_id, href, media_type in self._manifest
+        )
+
+        spine = ['<itemref idref="nav"/>']
+        spine.extend(f'<itemref idref={quoteattr(item_id)}/>' for item_id in self._spine)
+
+        return (
+            "<?xml version='1.0' encoding='utf-8'?>\n"
+            '<package xmlns="http://www.idpf.org/2007/opf" unique-identifier="id" version="3.0">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:opf="http://www.idpf.org/2007/opf">\n'
+            + '\n'.join(metadata) +
+            '\n</metadata>\n'
+            '<manifest>\n' + '\n'.join(manifest) + '\n</manifest>\n'
+            '<spine toc="ncx">\n' + '\n'.join(spine) + '\n</spine>\n'
+            '</package>\n'
+        )
@@ -1,15 +1,18 @@
 """
 Утилиты для выделения терминов глоссария в тексте
 """
-import re
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Tuple, Set, Optional
 
 from app.utils.character_stats import PinyinHelper
+from app.utils.glossary_matcher import TermAutomaton
 
 
 class GlossaryHighlighter:
     """Класс для выделения и отслеживания терминов глоссария"""
 
+    # (словарь глоссария, его размер, автомат) для последнего использованного глоссария
+    _automaton_cache: Optional[Tuple[Dict, int, TermAutomaton]] = None
+
     @staticmethod
     def highlight_terms_in_text(
         text: str,
@@ -38,75 +41,41 @@ class GlossaryHighlighter:
         if not text or not glossary_dict:
             return text, set()
 
-        # ОПТИМИЗАЦИЯ: Предфильтрация - оставляем только термины которые точно есть в тексте
-        # Это ускоряет обработку с 4267 терминов до ~10-20 (те что реально в тексте)
-        relevant_terms = [term for term in glossary_dict.keys() if term in text]
-
-        if not relevant_terms:
-            return text, set()  # Нет терминов в тексте
-
-        # Сортируем термины по длине (от длинных к коротким)
-        # Это предотвращает частичные совпадения
-        # Например: "涅槃劫" должно выделяться раньше чем "涅槃"
-        terms = sorted(relevant_terms, key=len, reverse=True)
+        # Один проход автоматом: в каждой позиции выделяется самый длинный термин
+        # (например, "涅槃劫" раньше чем "涅槃"), вхождения не пересекаются
+        automaton = GlossaryHighlighter._get_automaton(glossary_dict)
 
+        parts = []
         used_terms = set()
+        position = 0
 
-        # Словарь для замены: термин → placeholder
-        replacements = {}
-        placeholder_index = 0
-
-        # Отслеживание уже замененных позиций
-        replaced_ranges = []
-
-        for term in terms:
-            # Находим все вхождения термина
-            pattern = re.escape(term)
-
-            for match in re.finditer(pattern, text):
-                start, end = match.span()
-
-                # Проверяем, не пересекается ли с уже замененными диапазонами
-                is_overlapping = any(
-                    (start < r_end and end > r_start)
-                    for r_start, r_end in replaced_ranges
-                )
+        for start, end, term in automaton.iter_leftmost_longest(text):
+            parts.append(text[position:start])
+            parts.append(f"<{tag}>{term}</{tag}>")
+            used_terms.add(term)
+            position = end
 
-                if not is_overlapping:
-                    # Создаем уникальный placeholder
-                    placeholder = f"<<<TERM_{placeholder_index}>>>"
-                    replacements[placeholder] = term
-                    placeholder_index += 1
-
-                    # Добавляем термин в использованные
-                    used_terms.add(term)
-
-                    # Отмечаем диапазон как замененный
-                    replaced_ranges.append((start, end))
+        if not used_terms:
+            return text, set()  # Нет терминов в тексте
 
-        # Сортируем диапазоны по убыванию позиции (справа налево)
-        # Это позволяет заменять без смещения индексов
-        replaced_ranges.sort(reverse=True)
+        parts.append(text[position:])
 
-        # Применяем замены справа налево
-        highlighted_text = text
-        placeholder_map = {}
+        return ''.join(parts), used_terms
 
-        for i, (start, end) in enumerate(replaced_ranges):
-            term = text[start:end]
-            if term in glossary_dict:
-                placeholder = f"<<<TERM_{i}>>>"
-                placeholder_map[placeholder] = term
-                highlighted_text = highlighted_text[:start] + placeholder + highlighted_text[end:]
-
-        # Заменяем placeholders на финальные теги
-        for placeholder, term in placeholder_map.items():
-            highlighted_text = highlighted_text.replace(
-                placeholder,
-                f"<{tag}>{term}</{tag}>"
-            )
-
-        return highlighted_text, used_terms
+    @staticmethod
+    def _get_automaton(glossary_dict: Dict[str, Dict]) -> TermAutomaton:
+        """
+        Автомат по терминам глоссария. Строится один раз на словарь глоссария
+        и переиспользуется для всех предложений всех глав.
+        """
+        cached = GlossaryHighlighter._automaton_cache
+        if cached and cached[0] is glossary_dict and cached[1] == len(glossary_dict):
+            return cached[2]
+
+        automaton = TermAutomaton(glossary_dict.keys())
+        # Храним ссылку на сам словарь, чтобы проверка по идентичности была надёжной
+        GlossaryHighlighter._automaton_cache = (glossary_dict, len(glossary_dict), automaton)
+        return automaton
 
     @staticmethod
     def format_glossary_section(
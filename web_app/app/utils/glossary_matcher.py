@@ -0,0 +1,250 @@
+"""
+Поиск терминов глоссария в тексте за один проход (автомат Ахо–Корасик)
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+# Для нормализации традиционного/упрощённого китайского
+try:
+    from opencc import OpenCC
+    _opencc_t2s = OpenCC('t2s')  # Traditional to Simplified
+
+    def normalize_chinese(text: str) -> str:
+        """Нормализация китайского текста: традиционный → упрощённый"""
+        if not text:
+            return text
+        return _opencc_t2s.convert(text)
+except ImportError:
+    def normalize_chinese(text: str) -> str:
+        """Fallback: без нормализации если OpenCC не установлен"""
+        return text
+
+
+def normalize_chinese_many(texts: List[str]) -> List[str]:
+    """Нормализация списка строк одним вызовом OpenCC"""
+    if not texts:
+        return []
+    normalized = normalize_chinese('\n'.join(texts)).split('\n')
+    if len(normalized) != len(texts):
+        normalized = [normalize_chinese(text) for text in texts]
+    return normalized
+
+
+class TermPrefixTrie:
+    """
+    Префиксное дерево терминов: для нового термина находит все существующие термины,
+    являющиеся его префиксами, за один проход по символам термина.
+    """
+
+    _END = object()  # ключ узла, под которым хранится значение термина
+
+    def __init__(self, items: Iterable[Tuple[str, object]] = ()):
+        self._root: Dict = {}
+        self._size = 0
+        for term, value in items:
+            self.add(term, value)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, term: str, value: object = None):
+        """Добавление термина (значение перезаписывается, если термин уже есть)"""
+        if not term:
+            return
+        node = self._root
+        for char in term:
+            node = node.setdefault(char, {})
+        if self._END not in node:
+            self._size += 1
+        node[self._END] = value
+
+    def iter_prefixes(self, term: str) -> Iterator[Tuple[str, object]]:
+        """Термины-префиксы (строго короче term), от коротких к длинным: (термин, значение)"""
+        node = self._root
+        for index, char in enumerate(term[:-1]):
+            node = node.get(char)
+            if node is None:
+                return
+            if self._END in node:
+                yield term[:index + 1], node[self._END]
+
+
+class TermAutomaton:
+    """
+    Автомат Ахо–Корасик над набором строк.
+    Строится один раз, затем находит все вхождения всех терминов за один проход по тексту.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        # Состояние = индекс; переходы, суффиксная ссылка, термин, оканчивающийся в состоянии,
+        # и ссылка на ближайшее по суффиксной цепочке состояние с термином
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._term: List[str] = [None]
+        self._output_link: List[int] = [0]
+
+        for term in terms:
+            if term:
+                self._add(term)
+        self._build_links()
+
+    def _add(self, term: str):
+        state = 0
+        for char in term:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._term.append(None)
+                self._output_link.append(0)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._term[state] = term
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._output_link[child] = fail if self._term[fail] is not None else self._output_link[fail]
+                queue.append(child)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Все вхождения терминов: (позиция конца вхождения, термин)"""
+        goto, fail, term_at, output_link = self._goto, self._fail, self._term, self._output_link
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            match_state = state if term_at[state] is not None else output_link[state]
+            while match_state:
+                yield index + 1, term_at[match_state]
+                match_state = output_link[match_state]
+
+    def iter_leftmost_longest(self, text: str) -> Iterator[Tuple[int, int, str]]:
+        """
+        Непересекающиеся вхождения слева направо, в каждой позиции — самый длинный термин:
+        (начало, конец, термин). Например, "涅槃劫" выделяется целиком, а не как "涅槃".
+        """
+        longest: Dict[int, str] = {}
+        for end, term in self.iter_matches(text):
+            start = end - len(term)
+            current = longest.get(start)
+            if current is None or len(term) > len(current):
+                longest[start] = term
+
+        position = 0
+        for start in sorted(longest):
+            if start >= position:
+                term = longest[start]
+                position = start + len(term)
+                yield start, position, term
+
+    def find_all(self, text: str) -> Set[str]:
+        """Множество терминов, встречающихся в тексте"""
+        if not text or len(self._goto) == 1:
+            return set()
+
+        goto, fail, term_at, output_link = self._goto, self._fail, self._term, self._output_link
+        found = set()
+        reported = set()  # состояния, чья цепочка терминов уже учтена
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            match_state = state if term_at[state] is not None else output_link[state]
+            while match_state and match_state not in reported:
+                reported.add(match_state)
+                found.add(term_at[match_state])
+                match_state = output_link[match_state]
+        return found
+
+
+class GlossaryMatcher:
+    """
+    Сопоставление глоссария с текстом главы.
+
+    Термин считается найденным, если он встречается в тексте как есть
+    или в нормализованном (упрощённом) виде в нормализованном тексте.
+    Нормализация терминов и построение автоматов выполняются один раз на версию глоссария.
+    """
+
+    MAX_CACHED = 32
+
+    _cache: 'OrderedDict[frozenset, GlossaryMatcher]' = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    def __init__(self, terms: Iterable[str]):
+        terms = [term for term in set(terms) if term]
+        self._raw = TermAutomaton(terms)
+
+        # Нормализуем все термины одним вызовом OpenCC
+        normalized = normalize_chinese_many(terms)
+
+        self._by_normalized: Dict[str, List[str]] = {}
+        for term, term_normalized in zip(terms, normalized):
+            self._by_normalized.setdefault(term_normalized, []).append(term)
+        self._normalized = TermAutomaton(self._by_normalized.keys())
+
+    @classmethod
+    def for_glossary(cls, glossary: Dict[str, Dict[str, str]]) -> 'GlossaryMatcher':
+        """
+        Матчер для глоссария вида {категория: {термин: перевод}} из кэша.
+
+        Ключ кэша — набор терминов, поэтому при изменении записей GlossaryItem
+        (в любом процессе) автоматически строится новый матчер.
+        """
+        key = frozenset(term for terms in glossary.values() for term in terms)
+
+        with cls._cache_lock:
+            matcher = cls._cache.get(key)
+            if matcher is not None:
+                cls._cache.move_to_end(key)
+                return matcher
+
+        matcher = cls(key)
+
+        with cls._cache_lock:
+            cls._cache[key] = matcher
+            while len(cls._cache) > cls.MAX_CACHED:
+                cls._cache.popitem(last=False)
+        return matcher
+
+    def find_terms(self, text: str, text_normalized: str = None) -> Set[str]:
+        """Термины глоссария, встречающиеся в тексте"""
+        if not text:
+            return set()
+
+        found = self._raw.find_all(text)
+
+        if text_normalized is None:
+            text_normalized = normalize_chinese(text)
+        for term_normalized in self._normalized.find_all(text_normalized):
+            found.update(self._by_normalized[term_normalized])
+        return found
+
+    def filter_glossary(self, glossary: Dict[str, Dict[str, str]], text: str) -> Dict[str, Dict[str, str]]:
+        """Глоссарий, оставляющий только термины из текста (порядок терминов сохраняется)"""
+        found = self.find_terms(text)
+        return {
+            category: {term: value for term, value in terms.items() if term in found}
+            for category, terms in glossary.items()
+        }
+
+
+def filter_glossary_by_text(glossary: Dict[str, Dict[str, str]], text: str) -> Dict[str, Dict[str, str]]:
+    """Контекстная фильтрация глоссария {категория: {термин: перевод}} по тексту главы"""
+    if not glossary or not text:
+        return {category: {} for category in (glossary or {})}
+    return GlossaryMatcher.for_glossary(glossary).filter_glossary(glossary, text)
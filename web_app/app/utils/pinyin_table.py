@@ -0,0 +1,80 @@
+"""
+Таблица pinyin для блока CJK Unified Ideographs (U+4E00–U+9FFF)
+
+Таблица — текстовый файл data/pinyin_cjk.txt в репозитории, строка k которого содержит
+pinyin иероглифа с кодом U+4E00 + k. Пересобирается вручную после обновления pypinyin
+(python -m app.utils.pinyin_table); во время работы приложения только читается.
+Поиск pinyin — индексация по смещению кода, ruby-разметка — один вызов str.translate на предложение.
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CJK_START = 0x4E00
+CJK_END = 0x9FFF
+
+PINYIN_TABLE_PATH = Path(__file__).parent / 'data' / 'pinyin_cjk.txt'
+
+_table: Optional[List[str]] = None
+_ruby_map: Optional[Dict[int, str]] = None
+_lock = threading.Lock()
+
+
+def build_table() -> List[str]:
+    """Pinyin (с тонами) для каждого иероглифа блока одним вызовом pypinyin"""
+    from pypinyin import pinyin, Style
+
+    chars = [chr(code) for code in range(CJK_START, CJK_END + 1)]
+    # Список — уже «сегментированный» текст: каждый иероглиф читается отдельно, без контекста фраз
+    return [readings[0] for readings in pinyin(chars, style=Style.TONE)]
+
+
+def save_table(table: List[str], path: Path = PINYIN_TABLE_PATH):
+    """Атомарная запись таблицы (только при генерации, не из приложения)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp_path.write_text('\n'.join(table), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def get_table() -> List[str]:
+    """Таблица pinyin, индексируемая смещением кода от CJK_START"""
+    global _table
+    if _table is not None:
+        return _table
+
+    with _lock:
+        if _table is None:
+            try:
+                table = PINYIN_TABLE_PATH.read_text(encoding='utf-8').split('\n')
+            except OSError as e:
+                raise RuntimeError(
+                    f"Таблица pinyin не найдена: {PINYIN_TABLE_PATH} "
+                    f"(сгенерируйте её: python -m app.utils.pinyin_table)"
+                ) from e
+
+            if len(table) != CJK_END - CJK_START + 1:
+                raise RuntimeError(
+                    f"Таблица pinyin повреждена: {PINYIN_TABLE_PATH} содержит {len(table)} строк "
+                    f"вместо {CJK_END - CJK_START + 1} (пересоздайте: python -m app.utils.pinyin_table)"
+                )
+            _table = table
+    return _table
+
+
+def get_ruby_map() -> Dict[int, str]:
+    """Таблица для str.translate: код иероглифа → <ruby>иероглиф<rt>pinyin</rt></ruby>"""
+    global _ruby_map
+    if _ruby_map is None:
+        table = get_table()
+        _ruby_map = {
+            CJK_START + offset: f'<ruby>{chr(CJK_START + offset)}<rt>{syllable}</rt></ruby>'
+            for offset, syllable in enumerate(table)
+        }
+    return _ruby_map
+
+
+if __name__ == '__main__':
+    save_table(build_table())
+    print(f"✅ Таблица pinyin сохранена: {PINYIN_TABLE_PATH}")
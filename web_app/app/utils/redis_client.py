@@ -0,0 +1,56 @@
+"""
+Общие клиенты Redis служебных хранилищ (rate limiter, кэш ответов LLM, контрольные точки перевода)
+
+URL берётся из переменной окружения хранилища, по умолчанию — RATE_LIMIT_REDIS_URL.
+Клиент создаётся при первом обращении (после fork воркера), хранилища с одинаковым URL
+используют один клиент и один пул соединений. Хранилища работают и без Redis, поэтому
+его недоступность логируется один раз на хранилище.
+"""
+import logging
+import os
+import threading
+from typing import Dict, Set
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REDIS_URL_ENV = 'RATE_LIMIT_REDIS_URL'
+DEFAULT_REDIS_URL = 'redis://localhost:6379/1'
+
+_clients: Dict[str, redis.Redis] = {}          # переменная окружения → клиент
+_clients_by_url: Dict[str, redis.Redis] = {}
+_clients_lock = threading.Lock()
+_unavailable_logged: Set[str] = set()
+
+
+def get_redis_url(env_var: str = DEFAULT_REDIS_URL_ENV) -> str:
+    return os.getenv(env_var) or os.getenv(DEFAULT_REDIS_URL_ENV, DEFAULT_REDIS_URL)
+
+
+def get_shared_redis(env_var: str = DEFAULT_REDIS_URL_ENV) -> redis.Redis:
+    """Клиент Redis (decode_responses=True) по URL из переменной окружения env_var"""
+    client = _clients.get(env_var)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(env_var)
+            if client is None:
+                url = get_redis_url(env_var)
+                client = _clients_by_url.get(url)
+                if client is None:
+                    client = _clients_by_url[url] = redis.Redis.from_url(url, decode_responses=True)
+                _clients[env_var] = client
+    return client
+
+
+def log_redis_unavailable(store: str, error: Exception, consequence: str):
+    """
+    Предупреждение о недоступном Redis — один раз на процесс для каждого хранилища.
+
+    Пример:
+        log_redis_unavailable('Кэш ответов LLM', e, 'кэширование отключено')
+    """
+    if store in _unavailable_logged:
+        return
+    _unavailable_logged.add(store)
+    logger.warning(f"⚠️ {store}: Redis недоступен ({error}), {consequence}")
@@ -0,0 +1,189 @@
+"""
+Статистическое выравнивание предложений RU ↔ ZH без LLM (метод Гейла–Чёрча)
+
+Динамическое программирование по «бусинам» 1:1, 1:2, 2:1, 1:0 и 0:1.
+Стоимость бусины — отклонение отношения длин от среднего по главе
+плюс бонус за совпавшие термины глоссария (якоря): китайский термин в одной части
+и его русский перевод в другой. Считается в полосе вокруг диагонали, поэтому
+глава выравнивается за десятки миллисекунд на CPU.
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.glossary_matcher import TermAutomaton
+from app.utils.text_alignment import BilingualTextAligner
+
+# (китайских предложений, русских предложений) → априорная вероятность бусины (Gale & Church, 1993)
+BEAD_PRIORS = {
+    (1, 1): 0.89,
+    (1, 0): 0.0099 / 2,
+    (0, 1): 0.0099 / 2,
+    (2, 1): 0.089 / 2,
+    (1, 2): 0.089 / 2,
+}
+
+
+class SentenceAligner:
+    """
+    Выравнивание предложений по длинам и якорям глоссария.
+
+    Пример:
+        aligner = SentenceAligner(GlossaryItem.get_chinese_terms_dict(novel_id))
+        alignments = aligner.align_texts(russian_text, chinese_text)
+        # [{'ru': ..., 'zh': ..., 'type': 'unknown', 'confidence': 0.87}, ...]
+    """
+
+    # Дисперсия разности длин на символ (в китайских символах), как у Гейла–Чёрча
+    VARIANCE = 6.8
+    # Бонус (в единицах -log вероятности) за каждый совпавший термин глоссария и штраф за отсутствующий
+    ANCHOR_BONUS = 2.0
+    ANCHOR_MISS_PENALTY = 0.5
+    # Минимальная полуширина полосы вокруг диагонали
+    MIN_BAND = 15
+
+    def __init__(self, glossary_dict: Optional[Dict[str, Dict]] = None):
+        """
+        Args:
+            glossary_dict: {китайский_термин: {'russian': ..., ...}} (GlossaryItem.get_chinese_terms_dict)
+        """
+        self._stems: Dict[str, str] = {}
+        for term, info in (glossary_dict or {}).items():
+            russian = (info or {}).get('russian') or ''
+            if term and russian:
+                # Корень перевода — как при проверке конфликтов глоссария
+                self._stems[term] = russian[:min(len(russian), max(4, len(russian) // 2))].lower()
+        self._automaton = TermAutomaton(self._stems.keys()) if self._stems else None
+
+    def align_texts(self, russian_text: str, chinese_text: str) -> List[Dict]:
+        """Разбивка на предложения и выравнивание"""
+        return self.align(
+            BilingualTextAligner.split_into_sentences(russian_text, 'ru'),
+            BilingualTextAligner.split_into_sentences(chinese_text, 'zh')
+        )
+
+    def align(self, ru_sentences: List[str], zh_sentences: List[str]) -> List[Dict]:
+        """
+        Выравнивание списков предложений.
+
+        Returns:
+            Пары в формате LLM-выравнивания: [{'ru', 'zh', 'type', 'confidence'}, ...];
+            части из нескольких предложений склеены через пробел (ru) или подряд (zh)
+        """
+        n, m = len(zh_sentences), len(ru_sentences)
+        if not n or not m:
+            return [{'ru': ru, 'zh': '', 'type': 'unknown', 'confidence': 0.3} for ru in ru_sentences] + \
+                   [{'ru': '', 'zh': zh, 'type': 'unknown', 'confidence': 0.3} for zh in zh_sentences]
+
+        # Префиксные суммы длин: длина любой группы подряд идущих предложений за O(1)
+        zh_prefix, ru_prefix = [0], [0]
+        for sentence in zh_sentences:
+            zh_prefix.append(zh_prefix[-1] + len(sentence))
+        for sentence in ru_sentences:
+            ru_prefix.append(ru_prefix[-1] + len(sentence))
+        # Отношение длин RU/ZH калибруется по самой главе
+        ratio = (ru_prefix[-1] / zh_prefix[-1]) if zh_prefix[-1] else 1.0
+
+        zh_stems = [self._sentence_stems(sentence) for sentence in zh_sentences]
+        ru_lower = [sentence.lower() for sentence in ru_sentences]
+        bead_costs = [((di, dj), -math.log(prior)) for (di, dj), prior in BEAD_PRIORS.items()]
+
+        band = max(self.MIN_BAND, max(n, m) // 10)
+        costs: List[Dict[int, float]] = [dict() for _ in range(n + 1)]
+        back: List[Dict[int, Tuple[int, int, float, int]]] = [dict() for _ in range(n + 1)]
+        costs[0][0] = 0.0
+
+        for i in range(n + 1):
+            center = int(i * m / n)
+            row, row_back = costs[i], back[i]
+            for j in range(max(0, center - band), min(m, center + band) + 1):
+                if i == 0 and j == 0:
+                    continue
+                best, best_move = math.inf, None
+                for (di, dj), prior_cost in bead_costs:
+                    if i < di or j < dj:
+                        continue
+                    previous = costs[i - di].get(j - dj)
+                    if previous is None:
+                        continue
+                    p_length = self._length_probability(
+                        zh_prefix[i] - zh_prefix[i - di], ru_prefix[j] - ru_prefix[j - dj], ratio
+                    )
+                    cost = previous + prior_cost - math.log(max(p_length, 1e-12))
+                    matches = 0
+                    if di and (zh_stems[i - 1] or (di == 2 and zh_stems[i - 2])):
+                        matches, misses = self._anchor_matches(zh_stems[i - di:i], ru_lower[j - dj:j])
+                        cost += self.ANCHOR_MISS_PENALTY * misses - self.ANCHOR_BONUS * matches
+                    if cost < best:
+                        best, best_move = cost, (di, dj, p_length, matches)
+                if best_move is not None:
+                    row[j] = best
+                    row_back[j] = best_move
+
+        if m not in costs[n]:
+            # Полоса не дошла до угла (не должно случаться) — попарное выравнивание
+            return self._pairwise(ru_sentences, zh_sentences)
+
+        beads = []
+        i, j = n, m
+        while i > 0 or j > 0:
+            di, dj, p_length, matches = back[i][j]
+            beads.append({
+                'ru': ' '.join(ru_sentences[j - dj:j]),
+                'zh': ''.join(zh_sentences[i - di:i]),
+                'type': 'unknown',
+                'confidence': self._confidence(di, dj, p_length, matches)
+            })
+            i, j = i - di, j - dj
+        beads.reverse()
+        return beads
+
+    def _sentence_stems(self, sentence: str) -> List[str]:
+        """Корни русских переводов терминов глоссария, встречающихся в предложении"""
+        if self._automaton is None:
+            return []
+        return [self._stems[term] for term in self._automaton.find_all(sentence)]
+
+    @staticmethod
+    def _anchor_matches(zh_stems: List[List[str]], ru_lower: List[str]) -> Tuple[int, int]:
+        """(сколько терминов китайской части нашлось в русской, сколько не нашлось)"""
+        stems = [stem for sentence_stems in zh_stems for stem in sentence_stems]
+        if not stems:
+            return 0, 0
+        if not ru_lower:
+            return 0, len(stems)
+        russian = ' '.join(ru_lower)
+        matches = sum(1 for stem in stems if stem in russian)
+        return matches, len(stems) - matches
+
+    @classmethod
+    def _length_probability(cls, zh_length: int, ru_length: int, ratio: float) -> float:
+        """Вероятность отклонения длин не меньше наблюдаемого: 2·(1 − Φ(|δ|))"""
+        if zh_length == 0 and ru_length == 0:
+            return 1.0
+        ru_in_zh_units = ru_length / ratio
+        mean = (zh_length + ru_in_zh_units) / 2
+        delta = (ru_in_zh_units - zh_length) / math.sqrt(mean * cls.VARIANCE)
+        return math.erfc(abs(delta) / math.sqrt(2))
+
+    @staticmethod
+    def _confidence(di: int, dj: int, p_length: float, matches: int) -> float:
+        """Эвристическая уверенность бусины (шкала как у LLM-выравнивания)"""
+        if di == 0 or dj == 0:
+            return 0.3
+        confidence = 0.3 + 0.6 * p_length + 0.1 * min(matches, 2)
+        if di != dj:
+            confidence *= 0.9
+        return round(min(confidence, 0.95), 2)
+
+    @staticmethod
+    def _pairwise(ru_sentences: List[str], zh_sentences: List[str]) -> List[Dict]:
+        length = max(len(ru_sentences), len(zh_sentences))
+        return [
+            {
+                'ru': ru_sentences[index] if index < len(ru_sentences) else '',
+                'zh': zh_sentences[index] if index < len(zh_sentences) else '',
+                'type': 'unknown',
+                'confidence': 0.5
+            }
+            for index in range(length)
+        ]
@@ -78,37 +78,23 @@ class BilingualTextAligner:
             return result
 
     @staticmethod
-    def align_sentences(russian_text: str, chinese_text: str) -> List[Tuple[str, str]]:
+    def align_sentences(russian_text: str, chinese_text: str,
+                        glossary_dict: Optional[Dict[str, Dict]] = None) -> List[Tuple[str, str]]:
         """
-        Выравнивает русские и китайские предложения
+        Выравнивает русские и китайские предложения (статистически, по длинам и терминам глоссария)
 
         Args:
             russian_text: Русский текст
             chinese_text: Китайский текст
+            glossary_dict: Словарь глоссария {chinese_term: {russian, ...}} для якорей (необязательно)
 
         Returns:
             Список пар (русское_предложение, китайское_предложение)
         """
-        ru_sentences = BilingualTextAligner.split_into_sentences(russian_text, 'ru')
-        zh_sentences = BilingualTextAligner.split_into_sentences(chinese_text, 'zh')
+        from app.utils.sentence_aligner import SentenceAligner
 
-        # Простое выравнивание: предполагаем, что количество предложений совпадает
-        # Если не совпадает, используем минимальное количество
-        min_len = min(len(ru_sentences), len(zh_sentences))
-
-        aligned = []
-        for i in range(min_len):
-            aligned.append((ru_sentences[i], zh_sentences[i]))
-
-        # Если одного из языков больше предложений, добавляем их с пустыми парами
-        if len(ru_sentences) > min_len:
-            for i in range(min_len, len(ru_sentences)):
-                aligned.append((ru_sentences[i], ''))
-        elif len(zh_sentences) > min_len:
-            for i in range(min_len, len(zh_sentences)):
-                aligned.append(('', zh_sentences[i]))
-
-        return aligned
+        alignments = SentenceAligner(glossary_dict).align_texts(russian_text, chinese_text)
+        return [(pair['ru'], pair['zh']) for pair in alignments]
 
     @staticmethod
     def align_paragraphs(russian_text: str, chinese_text: str) -> List[Tuple[str, str]]:
@@ -425,6 +425,8 @@ def edit_novel(novel_id):
         editing_quality_mode = request.form.get('editing_quality_mode', 'balanced')
         editing_threads = request.form.get('editing_threads')
         alignment_threads = request.form.get('alignment_threads')
+        translation_parallel_parts = request.form.get('translation_parallel_parts')
+        translation_threads = request.form.get('translation_threads')
         fallback_editing_model = (request.form.get('fallback_editing_model') or '').strip() or None
 
         # Определяем температуру редактирования
@@ -476,6 +478,9 @@ def edit_novel(novel_id):
             'editing_quality_mode': editing_quality_mode or 'balanced',
             'editing_threads': int(editing_threads) if editing_threads else 3,
             'alignment_threads': int(alignment_threads) if alignment_threads else 3,
+            'translation_parallel_parts': int(translation_parallel_parts) if translation_parallel_parts else 3,
+            'translation_threads': int(translation_threads) if translation_threads else 1,
+            'translation_batch_mode': request.form.get('translation_batch_mode', 'false') == 'true',
             'fallback_editing_model': fallback_editing_model,
             'filter_text': request.form.get('filter_text', '').strip()
         }
@@ -0,0 +1,29 @@
+"""Add cached_tokens to prompt_history
+
+Revision ID: c7e2d91f4a58
+Revises: a3f1c8b40921
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2d91f4a58'
+down_revision = 'a3f1c8b40921'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Токены промпта, прочитанные из кэша провайдера
+    # (Anthropic cache_control, Gemini cachedContents/неявный кэш, DeepSeek/OpenAI префиксный кэш)
+    op.add_column(
+        'prompt_history',
+        sa.Column('cached_tokens', sa.Integer(), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_column('prompt_history', 'cached_tokens')
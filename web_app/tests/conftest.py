@@ -0,0 +1,19 @@
+"""
+Общие настройки тестов: пакет app импортируется из web_app.
+
+Без Flask (например, при проверке только утилит) app/__init__.py не импортируется:
+пакет app регистрируется без выполнения его __init__, и чистые модули app.utils
+загружаются как обычно. Тесты сервисов при этом пропускаются (pytest.importorskip('flask')).
+"""
+import importlib.util
+import os
+import sys
+import types
+
+WEB_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, WEB_APP_DIR)
+
+if importlib.util.find_spec('flask') is None and 'app' not in sys.modules:
+    _app_package = types.ModuleType('app')
+    _app_package.__path__ = [os.path.join(WEB_APP_DIR, 'app')]
+    sys.modules['app'] = _app_package
@@ -0,0 +1,47 @@
+"""Порционное выравнивание (_align_chapter_chunked) без LLM и БД"""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('flask')
+
+import app.models
+from app.services import bilingual_alignment_service
+from app.services.bilingual_alignment_service import BilingualAlignmentService
+
+
+@pytest.fixture
+def service(monkeypatch):
+    for name in ('log_info', 'log_warning', 'log_error'):
+        monkeypatch.setattr(bilingual_alignment_service.LogService, name, staticmethod(lambda *a, **kw: None))
+    monkeypatch.setattr(app.models, 'Novel', SimpleNamespace(query=SimpleNamespace(get=lambda novel_id: None)))
+
+    service = BilingualAlignmentService(max_technical_retries=2, technical_retry_delay=0, chunk_concurrency=2)
+
+    async def align_chunks(translator, template, chunks):
+        return [[{'ru': ru, 'zh': zh, 'confidence': 0.9}] for ru, zh in chunks]
+
+    monkeypatch.setattr(service, '_align_chunks_async', align_chunks)
+    return service
+
+
+def test_chunked_alignment_glues_chunks(service):
+    chunks = [('Первый абзац.', '第一段。'), ('Второй абзац.', '第二段。'), ('Третий абзац.', '第三段。')]
+    russian_text = '\n'.join(ru for ru, _ in chunks)
+    chinese_text = '\n'.join(zh for _, zh in chunks)
+    prealigned = {1: [{'ru': chunks[1][0], 'zh': chunks[1][1], 'confidence': 0.9}]}
+
+    alignments = service._align_chapter_chunked(
+        chapter=SimpleNamespace(id=1, novel_id=1, chapter_number=1),
+        chunks=chunks,
+        template=SimpleNamespace(id=1),
+        translator=None,
+        ai_model=SimpleNamespace(name='test'),
+        russian_text=russian_text,
+        chinese_text=chinese_text,
+        coverage_thresholds={1: 0.9, 2: 0.8},
+        save_to_cache=False,
+        prealigned=prealigned
+    )
+
+    assert [pair['ru'] for pair in alignments] == [ru for ru, _ in chunks]
@@ -0,0 +1,87 @@
+"""Потоковая запись EPUB (app.utils.epub_writer): OPF, NCX и навигация"""
+import zipfile
+import xml.etree.ElementTree as ET
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('lxml')
+
+from app.utils.epub_writer import StreamingEpubWriter  # noqa: E402
+
+OPF = '{http://www.idpf.org/2007/opf}'
+DC = '{http://purl.org/dc/elements/1.1/}'
+NCX = '{http://www.daisy.org/z3986/2005/ncx/}'
+
+PAGE = b"<?xml version='1.0' encoding='utf-8'?>\n<html xmlns=\"http://www.w3.org/1999/xhtml\"><body/></html>\n"
+
+
+def write_book(path):
+    css = SimpleNamespace(id='style', file_name='style/main.css', media_type='text/css', content='p {}')
+    with StreamingEpubWriter(path, 'novel-1', 'Книга & <тест>', author='Автор') as writer:
+        writer.add_item(css)
+        writer.add_xhtml('title.xhtml', 'Титул', PAGE)
+        writer.add_xhtml('chapter_1.xhtml', 'Глава 1', PAGE, toc_section='Главы')
+        writer.add_xhtml('chapter_2.xhtml', 'Глава 2', PAGE, toc_section='Главы')
+
+
+def test_archive_layout(tmp_path):
+    path = tmp_path / 'book.epub'
+    write_book(path)
+
+    with zipfile.ZipFile(path) as archive:
+        first = archive.infolist()[0]
+        assert first.filename == 'mimetype'
+        assert first.compress_type == zipfile.ZIP_STORED
+        assert archive.read('mimetype') == b'application/epub+zip'
+        assert {'META-INF/container.xml', 'EPUB/content.opf', 'EPUB/toc.ncx', 'EPUB/nav.xhtml',
+                'EPUB/style/main.css', 'EPUB/chapter_2.xhtml'} <= set(archive.namelist())
+
+
+def test_opf_manifest_spine_and_metadata(tmp_path):
+    path = tmp_path / 'book.epub'
+    write_book(path)
+
+    with zipfile.ZipFile(path) as archive:
+        package = ET.fromstring(archive.read('EPUB/content.opf'))
+
+    metadata = package.find(f'{OPF}metadata')
+    assert metadata.find(f'{DC}identifier').text == 'novel-1'
+    assert metadata.find(f'{DC}title').text == 'Книга & <тест>'
+    assert metadata.find(f'{DC}creator').text == 'Автор'
+
+    manifest = {item.get('id'): item for item in package.find(f'{OPF}manifest')}
+    assert manifest['nav'].get('properties') == 'nav'
+    assert manifest['style'].get('href') == 'style/main.css'
+    assert manifest['page_3'].get('href') == 'chapter_2.xhtml'
+
+    spine = package.find(f'{OPF}spine')
+    assert spine.get('toc') == 'ncx'
+    assert [ref.get('idref') for ref in spine] == ['nav', 'page_1', 'page_2', 'page_3']
+
+
+def test_ncx_groups_toc_sections(tmp_path):
+    path = tmp_path / 'book.epub'
+    write_book(path)
+
+    with zipfile.ZipFile(path) as archive:
+        ncx = ET.fromstring(archive.read('EPUB/toc.ncx'))
+
+    points = ncx.find(f'{NCX}navMap').findall(f'{NCX}navPoint')
+    assert [point.find(f'{NCX}navLabel/{NCX}text').text for point in points] == ['Титул', 'Главы']
+    assert points[0].find(f'{NCX}content').get('src') == 'title.xhtml'
+
+    section = points[1]
+    assert section.find(f'{NCX}content').get('src') == 'chapter_1.xhtml'
+    children = section.findall(f'{NCX}navPoint')
+    assert [child.find(f'{NCX}content').get('src') for child in children] == ['chapter_1.xhtml', 'chapter_2.xhtml']
+
+
+def test_failed_write_removes_partial_archive(tmp_path):
+    path = tmp_path / 'book.epub'
+    with pytest.raises(RuntimeError):
+        with StreamingEpubWriter(path, 'novel-1', 'Книга') as writer:
+            writer.add_xhtml('title.xhtml', 'Титул', PAGE)
+            raise RuntimeError('render failed')
+
+    assert not path.exists()
@@ -0,0 +1,75 @@
+"""Явный кэш Gemini (cachedContents): какие отказы запоминаются для модели"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('flask')
+httpx = pytest.importorskip('httpx')
+
+from app.services import ai_adapter_service  # noqa: E402
+from app.services.ai_adapter_service import AIAdapterService  # noqa: E402
+
+PREFIX = 'контекст главы ' * 4000
+
+
+@pytest.fixture
+def adapter(monkeypatch):
+    monkeypatch.setattr(ai_adapter_service, '_gemini_cached_contents', {})
+    monkeypatch.setattr(ai_adapter_service, '_gemini_cache_rejected', set())
+    monkeypatch.setattr(ai_adapter_service, '_gemini_cache_min_tokens', {})
+    monkeypatch.setattr(ai_adapter_service, '_gemini_cache_creating', {})
+
+    adapter = AIAdapterService.__new__(AIAdapterService)
+    adapter.model = SimpleNamespace(model_id='gemini-test', api_endpoint='https://gemini.test/v1beta')
+    adapter.chapter_id = None
+    return adapter
+
+
+def create_cache(adapter, status_code, body):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(status_code, json=body)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await adapter._get_or_create_gemini_cache(client, 'key', 'system', PREFIX)
+
+    return asyncio.run(run()), calls
+
+
+def error(message):
+    return {'error': {'code': 400, 'message': message, 'status': 'INVALID_ARGUMENT'}}
+
+
+def test_unsupported_model_is_not_retried(adapter):
+    name, _ = create_cache(adapter, 400, error('Model gemini-test does not support cachedContents.'))
+
+    assert name is None
+    assert 'gemini-test' in ai_adapter_service._gemini_cache_rejected
+    assert create_cache(adapter, 200, {'name': 'cachedContents/1'}) == (None, [])
+
+
+def test_too_small_prefix_raises_threshold_only(adapter):
+    name, _ = create_cache(adapter, 400, error(
+        'Cached content is too small. total_token_count=3000, min_total_token_count=4096'
+    ))
+
+    assert name is None
+    assert 'gemini-test' not in ai_adapter_service._gemini_cache_rejected
+    assert ai_adapter_service._gemini_cache_min_tokens['gemini-test'] > adapter._estimate_tokens(f"system\n{PREFIX}")
+    # Тот же префикс больше не отправляется
+    assert create_cache(adapter, 200, {'name': 'cachedContents/1'}) == (None, [])
+
+
+def test_other_bad_request_skips_only_this_call(adapter):
+    name, calls = create_cache(adapter, 400, error('Invalid value at contents[0].parts[1].text'))
+
+    assert (name, len(calls)) == (None, 1)
+    assert not ai_adapter_service._gemini_cache_rejected
+    assert not ai_adapter_service._gemini_cache_min_tokens
+
+    name, calls = create_cache(adapter, 200, {'name': 'cachedContents/1'})
+    assert (name, len(calls)) == ('cachedContents/1', 1)
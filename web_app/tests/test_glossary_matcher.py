@@ -0,0 +1,52 @@
+"""Поиск терминов глоссария автоматом Ахо–Корасик (app.utils.glossary_matcher)"""
+from app.utils.glossary_matcher import GlossaryMatcher, TermAutomaton, TermPrefixTrie
+
+
+def test_find_all_reports_overlapping_and_nested_terms():
+    automaton = TermAutomaton(['涅槃', '涅槃劫', '槃劫', '林动'])
+
+    assert automaton.find_all('林动渡过涅槃劫') == {'林动', '涅槃', '涅槃劫', '槃劫'}
+    assert automaton.find_all('无关的文字') == set()
+
+
+def test_iter_matches_positions():
+    automaton = TermAutomaton(['ab', 'b', 'abc'])
+
+    assert sorted(automaton.iter_matches('xabc')) == [(3, 'ab'), (3, 'b'), (4, 'abc')]
+
+
+def test_empty_automaton_and_empty_text():
+    assert TermAutomaton([]).find_all('林动') == set()
+    assert TermAutomaton(['林动']).find_all('') == set()
+
+
+def test_prefix_trie_yields_shorter_terms_only():
+    trie = TermPrefixTrie([('涅', 1), ('涅槃', 2), ('涅槃劫', 3)])
+
+    assert list(trie.iter_prefixes('涅槃劫')) == [('涅', 1), ('涅槃', 2)]
+    assert list(trie.iter_prefixes('林动')) == []
+    assert len(trie) == 3
+
+
+def test_filter_glossary_keeps_only_terms_in_text():
+    glossary = {'characters': {'林动': 'Линь Дун', '岩': 'Янь'}, 'locations': {'青阳镇': 'Цинъян'}}
+
+    filtered = GlossaryMatcher.for_glossary(glossary).filter_glossary(glossary, '林动离开了青阳镇')
+
+    assert filtered == {'characters': {'林动': 'Линь Дун'}, 'locations': {'青阳镇': 'Цинъян'}}
+
+
+def test_leftmost_longest_prefers_longest_term_at_each_position():
+    automaton = TermAutomaton(['涅槃', '涅槃劫', '劫', '林动'])
+
+    assert list(automaton.iter_leftmost_longest('林动渡涅槃劫')) == [
+        (0, 2, '林动'), (3, 6, '涅槃劫')
+    ]
+
+
+def test_leftmost_longest_skips_matches_overlapping_earlier_ones():
+    # "槃劫" начинается внутри уже выбранного "涅槃" и не выделяется
+    automaton = TermAutomaton(['涅槃', '槃劫', '劫'])
+
+    assert list(automaton.iter_leftmost_longest('涅槃劫')) == [(0, 2, '涅槃'), (2, 3, '劫')]
+    assert list(automaton.iter_leftmost_longest('无关')) == []
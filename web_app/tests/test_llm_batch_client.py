@@ -0,0 +1,142 @@
+"""Клиенты Batch API и BatchTranslationService._run_batches против tools/llm_batch_stub_server.py"""
+import importlib.util
+import os
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('httpx')
+
+from app.services import batch_translation_service, llm_batch_client  # noqa: E402
+from app.services.batch_translation_service import BatchTranslationService  # noqa: E402
+from app.services.llm_batch_client import (  # noqa: E402
+    BATCH_SUCCEEDED, AnthropicBatchClient, GeminiBatchClient, LLMBatchClient
+)
+
+STUB_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'tools', 'llm_batch_stub_server.py')
+
+
+@pytest.fixture
+def stub():
+    spec = importlib.util.spec_from_file_location('llm_batch_stub_server', STUB_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.completion_delay = 0
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), module.BatchStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield module, f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(llm_batch_client, 'LLM_BATCH_POLL_INTERVAL', 0.01)
+    for name in ('log_info', 'log_warning', 'log_error'):
+        monkeypatch.setattr(batch_translation_service.LogService, name, staticmethod(lambda *a, **kw: None))
+
+
+def make_client(client_class, endpoint, provider):
+    model = SimpleNamespace(provider=provider, model_id=f'{provider}-test', api_key='key', api_keys=[],
+                            api_endpoint=endpoint, max_output_tokens=8192)
+    return client_class(model)
+
+
+def make_request(custom_id, text):
+    return {
+        'custom_id': custom_id,
+        'system_prompt': 'Переведи на русский',
+        'user_prompt': f"КОНТЕКСТ\n\nТЕКСТ ДЛЯ ПЕРЕВОДА:\n{text}",
+        'temperature': 0.1,
+        'max_tokens': 1000,
+        'prompt_type': 'translation',
+        'chapter_id': 1
+    }
+
+
+def test_base_client_is_abstract():
+    with pytest.raises(TypeError):
+        LLMBatchClient(SimpleNamespace(api_key='key', api_endpoint=''))
+
+
+@pytest.mark.parametrize('client_class, provider', [
+    (GeminiBatchClient, 'gemini'),
+    (AnthropicBatchClient, 'anthropic'),
+])
+def test_results_are_parsed(stub, client_class, provider):
+    _, endpoint = stub
+    client = make_client(client_class, endpoint, provider)
+    try:
+        batch_id = client.submit([make_request('c1-p0', '第一部分'), make_request('c1-p1', '第二部分')], 'test')
+
+        assert client.wait(batch_id) == BATCH_SUCCEEDED
+        results = client.results(batch_id)
+    finally:
+        client.close()
+
+    assert set(results) == {'c1-p0', 'c1-p1'}
+    assert results['c1-p0']['success'] is True
+    assert results['c1-p0']['content'] == '第一部分'
+    assert results['c1-p1']['content'] == '第二部分'
+    assert results['c1-p0']['finish_reason'] in ('STOP', 'end_turn')
+    assert results['c1-p0']['usage']
+
+
+def test_anthropic_results_follow_endpoint_override(stub, monkeypatch):
+    _, endpoint = stub
+    monkeypatch.setattr(llm_batch_client, 'LLM_BATCH_ENDPOINT', endpoint)
+    client = make_client(AnthropicBatchClient, 'https://api.anthropic.invalid/v1', 'anthropic')
+    try:
+        batch_id = client.submit([make_request('c1-p0', '正文')], 'test')
+        client.wait(batch_id)
+        assert client.results(batch_id)['c1-p0']['content'] == '正文'
+    finally:
+        client.close()
+
+
+@pytest.mark.parametrize('client_class, provider', [
+    (GeminiBatchClient, 'gemini'),
+    (AnthropicBatchClient, 'anthropic'),
+])
+def test_run_batches_splits_and_merges(stub, monkeypatch, client_class, provider):
+    module, endpoint = stub
+    monkeypatch.setattr(batch_translation_service, 'LLM_BATCH_MAX_REQUESTS', 2)
+
+    service = BatchTranslationService.__new__(BatchTranslationService)
+    service.client = make_client(client_class, endpoint, provider)
+    service.model = service.client.model
+    service.translator = SimpleNamespace(save_prompt_history=False)
+    requests = [make_request(f'c1-p{index}', f'部分{index}') for index in range(3)]
+    try:
+        responses = service._run_batches(requests, 'novel-1-translation')
+    finally:
+        service.client.close()
+
+    assert len(module.batches) == 2
+    assert {key: value['content'] for key, value in responses.items()} == {
+        'c1-p0': '部分0', 'c1-p1': '部分1', 'c1-p2': '部分2'
+    }
+
+
+def test_run_batches_cancel_returns_none(stub):
+    module, endpoint = stub
+    module.completion_delay = 60
+
+    service = BatchTranslationService.__new__(BatchTranslationService)
+    service.client = make_client(GeminiBatchClient, endpoint, 'gemini')
+    service.model = service.client.model
+    service.translator = SimpleNamespace(save_prompt_history=False)
+    try:
+        responses = service._run_batches([make_request('c1-p0', '正文')], 'novel-1', should_stop=lambda: True)
+    finally:
+        service.client.close()
+
+    assert responses is None
+    assert all(batch['cancelled'] for batch in module.batches.values())
@@ -0,0 +1,22 @@
+"""Таблица pinyin блока CJK (app.utils.pinyin_table)"""
+import pytest
+
+from app.utils import pinyin_table
+
+
+def test_committed_table_covers_cjk_block():
+    table = pinyin_table.get_table()
+
+    assert len(table) == pinyin_table.CJK_END - pinyin_table.CJK_START + 1
+    assert table[ord('好') - pinyin_table.CJK_START] == 'hǎo'
+    assert pinyin_table.get_ruby_map()[ord('中')] == '<ruby>中<rt>zhōng</rt></ruby>'
+
+
+def test_missing_table_is_an_error_not_a_rebuild(monkeypatch, tmp_path):
+    missing = tmp_path / 'pinyin_cjk.txt'
+    monkeypatch.setattr(pinyin_table, 'PINYIN_TABLE_PATH', missing)
+    monkeypatch.setattr(pinyin_table, '_table', None)
+
+    with pytest.raises(RuntimeError, match='python -m app.utils.pinyin_table'):
+        pinyin_table.get_table()
+    assert not missing.exists()
@@ -0,0 +1,38 @@
+"""Общие клиенты Redis служебных хранилищ (app.utils.redis_client)"""
+import logging
+
+import pytest
+
+pytest.importorskip('redis')
+
+from app.utils import redis_client  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    monkeypatch.setattr(redis_client, '_clients', {})
+    monkeypatch.setattr(redis_client, '_clients_by_url', {})
+    monkeypatch.setattr(redis_client, '_unavailable_logged', set())
+
+
+def test_stores_with_same_url_share_client(monkeypatch):
+    monkeypatch.setenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/1')
+    monkeypatch.delenv('LLM_CACHE_REDIS_URL', raising=False)
+    monkeypatch.setenv('TRANSLATION_CHECKPOINT_REDIS_URL', 'redis://localhost:6379/2')
+
+    limiter = redis_client.get_shared_redis('RATE_LIMIT_REDIS_URL')
+
+    assert redis_client.get_shared_redis('LLM_CACHE_REDIS_URL') is limiter
+    assert redis_client.get_shared_redis('TRANSLATION_CHECKPOINT_REDIS_URL') is not limiter
+
+
+def test_unavailable_is_logged_once_per_store(caplog):
+    with caplog.at_level(logging.WARNING, logger=redis_client.__name__):
+        for _ in range(3):
+            redis_client.log_redis_unavailable('Кэш ответов LLM', ConnectionError('refused'), 'кэширование отключено')
+        redis_client.log_redis_unavailable('Rate limiter', ConnectionError('refused'), 'ограничение отключено')
+
+    assert [record.getMessage() for record in caplog.records] == [
+        '⚠️ Кэш ответов LLM: Redis недоступен (refused), кэширование отключено',
+        '⚠️ Rate limiter: Redis недоступен (refused), ограничение отключено',
+    ]
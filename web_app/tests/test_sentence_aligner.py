@@ -0,0 +1,83 @@
+"""Статистическое выравнивание предложений RU ↔ ZH (app.utils.sentence_aligner)"""
+import pytest
+
+from app.utils.sentence_aligner import BEAD_PRIORS, SentenceAligner
+
+GLOSSARY = {
+    '林动': {'russian': 'Линь Дун'},
+    '青阳': {'russian': 'Цинъян'},
+    '小貂': {'russian': 'Сяо Дяо'},
+}
+
+
+def joined(beads, key, separator):
+    return separator.join(bead[key] for bead in beads if bead[key])
+
+
+def test_one_to_one_keeps_order_and_anchors_raise_confidence():
+    zh = ['林动在这里停留了很久。', '青阳的城门已经关上了。', '小貂从树上跳了下来。']
+    ru = ['Линь Дун надолго задержался здесь.', 'Ворота Цинъяна уже закрылись.', 'Сяо Дяо спрыгнул с дерева.']
+
+    beads = SentenceAligner(GLOSSARY).align(ru, zh)
+    plain = SentenceAligner().align(ru, zh)
+
+    assert [(bead['ru'], bead['zh']) for bead in beads] == list(zip(ru, zh))
+    assert all(with_anchor['confidence'] > without['confidence'] for with_anchor, without in zip(beads, plain))
+
+
+def test_extra_russian_sentences_get_zero_to_one_bead():
+    zh = ['林动在这里停留了很久。']
+    ru = ['Линь Дун надолго задержался здесь.', 'Тихо.', 'Пусто.']
+
+    beads = SentenceAligner(GLOSSARY).align(ru, zh)
+
+    assert joined(beads, 'ru', ' ') == ' '.join(ru)
+    assert joined(beads, 'zh', '') == ''.join(zh)
+    unmatched = [bead for bead in beads if not bead['zh']]
+    assert unmatched and all(bead['confidence'] == 0.3 for bead in unmatched)
+    assert beads[0]['ru'].startswith('Линь Дун') and beads[0]['zh'] == zh[0]
+
+
+def test_extra_chinese_sentences_get_one_to_zero_bead():
+    zh = ['林动在这里停留了很久。', '静。', '空。']
+    ru = ['Линь Дун надолго задержался здесь.']
+
+    beads = SentenceAligner(GLOSSARY).align(ru, zh)
+
+    assert joined(beads, 'zh', '') == ''.join(zh)
+    unmatched = [bead for bead in beads if not bead['ru']]
+    assert unmatched and all(bead['confidence'] == 0.3 for bead in unmatched)
+
+
+def test_empty_side_returns_unpaired_sentences():
+    assert SentenceAligner().align(['Один.', 'Два.'], []) == [
+        {'ru': 'Один.', 'zh': '', 'type': 'unknown', 'confidence': 0.3},
+        {'ru': 'Два.', 'zh': '', 'type': 'unknown', 'confidence': 0.3},
+    ]
+
+
+def test_band_limits_work_and_still_reaches_the_corner(monkeypatch):
+    """Полоса вокруг диагонали: O(n·band) вместо O(n·m), без отката к попарному выравниванию"""
+    calls = []
+    length_probability = SentenceAligner._length_probability.__func__
+
+    def counting(cls, zh_length, ru_length, ratio):
+        calls.append(1)
+        return length_probability(cls, zh_length, ru_length, ratio)
+
+    def no_fallback(ru_sentences, zh_sentences):
+        pytest.fail('полоса не дошла до угла матрицы')
+
+    monkeypatch.setattr(SentenceAligner, '_length_probability', classmethod(counting))
+    monkeypatch.setattr(SentenceAligner, '_pairwise', staticmethod(no_fallback))
+
+    zh = [f'第{index}句话说了一些事情。' for index in range(300)]
+    # Половина русских предложений объединена попарно: путь уходит от главной диагонали
+    ru = [f'Предложение {index} кое-что рассказало и ещё одно.' for index in range(150)]
+
+    beads = SentenceAligner().align(ru, zh)
+
+    assert joined(beads, 'zh', '') == ''.join(zh)
+    assert joined(beads, 'ru', ' ') == ' '.join(ru)
+    full_matrix = len(BEAD_PRIORS) * (len(zh) + 1) * (len(ru) + 1)
+    assert len(calls) < full_matrix / 2